@@ -1,6 +1,24 @@
-from flask import Blueprint, render_template, jsonify, request, current_app
-from utils.cache import cached
+from flask import Blueprint, render_template, jsonify, request, current_app, Response, g, has_request_context
+from utils.cache import cached, cached_json, register_version_source
+from utils.omission import omission_matrix_to_dict, NEVER_SEEN_MISSED
+from utils.snapshot import snapshot_directory
+from utils.bitmask import numbers_to_mask, adjacent_mask
+from utils.window import WINDOW_ARGS, resolve_window, parse_window_args, parse_top_arg
+from utils.distribution import DistributionIndex, DEFAULT_DISTRIBUTION_WINDOW
+from utils.cooccurrence import GroupCooccurrence
+from utils.combinations import CombinationSpace
+from utils.tickets import TicketChecker, iter_ticket_chunks
+from utils.backtest import build_backtest_context, run_backtest, validate_strategy
+from utils.jobs import register_job_kind
+from utils.dataset import (LotteryDataset, get_dataset, find_dataset, publish_dataset, normalize_draws,
+                           append_draws_to_csv, dataset_update_lock, register_dataset_hooks,
+                           registered_datasets, share_dataset)
+from utils.auth import require_token
+from utils.warmup import register_warmup
+import json
 import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -18,26 +36,75 @@ dlt_api_bp = Blueprint('dlt_api', __name__,
 # 创建数据模型实例
 dlt_data = None
 
+# 号码列
+FRONT_COLUMNS = ['front1', 'front2', 'front3', 'front4', 'front5']
+BACK_COLUMNS = ['back1', 'back2']
+
 def load_dlt_data(csv_path):
-    """加载大乐透数据"""
-    df = pd.read_csv(csv_path)
-    
-    # 检查列名
-    if len(df.columns) >= 7:
-        df.columns = ['issue', 'front1', 'front2', 'front3', 'front4', 'front5', 'back1', 'back2']
-    else:
-        # 尝试自动检测列名
-        print("警告: CSV列数不足，尝试自动处理...")
-    
-    # 转换为整数
-    for col in ['front1', 'front2', 'front3', 'front4', 'front5', 'back1', 'back2']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-    
-    # 按期号排序（从旧到新）
-    df = df.sort_values('issue', ascending=True).reset_index(drop=True)
-    
-    return df
+    """加载大乐透数据 - 取数据集注册表中的共享数据（进程内只加载一次，优先读取二进制快照）"""
+    return get_dataset('dlt', csv_path).frame
+
+def attach_dataset(state):
+    """
+    蓝图注册到应用时，若尚未加载数据则从数据集注册表取得（应用未显式加载数据时）；
+    在应用上下文中加载，使 SHARE_DATASETS 等配置按该应用生效
+    """
+    global dlt_data
+    if dlt_data is None:
+        try:
+            with state.app.app_context():
+                dlt_data = load_dlt_data(state.app.config['DLT_DATA_PATH'])
+        except (KeyError, OSError) as e:
+            print(f"警告: 无法加载大乐透数据: {e}")
+
+dlt_page_bp.record_once(attach_dataset)
+dlt_api_bp.record_once(attach_dataset)
+
+# ==================== 派生数据（遗漏矩阵、特征表） ====================
+
+# 按 dlt_data 对象缓存，数据重新加载后自动重建
+_derived_data = {'source': None}
+
+def build_derived_data(df):
+    """号码矩阵、遗漏矩阵与特征表：注册表中的数据直接复用其派生数据，其他数据（如截取的子集）单独构建"""
+    dataset = find_dataset('dlt', df)
+    return dataset.derived if dataset is not None else LotteryDataset('dlt', df).derived
+
+def get_derived_data():
+    """
+    获取当前数据集的派生数据（每份数据只计算一次）
+    请求内首次取得后固定在 g 上：数据集在请求处理中被替换时，本次请求始终使用开始时的数据
+    """
+    global _derived_data
+    if has_request_context() and 'dlt_derived' in g:
+        return g.dlt_derived
+    derived = _derived_data
+    if derived['source'] is not dlt_data:
+        derived = _derived_data = build_derived_data(dlt_data)
+    if has_request_context():
+        g.dlt_derived = derived
+    return derived
+
+def get_draw_count():
+    """当前数据集的期数（与 get_derived_data 取得的数据一致），暂无数据时为0"""
+    if dlt_data is None:
+        return 0
+    return len(get_derived_data()['issues'])
+
+def get_data_version():
+    """当前数据集版本（内容哈希），缓存按版本区分，数据更新前一直有效"""
+    if dlt_data is None:
+        return 'empty'
+    return get_derived_data()['version']
+
+register_version_source(__name__, get_data_version)
+
+def get_request_window():
+    """根据请求参数 limit/offset/since_issue/until_issue 计算走势数据的行区间"""
+    window = parse_window_args(request.args)
+    if get_draw_count() == 0:
+        return 0, 0
+    return resolve_window(get_derived_data()['issue_numbers'], **window)
 
 # ==================== 新增的精确计算函数 ====================
 
@@ -115,7 +182,7 @@ def calculate_same_tail_groups(front_balls):
 def calculate_all_missed_periods(ball_type='front'):
     """
     计算所有号码在所有期的遗漏期数
-    使用从当前期往前查找的逻辑
+    基于遗漏值引擎单次正向遍历计算
     从未出现过的设为18
     
     Args:
@@ -124,72 +191,18 @@ def calculate_all_missed_periods(ball_type='front'):
     Returns:
         遗漏期数字典：{号码: {期索引: 遗漏值}}
     """
-    if dlt_data is None or len(dlt_data) == 0:
+    if get_draw_count() == 0:
         return {}
     
-    missed_periods = {}
-    data_count = len(dlt_data)
-    
-    # 初始化所有号码
-    if ball_type == 'front':
-        total_numbers = 35
-    else:  # back
-        total_numbers = 12
-    
-    for num in range(1, total_numbers + 1):
-        missed_periods[num] = {}
+    # 遗漏矩阵在数据加载后单次正向遍历得到
+    derived = get_derived_data()
+    missed_matrix = derived['front_missed'] if ball_type == 'front' else derived['back_missed']
     
-    # 对于每一期，计算每个号码的遗漏值
-    for current_index in range(data_count):
-        row = dlt_data.iloc[current_index]
-        
-        if ball_type == 'front':
-            # 获取当前期前区号码
-            current_balls = [
-                int(row['front1']), int(row['front2']), int(row['front3']),
-                int(row['front4']), int(row['front5'])
-            ]
-        else:  # back
-            # 获取当前期后区号码
-            current_balls = [
-                int(row['back1']), int(row['back2'])
-            ]
-        
-        # 计算每个号码的遗漏值
-        for num in range(1, total_numbers + 1):
-            found = False
-            
-            # 从当前期往前查找
-            for search_index in range(current_index, -1, -1):
-                search_row = dlt_data.iloc[search_index]
-                
-                if ball_type == 'front':
-                    # 检查前区
-                    search_balls = [
-                        int(search_row['front1']), int(search_row['front2']), int(search_row['front3']),
-                        int(search_row['front4']), int(search_row['front5'])
-                    ]
-                else:  # back
-                    # 检查后区
-                    search_balls = [
-                        int(search_row['back1']), int(search_row['back2'])
-                    ]
-                
-                if num in search_balls:
-                    # 找到最近一次出现
-                    missed_periods[num][current_index] = current_index - search_index
-                    found = True
-                    break
-            
-            if not found:
-                # 从未出现过，设为18
-                missed_periods[num][current_index] = 18
-    
-    return missed_periods
+    return omission_matrix_to_dict(missed_matrix)
 
 def calculate_missed_periods(ball_number, ball_type='front', current_index=0):
     """
-    计算号码的遗漏期数 - 使用从当前期往前查找的逻辑
+    计算号码的遗漏期数 - 基于号码出现位置索引二分查找，O(log 期数)
     
     Args:
         ball_number: 号码
@@ -199,36 +212,23 @@ def calculate_missed_periods(ball_number, ball_type='front', current_index=0):
     Returns:
         遗漏期数，如果从未出现过返回18
     """
-    if dlt_data is None or len(dlt_data) == 0:
+    if get_draw_count() == 0:
         return 18
     
-    if current_index >= len(dlt_data):
+    if current_index >= get_draw_count():
         return 18
     
-    # 从当前期往前查找
-    for search_index in range(current_index, -1, -1):
-        row = dlt_data.iloc[search_index]
-        
-        if ball_type == 'front':
-            # 检查前区
-            front_balls = [
-                int(row['front1']), int(row['front2']), int(row['front3']),
-                int(row['front4']), int(row['front5'])
-            ]
-            if ball_number in front_balls:
-                # 找到最近一次出现
-                return current_index - search_index
-        elif ball_type == 'back':
-            # 检查后区
-            back_balls = [
-                int(row['back1']), int(row['back2'])
-            ]
-            if ball_number in back_balls:
-                # 找到最近一次出现
-                return current_index - search_index
-    
-    # 从未出现过
-    return 18
+    try:
+        ball_number = int(ball_number)
+    except (TypeError, ValueError):
+        return NEVER_SEEN_MISSED
+    
+    if ball_type not in ('front', 'back'):
+        return NEVER_SEEN_MISSED
+    
+    # 在号码出现位置索引中二分查找当前期之前（含）最近一次出现
+    occurrences = get_derived_data()[f'{ball_type}_occurrences']
+    return occurrences.missed_at(ball_number, current_index)
 
 def get_ball_status_by_missed(missed_periods):
     """
@@ -311,7 +311,7 @@ def get_cold_warm_hot(numbers, ball_type='front', current_index=0):
     Returns:
         "hot_count:warm_count:cold_count"
     """
-    if not numbers or dlt_data is None or len(dlt_data) == 0:
+    if not numbers or get_draw_count() == 0:
         return "0:0:0"
     
     hot_count = 0
@@ -338,245 +338,134 @@ def calculate_repeat_and_adjacent_numbers_v2(current_balls, all_previous_data, c
     
     prev_balls = all_previous_data[current_index - 1]['balls']
     
+    current_mask = numbers_to_mask(current_balls)
+    prev_mask = numbers_to_mask(prev_balls)
+    
     # 重号：当前期号码在上期也出现过
-    repeat_numbers = set(current_balls) & set(prev_balls)
-    repeat_count = len(repeat_numbers)
+    repeat_count = bin(current_mask & prev_mask).count('1')
     
-    # 邻号：当前期号码与上期号码相差±1
-    adjacent_count = 0
-    for curr_ball in current_balls:
-        for prev_ball in prev_balls:
-            if abs(curr_ball - prev_ball) == 1:
-                adjacent_count += 1
-                break  # 每个号码只算一次（避免重复计数）
+    # 邻号：当前期号码与上期号码相差±1（每个号码只算一次）
+    adjacent_count = bin(current_mask & adjacent_mask(prev_mask)).count('1')
     
     return repeat_count, adjacent_count
 
 # ==================== 按照指定顺序的数据获取函数 ====================
 
-def get_front_basic_trend_data():
+def get_front_basic_trend_data(start=0, stop=None):
     """获取前区基本走势数据 - 严格按照指定顺序：'龙头', '凤尾', '和值', '跨度', 'AC值', '大小比', '质合比', '012路比', '区间比', '奇偶比', '连号', '同尾', '冷温热比', '重号', '邻号'"""
-    if dlt_data is None or len(dlt_data) == 0:
+    if get_draw_count() == 0:
         return {'data': [], 'total': 0}
     
-    data = []
+    derived = get_derived_data()
+    issues = derived['issues'][start:stop]
+    back_rows = derived['back_features'].balls[start:stop].tolist()
     
-    # 先收集所有数据以便计算重号和邻号
-    all_draw_data = []
-    for i, row in dlt_data.iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        all_draw_data.append({'issue': str(row['issue']), 'balls': front_balls})
+    # 各项参数均来自加载时构建的特征表
+    features = derived['front_features'].to_lists([
+        'balls', 'dragon_head', 'phoenix_tail', 'sum_value', 'span', 'ac_value',
+        'size_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio', 'odd_even_ratio',
+        'consecutive_desc', 'same_tail_desc', 'cold_warm_hot_ratio',
+        'repeat_count', 'adjacent_count'
+    ], start, stop)
     
-    # 逐条处理数据
-    for i, row in dlt_data.iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        
-        # 计算重号和邻号
-        repeat_count, adjacent_count = calculate_repeat_and_adjacent_numbers_v2(
-            front_balls, all_draw_data, i, 'front'
-        )
-        
-        # 按照指定顺序计算各项参数
-        # 1. 龙头
-        dragon_head = min(front_balls) if front_balls else 0
-        
-        # 2. 凤尾
-        phoenix_tail = max(front_balls) if front_balls else 0
-        
-        # 3. 和值
-        sum_value = sum(front_balls)
-        
-        # 4. 跨度
-        span_value = phoenix_tail - dragon_head
-        
-        # 5. AC值
-        ac_value = calculate_ac_value(front_balls)
-        
-        # 6. 大小比
-        size_ratio = calculate_size_ratio(front_balls)
-        
-        # 7. 质合比
-        prime_ratio = calculate_prime_ratio(front_balls)
-        
-        # 8. 012路比
-        road012_ratio = calculate_road012_ratio(front_balls)
-        
-        # 9. 区间比
-        zone_ratio = calculate_zone_ratio(front_balls)
-        
-        # 10. 奇偶比
-        odd_even_ratio = calculate_odd_even_ratio(front_balls)
-        
-        # 11. 连号
-        consecutive_groups = calculate_consecutive_groups(front_balls)
-        
-        # 12. 同尾
-        same_tail_groups = calculate_same_tail_groups(front_balls)
-        
-        # 13. 冷温热比 - 使用统一的遗漏值计算逻辑
-        cold_warm_hot_ratio = calculate_cold_warm_hot_ratio(front_balls, i, 'front')
-        
-        # 14. 重号
-        # repeat_count 已在前面计算
-        
-        # 15. 邻号
-        # adjacent_count 已在前面计算
-        
+    data = []
+    for i, front_balls in enumerate(features['balls']):
         # 构建符合前端期望的数据格式（保持原有字段名，但按指定顺序组织逻辑）
         data.append({
-            'issue': str(row['issue']),
+            'issue': issues[i],
             'front_balls': front_balls,
-            'back_balls': back_balls,
+            'back_balls': back_rows[i],
             # 按照指定顺序排列的统计参数
-            'dragon_head': dragon_head,           # 1. 龙头
-            'phoenix_tail': phoenix_tail,         # 2. 凤尾
-            'sum_value': sum_value,               # 3. 和值
-            'span': span_value,                   # 4. 跨度
-            'ac_value': ac_value,                 # 5. AC值
-            'size_ratio': size_ratio,             # 6. 大小比
-            'prime_ratio': prime_ratio,           # 7. 质合比
-            'road012_ratio': road012_ratio,       # 8. 012路比
-            'zone_ratio': zone_ratio,             # 9. 区间比
-            'odd_even_ratio': odd_even_ratio,     # 10. 奇偶比
-            'consecutive_desc': consecutive_groups, # 11. 连号
-            'same_tail_desc': same_tail_groups,   # 12. 同尾
-            'cold_warm_hot_ratio': cold_warm_hot_ratio, # 13. 冷温热比
-            'repeat_count': repeat_count,         # 14. 重号
-            'adjacent_count': adjacent_count      # 15. 邻号
+            'dragon_head': features['dragon_head'][i],           # 1. 龙头
+            'phoenix_tail': features['phoenix_tail'][i],         # 2. 凤尾
+            'sum_value': features['sum_value'][i],               # 3. 和值
+            'span': features['span'][i],                         # 4. 跨度
+            'ac_value': features['ac_value'][i],                 # 5. AC值
+            'size_ratio': features['size_ratio'][i],             # 6. 大小比
+            'prime_ratio': features['prime_ratio'][i],           # 7. 质合比
+            'road012_ratio': features['road012_ratio'][i],       # 8. 012路比
+            'zone_ratio': features['zone_ratio'][i],             # 9. 区间比
+            'odd_even_ratio': features['odd_even_ratio'][i],     # 10. 奇偶比
+            'consecutive_desc': features['consecutive_desc'][i], # 11. 连号
+            'same_tail_desc': features['same_tail_desc'][i],     # 12. 同尾
+            'cold_warm_hot_ratio': features['cold_warm_hot_ratio'][i], # 13. 冷温热比
+            'repeat_count': features['repeat_count'][i],         # 14. 重号（位掩码popcount）
+            'adjacent_count': features['adjacent_count'][i]      # 15. 邻号（位掩码popcount）
         })
     
     return {'data': data, 'total': len(data)}
 
-def get_back_basic_trend_data():
+def get_back_basic_trend_data(start=0, stop=None):
     """获取后区基本走势数据 - 严格按照指定顺序：'龙头', '凤尾', '和值', '跨度', '大小比', '质合比', '012路比', '区间比', '奇偶比', '冷温热比', '重号', '邻号'"""
-    if dlt_data is None or len(dlt_data) == 0:
+    if get_draw_count() == 0:
         return {'data': [], 'total': 0}
     
-    data = []
+    derived = get_derived_data()
+    issues = derived['issues'][start:stop]
+    front_rows = derived['front_features'].balls[start:stop].tolist()
     
-    # 先收集所有数据以便计算重号和邻号
-    all_back_draw_data = []
-    for i, row in dlt_data.iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        all_back_draw_data.append({'issue': str(row['issue']), 'balls': back_balls})
+    # 各项参数均来自加载时构建的特征表
+    features = derived['back_features'].to_lists([
+        'balls', 'dragon_head', 'phoenix_tail', 'sum_value', 'span',
+        'size_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio', 'odd_even_ratio',
+        'cold_warm_hot_ratio', 'repeat_count', 'adjacent_count'
+    ], start, stop)
     
-    # 逐条处理数据
-    for i, row in dlt_data.iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        
-        # 计算后区重号和邻号
-        repeat_count, adjacent_count = calculate_repeat_and_adjacent_numbers_v2(
-            back_balls, all_back_draw_data, i, 'back'
-        )
-
-        # 1. 龙头
-        dragon_head = min(back_balls) if back_balls else 0
-        
-        # 2. 凤尾
-        phoenix_tail = max(back_balls) if back_balls else 0
-        
-        # 3. 和值
-        sum_value = sum(back_balls)
-        
-        # 4. 跨度
-        span_value = max(back_balls) - min(back_balls) if back_balls else 0
-        
-        # 5. 大小比
-        size_ratio = calculate_size_ratio_back(back_balls)
-        
-        # 6. 质合比
-        prime_ratio = calculate_prime_ratio_back(back_balls)
-        
-        # 7. 012路比
-        road012_ratio = calculate_road012_ratio_back(back_balls)
-        
-        # 8. 区间比
-        zone_ratio = calculate_zone_ratio_back(back_balls)
-        
-        # 9. 奇偶比
-        odd_even_ratio = calculate_odd_even_ratio(back_balls)
-        
-        # 10. 冷温热比 - 使用统一的遗漏值计算逻辑
-        cold_warm_hot_ratio = calculate_cold_warm_hot_ratio(back_balls, i, 'back')
-        
-        # 11. 重号
-        # repeat_count 已在前面计算
-        
-        # 12. 邻号
-        # adjacent_count 已在前面计算
-        
+    data = []
+    for i, back_balls in enumerate(features['balls']):
         # 构建符合前端期望的数据格式
         data.append({
-            'issue': str(row['issue']),
-            'front_balls': front_balls,
+            'issue': issues[i],
+            'front_balls': front_rows[i],
             'back_balls': back_balls,
             # 按照指定顺序排列的统计参数
-            'dragon_head': dragon_head,              # 1. 龙头
-            'phoenix_tail': phoenix_tail,            # 2. 凤尾
-            'sum_value': sum_value,                  # 3. 和值
-            'span': span_value,                      # 4. 跨度
-            'size_ratio': size_ratio,                # 5. 大小比
-            'prime_ratio': prime_ratio,              # 6. 质合比
-            'road012_ratio': road012_ratio,          # 7. 012路比
-            'zone_ratio': zone_ratio,                # 8. 区间比
-            'odd_even_ratio': odd_even_ratio,        # 9. 奇偶比
-            'cold_warm_hot_ratio': cold_warm_hot_ratio, # 10. 冷温热比
-            'repeat_count': repeat_count,            # 11. 重号
-            'adjacent_count': adjacent_count         # 12. 邻号
+            'dragon_head': features['dragon_head'][i],              # 1. 龙头
+            'phoenix_tail': features['phoenix_tail'][i],            # 2. 凤尾
+            'sum_value': features['sum_value'][i],                  # 3. 和值
+            'span': features['span'][i],                            # 4. 跨度
+            'size_ratio': features['size_ratio'][i],                # 5. 大小比
+            'prime_ratio': features['prime_ratio'][i],              # 6. 质合比
+            'road012_ratio': features['road012_ratio'][i],          # 7. 012路比
+            'zone_ratio': features['zone_ratio'][i],                # 8. 区间比
+            'odd_even_ratio': features['odd_even_ratio'][i],        # 9. 奇偶比
+            'cold_warm_hot_ratio': features['cold_warm_hot_ratio'][i], # 10. 冷温热比
+            'repeat_count': features['repeat_count'][i],            # 11. 重号（位掩码popcount）
+            'adjacent_count': features['adjacent_count'][i]         # 12. 邻号（位掩码popcount）
         })
     
     return {'data': data, 'total': len(data)}
 
-def get_basic_trend_data():
+def get_basic_trend_data(start=0, stop=None):
     """获取基本走势数据（包含统计信息）"""
-    if dlt_data is None or len(dlt_data) == 0:
+    if get_draw_count() == 0:
         return {'data': [], 'total': 0}
     
+    derived = get_derived_data()
+    issues = derived['issues'][start:stop]
+    back_rows = derived['back_features'].balls[start:stop].tolist()
+    
+    # 前区统计指标来自特征表
+    features = derived['front_features'].to_lists([
+        'balls', 'dragon_head', 'phoenix_tail', 'sum_value', 'span', 'ac_value',
+        'size_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio', 'odd_even_ratio'
+    ], start, stop)
+    
     data = []
-    for i, row in dlt_data.iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        
-        # 计算前区统计指标
-        stats = calculate_statistics_for_api(front_balls)
-        
+    for i, front_balls in enumerate(features['balls']):
         data.append({
-            'issue': str(row['issue']),
+            'issue': issues[i],
             'front_balls': front_balls,
-            'back_balls': back_balls,
-            'dragon_head': min(front_balls) if front_balls else 0,
-            'phoenix_tail': max(front_balls) if front_balls else 0,
-            'sum_value': stats['sum'],
-            'span': stats['span'],
-            'ac_value': stats['ac_value'],
-            'size_ratio': stats['size_ratio'],
-            'prime_ratio': stats['prime_ratio'],
-            'road012_ratio': stats['road012_ratio'],
-            'zone_ratio': stats['zone_ratio'],
-            'odd_even_ratio': stats['odd_even_ratio']
-            
+            'back_balls': back_rows[i],
+            'dragon_head': features['dragon_head'][i],
+            'phoenix_tail': features['phoenix_tail'][i],
+            'sum_value': features['sum_value'][i],
+            'span': features['span'][i],
+            'ac_value': features['ac_value'][i],
+            'size_ratio': features['size_ratio'][i],
+            'prime_ratio': features['prime_ratio'][i],
+            'road012_ratio': features['road012_ratio'][i],
+            'zone_ratio': features['zone_ratio'][i],
+            'odd_even_ratio': features['odd_even_ratio'][i]
         })
     
     return {'data': data, 'total': len(data)}
@@ -659,476 +548,138 @@ def calculate_ac_value(numbers):
     
     return len(differences) - (len(numbers) - 1)
 
-def get_distribution_chart_data(chart_type):
-    """获取分布图数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 根据图表类型返回不同的数据
-    if chart_type == "dragonhead":
-        return get_dragonhead_data()
-    elif chart_type == "phoenixtail":
-        return get_phoenixtail_data()
-    elif chart_type == "sum":
-        return get_sum_data()
-    elif chart_type == "span":
-        return get_span_data()
-    elif chart_type == "ac_value":
-        return get_ac_value_data()
-    elif chart_type == "size_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "prime_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "road012_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "zone_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "odd_even_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "consecutive":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "same_tail":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "cold_warm_hot_ratio":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "repeat":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "adjacent":
-        return get_general_distribution_data(chart_type)
-    elif chart_type == "back_sum":
-        return get_back_sum_data()
-    elif chart_type == "back_span":
-        return get_back_span_data()
-    elif chart_type == "back_sizeratio":
-        return get_back_sizeratio_data()
-    elif chart_type == "back_primeratio":
-        return get_back_primeratio_data()
-    elif chart_type == "back_road012ratio":
-        return get_back_road012ratio_data()
-    elif chart_type == "back_zoneratio":
-        return get_back_zoneratio_data()
-    elif chart_type == "back_oddevenratio":
-        return get_back_oddevenratio_data()
-    elif chart_type == "back_coldwarmhotratio":
-        return get_back_coldwarmhotratio_data()
-    else:
-        return get_general_distribution_data(chart_type)
-
-# ==================== 前区分布图函数 ====================
-
-def get_dragonhead_data():
-    """获取龙头数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计龙头出现次数
-    dragonhead_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        if front_balls:
-            dragonhead = min(front_balls)
-            dragonhead_counts[dragonhead] = dragonhead_counts.get(dragonhead, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (dragonhead, count) in enumerate(sorted(dragonhead_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(dragonhead).zfill(2),
-            "value": count,
-            "category": dragonhead % 3
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": create_links_based_on_frequency(dragonhead_counts)
-    }
-
-def get_phoenixtail_data():
-    """获取凤尾数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计凤尾出现次数
-    phoenixtail_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        if front_balls:
-            phoenixtail = max(front_balls)
-            phoenixtail_counts[phoenixtail] = phoenixtail_counts.get(phoenixtail, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (phoenixtail, count) in enumerate(sorted(phoenixtail_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(phoenixtail).zfill(2),
-            "value": count,
-            "category": phoenixtail % 3
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": create_links_based_on_frequency(phoenixtail_counts)
-    }
-
-def get_sum_data():
-    """获取和值数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计和值出现次数
-    sum_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        if front_balls:
-            sum_value = sum(front_balls)
-            sum_counts[sum_value] = sum_counts.get(sum_value, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (sum_val, count) in enumerate(sorted(sum_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(sum_val),
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_span_data():
-    """获取跨度数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计跨度出现次数
-    span_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        if front_balls:
-            span = max(front_balls) - min(front_balls)
-            span_counts[span] = span_counts.get(span, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (span, count) in enumerate(sorted(span_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(span),
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_ac_value_data():
-    """获取AC值数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计AC值出现次数
-    ac_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        front_balls = [
-            int(row['front1']), int(row['front2']), int(row['front3']),
-            int(row['front4']), int(row['front5'])
-        ]
-        if front_balls:
-            ac_value = calculate_ac_value(front_balls)
-            ac_counts[ac_value] = ac_counts.get(ac_value, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (ac_value, count) in enumerate(sorted(ac_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": f"AC{ac_value}",
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-# ==================== 后区分布图函数 ====================
-
-def get_back_sum_data():
-    """获取后区和值数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区和值出现次数
-    sum_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            sum_value = sum(back_balls)
-            sum_counts[sum_value] = sum_counts.get(sum_value, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (sum_val, count) in enumerate(sorted(sum_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(sum_val),
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_span_data():
-    """获取后区跨度数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区跨度出现次数
-    span_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            span = max(back_balls) - min(back_balls)
-            span_counts[span] = span_counts.get(span, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (span, count) in enumerate(sorted(span_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": str(span),
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_sizeratio_data():
-    """获取后区大小比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区大小比出现次数
-    size_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            size_ratio = calculate_size_ratio_back(back_balls)
-            size_counts[size_ratio] = size_counts.get(size_ratio, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (size_ratio, count) in enumerate(sorted(size_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": size_ratio,
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_primeratio_data():
-    """获取后区质合比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区质合比出现次数
-    prime_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            prime_ratio = calculate_prime_ratio_back(back_balls)
-            prime_counts[prime_ratio] = prime_counts.get(prime_ratio, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (prime_ratio, count) in enumerate(sorted(prime_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": prime_ratio,
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_road012ratio_data():
-    """获取后区012路比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区012路比出现次数
-    road_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            road012_ratio = calculate_road012_ratio_back(back_balls)
-            road_counts[road012_ratio] = road_counts.get(road012_ratio, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (road012_ratio, count) in enumerate(sorted(road_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": road012_ratio,
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_zoneratio_data():
-    """获取后区区间比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
-    
-    # 统计后区区间比出现次数
-    zone_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            zone_ratio = calculate_zone_ratio_back(back_balls)
-            zone_counts[zone_ratio] = zone_counts.get(zone_ratio, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (zone_ratio, count) in enumerate(sorted(zone_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": zone_ratio,
-            "value": count,
-            "category": 0
-        })
+# 分布图定义：图表类型 -> 号码区、取值（由特征表得到）、节点名称、分类与是否固定分箱
+# 固定分箱的图表保留计数为0的分箱，其余只列出窗口内出现过的取值
+DISTRIBUTION_CHARTS = {
+    # 前区
+    'dragonhead': {'area': 'front', 'values': lambda f: f['dragon_head'],
+                   'name': lambda v: str(v).zfill(2), 'category': lambda v, i: v % 3, 'links': True},
+    'phoenixtail': {'area': 'front', 'values': lambda f: f['phoenix_tail'],
+                    'name': lambda v: str(v).zfill(2), 'category': lambda v, i: v % 3, 'links': True},
+    'sum': {'area': 'front', 'values': lambda f: f['sum_value']},
+    'span': {'area': 'front', 'values': lambda f: f['span']},
+    'ac_value': {'area': 'front', 'values': lambda f: f['ac_value'], 'name': lambda v: f"AC{v}"},
+    'size_ratio': {'area': 'front', 'values': lambda f: f['size_ratio']},
+    'prime_ratio': {'area': 'front', 'values': lambda f: f['prime_ratio']},
+    'road012_ratio': {'area': 'front', 'values': lambda f: f['road012_ratio']},
+    'zone_ratio': {'area': 'front', 'values': lambda f: f['zone_ratio']},
+    'odd_even_ratio': {'area': 'front', 'values': lambda f: f['odd_even_ratio']},
+    'consecutive': {'area': 'front', 'values': lambda f: f['consecutive_desc']},
+    'same_tail': {'area': 'front', 'values': lambda f: f['same_tail_desc']},
+    'cold_warm_hot_ratio': {'area': 'front', 'values': lambda f: f['cold_warm_hot_ratio']},
+    'repeat': {'area': 'front', 'values': lambda f: f['repeat_count'], 'skip_first': True},
+    'adjacent': {'area': 'front', 'values': lambda f: f['adjacent_count'], 'skip_first': True},
+    # 后区
+    'back_dragonhead': {'area': 'back', 'values': lambda f: f['dragon_head'],
+                        'name': lambda v: str(v).zfill(2), 'category': lambda v, i: v % 3, 'links': True},
+    'back_phoenixtail': {'area': 'back', 'values': lambda f: f['phoenix_tail'],
+                         'name': lambda v: str(v).zfill(2), 'category': lambda v, i: v % 3, 'links': True},
+    'back_sum': {'area': 'back', 'values': lambda f: f['sum_value']},
+    'back_span': {'area': 'back', 'values': lambda f: f['span']},
+    'back_sizeratio': {'area': 'back', 'values': lambda f: f['size_ratio']},
+    'back_primeratio': {'area': 'back', 'values': lambda f: f['prime_ratio']},
+    'back_road012ratio': {'area': 'back', 'values': lambda f: f['road012_ratio']},
+    'back_zoneratio': {'area': 'back', 'values': lambda f: f['zone_ratio']},
+    'back_oddevenratio': {'area': 'back', 'values': lambda f: f['odd_even_ratio']},
+    'back_coldwarmhotratio': {'area': 'back', 'values': lambda f: f['cold_warm_hot_ratio']},
+    'back_repeat': {'area': 'back', 'values': lambda f: f['repeat_count'], 'skip_first': True},
+    'back_adjacent': {'area': 'back', 'values': lambda f: f['adjacent_count'], 'skip_first': True},
+}
+
+def get_distribution_index(chart_type, derived=None):
+    """获取图表类型对应的前缀计数表（每份数据按需构建一次，derived 缺省为当前派生数据）"""
+    derived = derived if derived is not None else get_derived_data()
+    indexes = derived.setdefault('distributions', {})
+    if chart_type not in indexes:
+        spec = DISTRIBUTION_CHARTS[chart_type]
+        features = derived[f"{spec['area']}_features"]
+        values = spec['values'](features)
+        valid = None
+        if spec.get('skip_first'):
+            # 第一期没有上期可比较，不计入分布
+            valid = np.arange(len(values)) > 0
+        indexes[chart_type] = DistributionIndex(values, spec.get('bins'), valid)
+    return indexes[chart_type]
+
+def get_group_counter(group_size, derived=None, directory=None):
+    """
+    获取前区{group_size}码组合的共现计数（每份数据按需构建一次）
+    给出快照目录时按数据版本从目录加载，不存在则构建后保存，其他进程与下次启动直接加载
+    """
+    derived = derived if derived is not None else get_derived_data()
+    counters = derived.setdefault('group_counters', {})
+    if group_size not in counters:
+        counters[group_size] = GroupCooccurrence.load_or_build(
+            derived['front_features'].balls, group_size, directory, 'dlt_front', derived['version'])
+    return counters[group_size]
+
+# 全组合特征表与开奖数据无关，进程内只加载一次（内存映射）
+_combination_space = None
+
+def get_combination_space():
+    """获取前区全组合特征表，首次使用时从快照目录映射，不存在则构建"""
+    global _combination_space
+    if _combination_space is None:
+        directory = snapshot_directory(current_app.config['DLT_DATA_PATH'])
+        _combination_space = CombinationSpace.load_or_build('dlt_front', directory)
+    return _combination_space
+
+def get_latest_missed_vector():
+    """前区各号码在最新一期的遗漏值（组合过滤的遗漏条件使用），暂无数据时返回None"""
+    if get_draw_count() == 0:
+        return None
+    return get_derived_data()['front_occurrences'].missed_vector(get_draw_count() - 1)
+
+def get_ticket_checker():
+    """获取兑奖器（每份数据构建一次）"""
+    derived = get_derived_data()
+    if 'ticket_checker' not in derived:
+        derived['ticket_checker'] = TicketChecker('dlt', derived['front_features']['bitmask'],
+                                                  derived['back_features']['bitmask'], derived['issues'])
+    return derived['ticket_checker']
+
+def get_backtest_context():
+    """获取回测用的只读数据（每份数据构建一次）"""
+    derived = get_derived_data()
+    if 'backtest_context' not in derived:
+        derived['backtest_context'] = build_backtest_context('dlt', {
+            'front': {'balls': derived['front_features'].balls, 'missed': derived['front_missed']},
+            'back': {'balls': derived['back_features'].balls, 'missed': derived['back_missed']}
+        }, derived['front_features'].columns, derived['issues'])
+    return derived['backtest_context']
+
+def get_distribution_chart_data(chart_type, start=None, stop=None):
+    """
+    获取分布图数据
     
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_oddevenratio_data():
-    """获取后区奇偶比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
+    Args:
+        chart_type: 图表类型，见 DISTRIBUTION_CHARTS
+        start, stop: 统计窗口 [start, stop)，均为None时统计最近 DEFAULT_DISTRIBUTION_WINDOW 期
+    """
+    if get_draw_count() == 0 or chart_type not in DISTRIBUTION_CHARTS:
         return {"nodes": [], "links": []}
     
-    # 统计后区奇偶比出现次数
-    odd_even_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            odd_even_ratio = calculate_odd_even_ratio(back_balls)
-            odd_even_counts[odd_even_ratio] = odd_even_counts.get(odd_even_ratio, 0) + 1
-    
-    # 转换为节点格式
-    nodes = []
-    for i, (odd_even_ratio, count) in enumerate(sorted(odd_even_counts.items())):
-        nodes.append({
-            "id": f"node_{i}",
-            "name": odd_even_ratio,
-            "value": count,
-            "category": 0
-        })
-    
-    return {
-        "nodes": nodes,
-        "links": []
-    }
-
-def get_back_coldwarmhotratio_data():
-    """获取后区冷温热比数据"""
-    if dlt_data is None or len(dlt_data) == 0:
-        return {"nodes": [], "links": []}
+    if start is None and stop is None:
+        start, stop = max(get_draw_count() - DEFAULT_DISTRIBUTION_WINDOW, 0), get_draw_count()
     
-    # 统计后区冷温热比出现次数
-    cwh_counts = {}
-    for _, row in dlt_data.head(100).iterrows():
-        back_balls = [
-            int(row['back1']), int(row['back2'])
-        ]
-        if back_balls:
-            cwh_ratio = calculate_cold_warm_hot_ratio(back_balls, 0, 'back')
-            cwh_counts[cwh_ratio] = cwh_counts.get(cwh_ratio, 0) + 1
+    spec = DISTRIBUTION_CHARTS[chart_type]
+    counts = get_distribution_index(chart_type).to_dict(start or 0, stop, keep_empty='bins' in spec)
     
     # 转换为节点格式
+    name = spec.get('name', str)
+    category = spec.get('category', (lambda v, i: i) if 'bins' in spec else (lambda v, i: 0))
     nodes = []
-    for i, (cwh_ratio, count) in enumerate(sorted(cwh_counts.items())):
+    for i, (value, count) in enumerate(counts.items()):
         nodes.append({
             "id": f"node_{i}",
-            "name": cwh_ratio,
+            "name": name(value),
             "value": count,
-            "category": 0
+            "category": category(value, i)
         })
     
     return {
         "nodes": nodes,
-        "links": []
-    }
-
-def get_general_distribution_data(chart_type):
-    """获取通用分布数据"""
-    return {
-        "nodes": [
-            {"id": "node_0", "name": "数据1", "value": 100, "category": 0},
-            {"id": "node_1", "name": "数据2", "value": 80, "category": 0},
-            {"id": "node_2", "name": "数据3", "value": 60, "category": 1},
-            {"id": "node_3", "name": "数据4", "value": 40, "category": 1},
-            {"id": "node_4", "name": "数据5", "value": 20, "category": 2}
-        ],
-        "links": [
-            {"source": "node_0", "target": "node_1"},
-            {"source": "node_0", "target": "node_2"},
-            {"source": "node_1", "target": "node_3"},
-            {"source": "node_2", "target": "node_4"}
-        ]
+        "links": create_links_based_on_frequency(counts) if spec.get('links') else []
     }
 
 def create_links_based_on_frequency(counts):
@@ -1356,13 +907,13 @@ def find_same_tail_numbers(numbers):
 # ==================== DLT 页面路由定义 ====================
 
 @dlt_page_bp.route('/')
-@cached(timeout=60)
+@cached(vary_on=[])
 def index():
     """大乐透主页"""
     return render_template('dlt/base.html', chart_name="大乐透分析")
 
 @dlt_page_bp.route('/trends/front-basic')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_basic_trend_page():
     """前区基本走势图页面 - 参数顺序：'龙头', '凤尾', '和值', '跨度', 'AC值', '大小比', '质合比', '012路比', '区间比', '奇偶比', '连号', '同尾', '冷温热比', '重号', '邻号'"""
     print("=== 进入front_basic_trend_page函数 ===")
@@ -1395,11 +946,11 @@ def front_basic_trend_page():
         
     except Exception as e:
         print(f"!!! 模板渲染错误: {e}")
-        return f"<h1>错误: {str(e)}</h1>"
+        return f"<h1>错误: {str(e)}</h1>", 500
 
 # 前区页面路由（按照指定顺序）
 @dlt_page_bp.route('/trends/dragonhead')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_dragonhead_page():
     """前区龙头 - 第1个参数"""
     chart_data = get_distribution_chart_data("dragonhead")
@@ -1410,7 +961,7 @@ def front_dragonhead_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/phoenixtail')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_phoenixtail_page():
     """前区凤尾 - 第2个参数"""
     chart_data = get_distribution_chart_data("phoenixtail")
@@ -1421,7 +972,7 @@ def front_phoenixtail_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/sum')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_sum_page():
     """前区和值 - 第3个参数"""
     chart_data = get_distribution_chart_data("sum")
@@ -1432,7 +983,7 @@ def front_sum_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/span')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_span_page():
     """前区跨度 - 第4个参数"""
     chart_data = get_distribution_chart_data("span")
@@ -1443,7 +994,7 @@ def front_span_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/acvalue')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_acvalue_page():
     """前区AC值 - 第5个参数"""
     chart_data = get_distribution_chart_data("ac_value")
@@ -1454,7 +1005,7 @@ def front_acvalue_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/size-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_sizeratio_page():
     """前区大小比 - 第6个参数"""
     chart_data = get_distribution_chart_data("size_ratio")
@@ -1465,7 +1016,7 @@ def front_sizeratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/prime-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_primeratio_page():
     """前区质合比 - 第7个参数"""
     chart_data = get_distribution_chart_data("prime_ratio")
@@ -1476,7 +1027,7 @@ def front_primeratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/road012-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_road012ratio_page():
     """前区012路比 - 第8个参数"""
     chart_data = get_distribution_chart_data("road012_ratio")
@@ -1487,7 +1038,7 @@ def front_road012ratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/zone-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_zoneratio_page():
     """前区区间比 - 第9个参数"""
     chart_data = get_distribution_chart_data("zone_ratio")
@@ -1498,7 +1049,7 @@ def front_zoneratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/odd-even-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_oddevenratio_page():
     """前区奇偶比 - 第10个参数"""
     chart_data = get_distribution_chart_data("odd_even_ratio")
@@ -1509,7 +1060,7 @@ def front_oddevenratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/consecutive')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_consecutive_page():
     """前区连号 - 第11个参数"""
     chart_data = get_distribution_chart_data("consecutive")
@@ -1520,7 +1071,7 @@ def front_consecutive_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/same-tail')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_sametail_page():
     """前区同尾 - 第12个参数"""
     chart_data = get_distribution_chart_data("same_tail")
@@ -1531,7 +1082,7 @@ def front_sametail_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/cold-warm-hot-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_coldwarmhotratio_page():
     """前区冷温热比 - 第13个参数"""
     chart_data = get_distribution_chart_data("cold_warm_hot_ratio")
@@ -1542,7 +1093,7 @@ def front_coldwarmhotratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/repeat')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_repeat_page():
     """前区重号 - 第14个参数"""
     chart_data = get_distribution_chart_data("repeat")
@@ -1553,7 +1104,7 @@ def front_repeat_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/adjacent')
-@cached(timeout=60)
+@cached(vary_on=[])
 def front_adjacent_page():
     """前区邻号 - 第15个参数"""
     chart_data = get_distribution_chart_data("adjacent")
@@ -1565,7 +1116,7 @@ def front_adjacent_page():
 
 # 后区页面路由
 @dlt_page_bp.route('/trends/back-basic')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_basic_page():
     """后区基本走势图 - 参数顺序：'龙头', '凤尾', '和值', '跨度', '大小比', '质合比', '012路比', '区间比', '奇偶比', '冷温热比', '重号', '邻号'"""
     data = get_back_basic_trend_data()
@@ -1577,7 +1128,7 @@ def back_basic_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-dragonhead')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_dragonhead_page():
     """后区龙头 - 第1个参数"""
     chart_data = get_distribution_chart_data("back_dragonhead")
@@ -1588,7 +1139,7 @@ def back_dragonhead_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-phoenixtail')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_phoenixtail_page():
     """后区凤尾 - 第2个参数"""
     chart_data = get_distribution_chart_data("back_phoenixtail")
@@ -1599,7 +1150,7 @@ def back_phoenixtail_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-sum')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_sum_page():
     """后区和值 - 第3个参数"""
     chart_data = get_distribution_chart_data("back_sum")
@@ -1610,7 +1161,7 @@ def back_sum_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-span')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_span_page():
     """后区跨度 - 第4个参数"""
     chart_data = get_distribution_chart_data("back_span")
@@ -1621,7 +1172,7 @@ def back_span_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-size-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_sizeratio_page():
     """后区大小比 - 第5个参数"""
     chart_data = get_distribution_chart_data("back_sizeratio")
@@ -1632,7 +1183,7 @@ def back_sizeratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-prime-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_primeratio_page():
     """后区质合比 - 第6个参数"""
     chart_data = get_distribution_chart_data("back_primeratio")
@@ -1643,7 +1194,7 @@ def back_primeratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-road012-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_road012ratio_page():
     """后区012路比 - 第7个参数"""
     chart_data = get_distribution_chart_data("back_road012ratio")
@@ -1654,7 +1205,7 @@ def back_road012ratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-zone-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_zoneratio_page():
     """后区区间比 - 第8个参数"""
     chart_data = get_distribution_chart_data("back_zoneratio")
@@ -1665,7 +1216,7 @@ def back_zoneratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-odd-even-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_oddevenratio_page():
     """后区奇偶比 - 第9个参数"""
     chart_data = get_distribution_chart_data("back_oddevenratio")
@@ -1676,7 +1227,7 @@ def back_oddevenratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-cold-warm-hot-ratio')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_coldwarmhotratio_page():
     """后区冷温热比 - 第10个参数"""
     chart_data = get_distribution_chart_data("back_coldwarmhotratio")
@@ -1687,10 +1238,10 @@ def back_coldwarmhotratio_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-repeat')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_repeat_page():
     """后区重号 - 第11个参数"""
-    chart_data = get_distribution_chart_data("repeat")
+    chart_data = get_distribution_chart_data("back_repeat")
     return render_template('dlt/back_repeat.html', 
                           chart_name="后区重号",
                           chart_data=chart_data,
@@ -1698,10 +1249,10 @@ def back_repeat_page():
                           get_ball_status_by_missed=get_ball_status_by_missed)
 
 @dlt_page_bp.route('/trends/back-adjacent')
-@cached(timeout=60)
+@cached(vary_on=[])
 def back_adjacent_page():
     """后区邻号 - 第12个参数"""
-    chart_data = get_distribution_chart_data("adjacent")
+    chart_data = get_distribution_chart_data("back_adjacent")
     return render_template('dlt/back_adjacent.html', 
                           chart_name="后区邻号",
                           chart_data=chart_data,
@@ -1711,21 +1262,40 @@ def back_adjacent_page():
 # ==================== DLT API 路由定义 ====================
 
 @dlt_api_bp.route('/basic-trend')
-@cached(timeout=60)
+@cached_json(vary_on=WINDOW_ARGS)
 def api_basic_trend():
-    """API: 获取基本走势数据"""
-    data = get_basic_trend_data()
+    """API: 获取基本走势数据，支持 limit/offset/since_issue/until_issue 窗口参数"""
+    try:
+        start, stop = get_request_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    data = get_basic_trend_data(start, stop)
+    data['start'] = start
+    data['history_total'] = get_draw_count()
     return jsonify(data)
 
 @dlt_api_bp.route('/distribution/<chart_type>')
-@cached(timeout=300)
+@cached_json(vary_on=WINDOW_ARGS)
 def api_distribution(chart_type):
-    """API: 获取分布图数据"""
-    data = get_distribution_chart_data(chart_type)
+    """
+    API: 获取分布图数据
+    统计窗口由 limit/offset/since_issue/until_issue 指定（limit=all 为全部历史），缺省为最近100期
+    """
+    if chart_type not in DISTRIBUTION_CHARTS:
+        return jsonify({'error': '未知的图表类型'}), 404
+    
+    start = stop = None
+    if any(name in request.args for name in WINDOW_ARGS):
+        try:
+            start, stop = get_request_window()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    data = get_distribution_chart_data(chart_type, start, stop)
     return jsonify(data)
 
 @dlt_api_bp.route('/front-trend')
-@cached(timeout=60)
+@cached_json(vary_on=[])
 def api_front_trend():
     """API: 获取前区走势数据（供JavaScript使用）"""
     data = get_front_basic_trend_data()
@@ -1735,8 +1305,37 @@ def api_front_trend():
         'total': data['total']
     })
 
+@dlt_api_bp.route('/missed')
+@cached_json(vary_on=['type', 'index'])
+def api_missed_all():
+    """API: 批量获取指定期全部号码的遗漏数据（index 缺省为最新一期）"""
+    ball_type = request.args.get('type', 'front')
+    current_index = request.args.get('index', type=int)
+    
+    if ball_type not in ['front', 'back']:
+        return jsonify({'error': '无效的球类型'}), 400
+    if get_draw_count() == 0:
+        return jsonify({'error': '暂无数据'}), 404
+    
+    if current_index is None:
+        current_index = get_draw_count() - 1
+    if not 0 <= current_index < get_draw_count():
+        return jsonify({'error': '期索引超出范围'}), 400
+    
+    derived = get_derived_data()
+    missed = derived[f'{ball_type}_occurrences'].missed_vector(current_index).tolist()
+    
+    return jsonify({
+        'ball_type': ball_type,
+        'index': current_index,
+        'issue': derived['issues'][current_index],
+        'numbers': list(range(1, len(missed) + 1)),
+        'missed_periods': missed,
+        'status': [get_ball_status_by_missed(m) for m in missed]
+    })
+
 @dlt_api_bp.route('/missed/<int:ball_number>')
-@cached(timeout=60)
+@cached_json(vary_on=['type', 'index'])
 def api_missed(ball_number):
     """API: 获取号码遗漏数据"""
     ball_type = request.args.get('type', 'front')
@@ -1757,7 +1356,7 @@ def api_missed(ball_number):
     })
 
 @dlt_api_bp.route('/cold-warm-hot')
-@cached(timeout=60)
+@cached_json(vary_on=['type', 'index'])
 def api_cold_warm_hot():
     """API: 获取冷温热统计"""
     ball_type = request.args.get('type', 'front')
@@ -1783,23 +1382,437 @@ def api_cold_warm_hot():
     })
 
 @dlt_api_bp.route('/front-basic-trend')
-@cached(timeout=60)
+@cached_json(vary_on=WINDOW_ARGS)
 def api_front_basic_trend():
-    """API: 获取前区基本走势数据（用于JavaScript）"""
-    data_result = get_front_basic_trend_data()
+    """API: 获取前区基本走势数据（用于JavaScript），支持 limit/offset/since_issue/until_issue 窗口参数"""
+    try:
+        start, stop = get_request_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    data_result = get_front_basic_trend_data(start, stop)
     return jsonify({
         'success': True,
         'data': data_result['data'],
-        'total': data_result['total']
+        'total': data_result['total'],
+        'start': start,
+        'history_total': get_draw_count()
     })
 
 @dlt_api_bp.route('/back-basic-trend')
-@cached(timeout=60)
+@cached_json(vary_on=WINDOW_ARGS)
 def api_back_basic_trend():
-    """API: 获取后区基本走势数据（用于JavaScript）"""
-    data_result = get_back_basic_trend_data()
+    """API: 获取后区基本走势数据（用于JavaScript），支持 limit/offset/since_issue/until_issue 窗口参数"""
+    try:
+        start, stop = get_request_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    data_result = get_back_basic_trend_data(start, stop)
     return jsonify({
         'success': True,
         'data': data_result['data'],
-        'total': data_result['total']
-    })
\ No newline at end of file
+        'total': data_result['total'],
+        'start': start,
+        'history_total': get_draw_count()
+    })
+
+@dlt_api_bp.route('/cooccurrence')
+@cached_json(vary_on=WINDOW_ARGS + ['type', 'top', 'format'])
+def api_cooccurrence():
+    """
+    API: 号码对共现统计（type: front / back）
+    format=matrix 返回完整共现矩阵，否则返回共现次数最多的 top 个号码对（默认20，最多1000）；
+    统计窗口由 limit/offset/since_issue/until_issue 指定，缺省为全部历史
+    """
+    ball_type = request.args.get('type', 'front')
+    
+    if ball_type not in ['front', 'back']:
+        return jsonify({'error': '无效的球类型'}), 400
+    if get_draw_count() == 0:
+        return jsonify({'error': '暂无数据'}), 404
+    
+    try:
+        top = parse_top_arg(request.args)
+        start, stop = get_request_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    cooccurrence = get_derived_data()[f'{ball_type}_cooccurrence']
+    result = {
+        'ball_type': ball_type,
+        'start': start,
+        'stop': stop
+    }
+    if request.args.get('format') == 'matrix':
+        result['numbers'] = list(range(1, cooccurrence.max_number + 1))
+        result['matrix'] = cooccurrence.matrix(start, stop).tolist()
+    else:
+        result['pairs'] = [
+            {'numbers': [a, b], 'count': count}
+            for a, b, count in cooccurrence.top_pairs(top, start, stop)
+        ]
+    return jsonify(result)
+
+@dlt_api_bp.route('/groups')
+@cached_json(vary_on=['size', 'top', 'numbers'])
+def api_groups():
+    """
+    API: 前区3码、4码组合同期出现次数
+    size=3|4；指定 numbers（逗号分隔）时返回该组合的次数，否则返回出现次数最多的 top 个组合（默认20，最多1000）
+    """
+    group_size = request.args.get('size', 3, type=int)
+    numbers_arg = request.args.get('numbers')
+    
+    if group_size not in (3, 4):
+        return jsonify({'error': '组合大小只支持3或4'}), 400
+    try:
+        top = parse_top_arg(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if get_draw_count() == 0:
+        return jsonify({'error': '暂无数据'}), 404
+    
+    counter = get_group_counter(group_size)
+    result = {'ball_type': 'front', 'size': group_size, 'draws': counter.draw_count}
+    
+    if numbers_arg:
+        try:
+            numbers = sorted(int(n) for n in numbers_arg.split(','))
+        except ValueError:
+            return jsonify({'error': '号码格式错误'}), 400
+        if len(numbers) != group_size or len(set(numbers)) != group_size:
+            return jsonify({'error': f'需要{group_size}个不同的号码'}), 400
+        result['numbers'] = numbers
+        result['count'] = counter.count(numbers)
+    else:
+        result['groups'] = [
+            {'numbers': numbers, 'count': count}
+            for numbers, count in counter.top(top)
+        ]
+    return jsonify(result)
+
+@dlt_api_bp.route('/filter', methods=['POST'])
+def api_filter():
+    """
+    API: 在前区全部组合中按条件过滤
+    请求体为JSON：{"criteria": {...}, "limit": 100, "offset": 0}，
+    criteria 支持 sum_value/span/ac_value/missed_sum 范围、各类比值列表、连号/同尾形态、include/exclude 号码，
+    遗漏类条件按最新一期的遗漏值计算
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '请求体必须为JSON对象'}), 400
+    criteria = payload.get('criteria') or {}
+    limit = payload.get('limit', 100)
+    offset = payload.get('offset', 0)
+    if not isinstance(criteria, dict):
+        return jsonify({'error': 'criteria 必须为对象'}), 400
+    if not isinstance(limit, int) or not isinstance(offset, int) or limit < 0 or offset < 0:
+        return jsonify({'error': 'limit/offset 必须为非负整数'}), 400
+    
+    missed_vector = get_latest_missed_vector()
+    if missed_vector is None and ('missed_sum' in criteria or 'cold_warm_hot_ratio' in criteria):
+        return jsonify({'error': '暂无数据，无法按遗漏过滤'}), 404
+    
+    space = get_combination_space()
+    try:
+        rows = space.filter(criteria, missed_vector,
+                            processes=current_app.config.get('COMBINATION_FILTER_PROCESSES', 0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'ball_type': 'front',
+        'total': int(len(rows)),
+        'space_size': len(space),
+        'offset': offset,
+        'combinations': space.combinations_at(rows[offset:offset + limit])
+    })
+
+@dlt_api_bp.route('/check', methods=['POST'])
+def api_check_tickets():
+    """
+    API: 批量兑奖，结果以 NDJSON 流式返回（单期兑奖时首行为期号，之后每注一行，最后一行为汇总）
+    票据通过 multipart 字段 file 上传或直接作为请求体，每行一注单式号码；
+    issue 指定期号（缺省为最新一期），scope=history 时对全部历史兑奖（可用 limit/offset/since_issue/until_issue 限定期数）
+    """
+    if get_draw_count() == 0:
+        return jsonify({'error': '暂无数据'}), 404
+    
+    derived = get_derived_data()
+    index, start, stop = None, 0, None
+    if request.args.get('scope') == 'history':
+        try:
+            start, stop = get_request_window()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        issue = request.args.get('issue')
+        if issue is None:
+            index = get_draw_count() - 1
+        elif issue in derived['issues']:
+            index = derived['issues'].index(issue)
+        else:
+            return jsonify({'error': '期号不存在'}), 404
+    
+    # 视图返回后请求中的上传文件即被关闭，先转存到临时文件（超过1MB落盘）再流式读取
+    upload = request.files.get('file')
+    if upload is None and request.mimetype == 'multipart/form-data':
+        # multipart 请求体已被表单解析读完，不能再作为票据读取
+        return jsonify({'error': '缺少上传文件字段 file'}), 400
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    shutil.copyfileobj(upload.stream if upload is not None else request.stream, spool)
+    spool.seek(0)
+    checker = get_ticket_checker()
+    
+    def generate():
+        with spool:
+            if index is not None:
+                yield json.dumps({'issue': derived['issues'][index]}, ensure_ascii=False) + '\n'
+            # 每1000条结果合并为一次写出，减少逐行写出的开销
+            buffer = []
+            for record in checker.iter_results(iter_ticket_chunks(spool, 'dlt'), index, start, stop):
+                buffer.append(json.dumps(record, ensure_ascii=False))
+                if len(buffer) >= 1000:
+                    yield '\n'.join(buffer) + '\n'
+                    buffer = []
+            if buffer:
+                yield '\n'.join(buffer) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@dlt_api_bp.route('/backtest', methods=['POST'])
+def api_backtest():
+    """
+    API: 选号策略回测
+    请求体为JSON：{"strategies": [{"name": ..., "front": {...}, "back": {...}}], "horizon": 1,
+    "limit"/"offset"/"since_issue"/"until_issue": 选号期窗口}，策略格式见 utils.backtest.validate_strategy
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '请求体必须为JSON对象'}), 400
+    strategies = payload.get('strategies')
+    horizon = payload.get('horizon', 1)
+    if not isinstance(strategies, list) or not strategies:
+        return jsonify({'error': 'strategies 必须为非空列表'}), 400
+    if not isinstance(horizon, int) or not 1 <= horizon <= 100:
+        return jsonify({'error': 'horizon 必须为1~100的整数'}), 400
+    if get_draw_count() < 2:
+        return jsonify({'error': '暂无数据'}), 404
+    
+    try:
+        window = parse_window_args({k: str(v) for k, v in payload.items() if k in WINDOW_ARGS})
+        start, stop = resolve_window(get_derived_data()['issue_numbers'], **window)
+        results = run_backtest(get_backtest_context(), strategies, start, stop, horizon,
+                               processes=current_app.config.get('BACKTEST_PROCESSES', 0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'start': start,
+        'stop': stop,
+        'horizon': horizon,
+        'results': results
+    })
+
+# ==================== 后台任务 ====================
+# 耗时分析通过 /api/v1/jobs 提交到后台执行，任务函数在应用上下文中运行
+
+def validate_filter_job(params):
+    if not isinstance(params.get('criteria', {}), dict):
+        raise ValueError('criteria 必须为对象')
+    limit = params.get('limit', 1000)
+    if not isinstance(limit, int) or not 0 <= limit <= 100000:
+        raise ValueError('limit 必须为0~100000的整数')
+
+def run_filter_job(params, job):
+    """后台任务：前区全组合过滤，按行分块求值并汇报进度"""
+    space = get_combination_space()
+    compiled = space.compile_criteria(params.get('criteria') or {})
+    missed_vector = get_latest_missed_vector()
+    chunk_size = 131072
+    parts = []
+    for start in range(0, len(space), chunk_size):
+        job.check_cancelled()
+        parts.append(space.evaluate(compiled, start, min(start + chunk_size, len(space)), missed_vector))
+        job.report(min(start + chunk_size, len(space)), len(space))
+    rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    return {
+        'ball_type': 'front',
+        'total': int(len(rows)),
+        'space_size': len(space),
+        'combinations': space.combinations_at(rows[:params.get('limit', 1000)])
+    }
+
+def validate_backtest_job(params):
+    strategies = params.get('strategies')
+    if not isinstance(strategies, list) or not strategies:
+        raise ValueError('strategies 必须为非空列表')
+    for strategy in strategies:
+        validate_strategy(strategy, 'dlt')
+    horizon = params.get('horizon', 1)
+    if not isinstance(horizon, int) or not 1 <= horizon <= 100:
+        raise ValueError('horizon 必须为1~100的整数')
+    parse_window_args({k: str(v) for k, v in params.items() if k in WINDOW_ARGS})
+
+def run_backtest_job(params, job):
+    """后台任务：策略回测，逐个策略执行并汇报进度"""
+    if get_draw_count() < 2:
+        raise ValueError('暂无数据')
+    window = parse_window_args({k: str(v) for k, v in params.items() if k in WINDOW_ARGS})
+    start, stop = resolve_window(get_derived_data()['issue_numbers'], **window)
+    context = get_backtest_context()
+    strategies = params['strategies']
+    results = []
+    for i, strategy in enumerate(strategies):
+        job.check_cancelled()
+        results.extend(run_backtest(context, [strategy], start, stop, params.get('horizon', 1),
+                                    processes=current_app.config.get('BACKTEST_PROCESSES', 0)))
+        job.report(i + 1, len(strategies), strategy.get('name'))
+    return {'start': start, 'stop': stop, 'horizon': params.get('horizon', 1), 'results': results}
+
+def run_recompute_job(params, job):
+    """
+    后台任务：全量重算派生数据（遗漏、特征、共现、分布、组合计数）后整体替换
+    持有数据集更新锁并从注册表中的当前数据集重建，不会与追加开奖、文件重新加载交错而发布旧数据
+    """
+    global _derived_data
+    steps = ['derived'] + [f'distribution:{name}' for name in DISTRIBUTION_CHARTS] + ['group:3', 'group:4']
+    with dataset_update_lock('dlt'):
+        current = registered_datasets().get('dlt')
+        frame = current.frame if current is not None else dlt_data
+        if frame is None:
+            raise ValueError('暂无数据')
+        job.report(0, len(steps), 'derived')
+        dataset = LotteryDataset('dlt', frame, current.csv_path if current is not None else None)
+        derived = dataset.derived
+        for i, step in enumerate(steps[1:], start=1):
+            job.check_cancelled()
+            kind, name = step.split(':')
+            if kind == 'distribution':
+                get_distribution_index(name, derived)
+            else:
+                get_group_counter(int(name), derived,
+                                  snapshot_directory(dataset.csv_path) if dataset.csv_path else None)
+            job.report(i, len(steps), step)
+        if current is not None:
+            dataset.source_signature = current.source_signature
+            dataset = share_dataset(dataset)
+            publish_dataset(dataset)
+        else:
+            _derived_data = derived
+    return {'version': derived['version'], 'draws': len(derived['issues']), 'steps': steps}
+
+register_job_kind('dlt.filter', run_filter_job, validate_filter_job, get_data_version)
+register_job_kind('dlt.backtest', run_backtest_job, validate_backtest_job, get_data_version)
+register_job_kind('dlt.recompute', run_recompute_job, version=get_data_version, token='INGEST_TOKEN')
+
+# ==================== 增量追加开奖 ====================
+
+# 追加开奖与数据文件重新加载串行执行：每次都在上一次的结果上追加
+_ingest_lock = dataset_update_lock('dlt')
+
+def extend_derived_indexes(previous, derived):
+    """沿用上一份数据已构建的分布计数与组合计数，只追加新增期（新取值超出自动分箱的分布按需重建）"""
+    count = len(previous['issues'])
+    for chart_type, index in previous.get('distributions', {}).items():
+        spec = DISTRIBUTION_CHARTS[chart_type]
+        values = spec['values'](derived[f"{spec['area']}_features"].slice(count))
+        if spec.get('bins') is None and not index.covers(values):
+            continue
+        valid = np.arange(count, count + len(values)) > 0 if spec.get('skip_first') else None
+        derived.setdefault('distributions', {})[chart_type] = index.extended(values, valid)
+    for group_size, counter in previous.get('group_counters', {}).items():
+        derived.setdefault('group_counters', {})[group_size] = counter.extended(
+            derived['front_features'].balls[count:])
+
+def ingest_draws(draws, persist=True):
+    """
+    追加新开奖：只计算新增期的派生数据，然后整体替换当前数据集，数据版本随之变化（旧版本缓存随之失效）
+    
+    Args:
+        draws: [{"issue": 2026017, "front": [1, 2, 3, 4, 5], "back": [6, 7]}, ...]
+        persist: 是否同时追加写入历史CSV
+    
+    Raises:
+        ValueError: 暂无数据或开奖数据无效
+    """
+    with _ingest_lock:
+        if dlt_data is None:
+            raise ValueError('暂无数据')
+        current = find_dataset('dlt', dlt_data)
+        dataset = current if current is not None else LotteryDataset('dlt', dlt_data)
+        rows = normalize_draws('dlt', draws, dataset)
+        # 先在内存中完成追加，成功后再写CSV并发布：计算失败时CSV与当前数据集都保持不变
+        extended = dataset.extend(rows)
+        extend_derived_indexes(dataset.derived, extended.derived)
+        if persist and dataset.csv_path:
+            append_draws_to_csv(dataset.csv_path, 'dlt', rows)
+        
+        if current is not None:
+            publish_dataset(extended)
+        else:
+            adopt_dataset(extended)
+    
+    return {
+        'added': len(rows),
+        'draws': len(extended),
+        'latest_issue': extended.derived['issues'][-1],
+        'version': extended.version
+    }
+
+@dlt_api_bp.route('/draws', methods=['POST'])
+@require_token('INGEST_TOKEN')
+def api_ingest_draws():
+    """
+    API: 追加新开奖（需要令牌，见 INGEST_TOKEN）
+    请求体 {"draws": [{"issue": 2026017, "front": [1, 2, 3, 4, 5], "back": [6, 7]}, ...]}，persist=false 时只更新内存数据不写CSV
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '请求体必须为JSON对象'}), 400
+    persist = request.args.get('persist', 'true').lower() != 'false'
+    try:
+        result = ingest_draws(payload.get('draws'), persist)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+# ==================== 数据集替换 ====================
+
+def prepare_dataset_indexes(dataset):
+    """
+    数据集发布前（在加载或重新加载线程中）构建全部分布计数与组合计数，发布后请求直接使用；
+    全组合特征表也在此时映射，共享数据集由主进程预加载时 worker 直接继承映射
+    """
+    global _combination_space
+    for chart_type in DISTRIBUTION_CHARTS:
+        get_distribution_index(chart_type, dataset.derived)
+    directory = snapshot_directory(dataset.csv_path) if dataset.csv_path else None
+    for group_size in (3, 4):
+        get_group_counter(group_size, dataset.derived, directory)
+    if _combination_space is None and dataset.csv_path:
+        _combination_space = CombinationSpace.load_or_build('dlt_front', snapshot_directory(dataset.csv_path))
+
+def adopt_dataset(dataset):
+    """切换到新发布的数据集：先替换数据再替换派生数据，两次赋值之间的读者按新数据从注册表取得同一份派生数据"""
+    global dlt_data, _derived_data
+    dlt_data = dataset.frame
+    _derived_data = dataset.derived
+
+register_dataset_hooks('dlt', prepare=prepare_dataset_indexes, adopt=adopt_dataset)
+
+# ==================== 缓存预热 ====================
+
+def prepare_warmup():
+    """预热准备：先构建页面与接口共享的派生数据（遗漏、特征表等）"""
+    if dlt_data is not None:
+        get_derived_data()
+
+register_warmup('dlt', [dlt_page_bp.name, dlt_api_bp.name], prepare=prepare_warmup, expand={
+    'dlt_api.api_distribution': [({'chart_type': name}, {}) for name in DISTRIBUTION_CHARTS],
+    'dlt_api.api_missed_all': [({}, {}), ({}, {'type': 'back'})],
+    'dlt_api.api_missed': ([({'ball_number': n}, {}) for n in range(1, 36)] +
+                          [({'ball_number': n}, {'type': 'back'}) for n in range(1, 13)]),
+    'dlt_api.api_cold_warm_hot': [({}, {}), ({}, {'type': 'back'})],
+    'dlt_api.api_cooccurrence': [({}, {}), ({}, {'type': 'back'})],
+})
\ No newline at end of file
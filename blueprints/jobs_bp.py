@@ -0,0 +1,66 @@
+from flask import Blueprint, jsonify, request
+from utils.jobs import get_job_queue, job_kind_token, JobQueueFull, FINISHED_STATES, JOB_DONE
+from utils.auth import token_error
+
+# ==================== 后台任务 API 蓝图 ====================
+jobs_api_bp = Blueprint('jobs_api', __name__,
+                        url_prefix='/api/v1/jobs')
+
+@jobs_api_bp.route('', methods=['POST'])
+def api_submit_job():
+    """
+    API: 提交后台任务
+    请求体为JSON：{"kind": "ssq.backtest", "params": {...}}，
+    可用任务类型：ssq.filter / ssq.backtest / ssq.recompute / dlt.filter / dlt.backtest / dlt.recompute，
+    参数与对应的同步接口一致；参数相同的任务在数据未更新前复用已有任务。
+    替换数据集的任务（*.recompute）与追加开奖接口一样需要令牌（见 INGEST_TOKEN）
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('kind'), str):
+        return jsonify({'error': '请求体必须为包含 kind 的JSON对象'}), 400
+    token_config = job_kind_token(payload['kind'])
+    if token_config is not None:
+        error = token_error(token_config)
+        if error is not None:
+            return error
+    params = payload.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params 必须为对象'}), 400
+    
+    try:
+        job, created = get_job_queue().submit(payload['kind'], params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    job['created_new'] = created
+    return jsonify(job), 202 if created else 200
+
+@jobs_api_bp.route('/<job_id>')
+def api_job_status(job_id):
+    """API: 查询任务状态与进度"""
+    job = get_job_queue().status(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job)
+
+@jobs_api_bp.route('/<job_id>/result')
+def api_job_result(job_id):
+    """API: 获取任务结果，任务未完成时返回202，失败或取消时返回409"""
+    job, result = get_job_queue().result(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    if job['status'] not in FINISHED_STATES:
+        return jsonify(job), 202
+    if job['status'] != JOB_DONE:
+        return jsonify(job), 409
+    return jsonify({'job': job, 'result': result})
+
+@jobs_api_bp.route('/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """API: 取消任务（排队中的任务立即取消，执行中的任务在下一个检查点停止）"""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job)
\ No newline at end of file
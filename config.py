@@ -5,8 +5,18 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
     
     # 缓存配置
-    CACHE_TYPE = 'simple'
+    CACHE_TYPE = 'utils.cache.tiered_cache_factory'  # 进程内 LRU + 主机内共享的 SQLite 二级缓存
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_THRESHOLD = 1000  # 最大缓存条目数
+    CACHE_MAX_BYTES = 128 * 1024 * 1024  # 缓存值总字节数上限
+    CACHE_SWEEP_INTERVAL = 60  # 过期条目批量清理间隔（秒）
+    CACHE_VERSIONED_TIMEOUT = 3600  # 按数据版本缓存的视图的新鲜期（秒），过期后返回旧值并在后台刷新，0 表示不过期
+    CACHE_STALE_WHILE_REVALIDATE = 60  # 过期条目在后台刷新期间继续返回的最长时间（秒）
+    CACHE_SINGLE_FLIGHT_TIMEOUT = 30  # 并发请求等待同一缓存键首次计算的最长时间（秒）
+    CACHE_L2_MAX_BYTES = 512 * 1024 * 1024  # 二级缓存文件中条目总字节数上限
+    CACHE_L2_MAX_TIMEOUT = 24 * 3600  # 二级缓存条目最长保存时间（秒），按数据版本缓存的视图也不例外
+    CACHE_L2_NAMESPACE = os.environ.get('CACHE_L2_NAMESPACE')  # 二级缓存命名空间（如部署版本号），未设置时取代码指纹
+    CACHE_WARMUP = os.environ.get('CACHE_WARMUP', 'background')  # 启动预热：off / background / blocking
     
     # 静态文件版本控制
     STATIC_VERSION = '1.0.0'
@@ -14,12 +24,44 @@ class Config:
     # 文件上传配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     
+    # 全组合过滤：大于1时按块交给多进程并行求值（进程池在每个 worker 进程内复用，退出时关闭）
+    COMBINATION_FILTER_PROCESSES = int(os.environ.get('COMBINATION_FILTER_PROCESSES', 0))
+    
+    # 策略回测：大于1时按 (策略, 期区间) 分片交给进程池并行（进程池在每个 worker 进程内复用，退出时关闭）
+    BACKTEST_PROCESSES = int(os.environ.get('BACKTEST_PROCESSES', 0))
+    
+    # 后台任务：有界线程池，状态与结果保存在本地 SQLite 文件（多个 worker 共享）
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_PENDING = 32  # 每个进程排队与执行中的任务数上限
+    JOB_STORE_MAX_BYTES = 64 * 1024 * 1024  # 已保存结果的总字节数上限
+    JOB_STORE_MAX_ENTRIES = 500  # 已完成任务的保留条数上限
+    JOB_HEARTBEAT_INTERVAL = 10  # 排队与执行中任务的心跳间隔（秒）
+    JOB_STALE_TIMEOUT = 60  # 心跳超过该秒数未更新（所属进程已退出）的任务标记为失败
+    
+    # 数据文件监视：大于0时每隔该秒数检查CSV，变化后在后台重新加载并替换数据集（每个 worker 各自启动）
+    DATA_WATCH_INTERVAL = float(os.environ.get('DATA_WATCH_INTERVAL', 0))
+    
+    # 共享数据集：派生数组（号码矩阵、遗漏矩阵、前缀计数表等）写入快照目录并以只读内存映射加载，
+    # 配合 gunicorn --preload 由主进程构建，worker 共享物理内存；快照目录可设为 /dev/shm
+    SHARE_DATASETS = os.environ.get('SHARE_DATASETS', 'false').lower() == 'true'
+    
+    # 追加开奖接口令牌（POST /api/v1/<彩种>/draws），未设置时接口关闭
+    INGEST_TOKEN = os.environ.get('INGEST_TOKEN')
+    
     # 数据库配置
     DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
     
     # CSV文件路径
     SSQ_DATA_PATH = os.path.join(DATA_DIR, 'ssq', 'ssqhistory.csv')
     DLT_DATA_PATH = os.path.join(DATA_DIR, 'dlt', 'dlthistory.csv')
+    
+    # 后台任务存储（与数据快照同在可写目录，可用 SNAPSHOT_DIR 环境变量指定）
+    JOB_STORE_PATH = os.path.join(os.environ.get('SNAPSHOT_DIR') or os.path.join(DATA_DIR, '.snapshot'),
+                                  'jobs.sqlite3')
+    
+    # 二级缓存文件：同一主机上的 worker 共享，置空则只使用进程内缓存
+    CACHE_L2_PATH = os.environ.get('CACHE_L2_PATH', os.path.join(
+        os.environ.get('SNAPSHOT_DIR') or os.path.join(DATA_DIR, '.snapshot'), 'cache.sqlite3'))
 
 class DevelopmentConfig(Config):
     DEBUG = True
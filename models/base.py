@@ -5,26 +5,44 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Any, Optional
 import os
 
+from utils.dataset import get_dataset
+
 class BaseLotteryModel(ABC):
     """彩票模型基类"""
     
+    # 彩种（子类定义），对应数据集注册表中的键
+    game: str = ''
+    
     def __init__(self, csv_path: str):
         self.csv_path = csv_path
+        self.dataset = None
         self.data = None
+        self.version = None
+        self.features = {}
         self.load_data()
     
     def load_data(self):
-        """加载CSV数据"""
+        """加载数据 - 取数据集注册表中的共享数据集（同一彩种进程内只加载一次）"""
         if not os.path.exists(self.csv_path):
             raise FileNotFoundError(f"数据文件不存在: {self.csv_path}")
         
-        self.data = pd.read_csv(self.csv_path)
-        self._preprocess_data()
+        self.dataset = get_dataset(self.game, self.csv_path)
+        self.data = self.dataset.frame
+        self.version = self.dataset.version
+        self.features = self.dataset.features
     
-    @abstractmethod
-    def _preprocess_data(self):
-        """数据预处理"""
-        pass
+    @property
+    def issue_array(self) -> np.ndarray:
+        """期号数组（只读视图，不复制）"""
+        return self.dataset.issue_array
+    
+    def draw_matrix(self, area: str) -> np.ndarray:
+        """号码区的 (期数, 号码个数) 开奖号码矩阵（只读视图，不复制）"""
+        return self.features[area].balls
+    
+    def feature_column(self, area: str, name: str) -> np.ndarray:
+        """号码区特征表中的一列（只读视图，不复制）"""
+        return self.features[area][name]
     
     @abstractmethod
     def get_basic_trend(self, limit: int = 50) -> Dict[str, Any]:
@@ -3,58 +3,49 @@ import pandas as pd
 from typing import Dict, List, Any, Tuple
 import numpy as np
 
+from utils.omission import build_presence_matrix
+
+FRONT_COLUMNS = ['front1', 'front2', 'front3', 'front4', 'front5']
+BACK_COLUMNS = ['back1', 'back2']
+
 class DLTModel(BaseLotteryModel):
     """大乐透数据模型"""
     
-    def _preprocess_data(self):
-        """预处理大乐透数据"""
-        # 重命名列
-        self.data.columns = ['issue', 'front1', 'front2', 'front3', 'front4', 'front5', 'back1', 'back2']
-        
-        # 转换为整数
-        for col in ['front1', 'front2', 'front3', 'front4', 'front5', 'back1', 'back2']:
-            self.data[col] = pd.to_numeric(self.data[col], errors='coerce').fillna(0).astype(int)
-        
-        # 按期号排序
-        self.data = self.data.sort_values('issue', ascending=True).reset_index(drop=True)
+    game = 'dlt'
     
     def get_basic_trend(self) -> Dict[str, Any]:
         """获取大乐透基本走势数据"""
-        data = self.data.copy()
+        issues = self.issue_array.tolist()
+        
+        # 前区统计与区间比 (1-12, 13-24, 25-35)、后区统计均来自特征表
+        front_stats = self.features['front'].to_lists([
+            'balls', 'dragon_head', 'phoenix_tail', 'sum_value', 'span',
+            'size_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio', 'odd_even_ratio'
+        ])
+        back_stats = self.features['back'].to_lists([
+            'balls', 'size_ratio', 'prime_ratio', 'road012_ratio', 'odd_even_ratio'
+        ])
         
         result = []
-        for _, row in data.iterrows():
-            front_balls = [row[f'front{i}'] for i in range(1, 6)]
-            back_balls = [row['back1'], row['back2']]
-            
-            # 前区统计
-            front_stats = self._calculate_statistics(front_balls, 35)
-            
-            # 前区区间划分 (1-12, 13-24, 25-35)
-            front_zones = [(1, 12), (13, 24), (25, 35)]
-            front_zone_ratio = self._get_zone_ratio(front_balls, front_zones)
-            
-            # 后区统计
-            back_stats = self._calculate_statistics(back_balls, 12)
-            
+        for i, front_balls in enumerate(front_stats['balls']):
             result.append({
-                'issue': row['issue'],
+                'issue': issues[i],
                 'front_balls': front_balls,
-                'back_balls': back_balls,
-                'dragon_head': min(front_balls) if front_balls else 0,
-                'phoenix_tail': max(front_balls) if front_balls else 0,
-                'sum_value': front_stats.get('sum_value', 0),
-                'span': front_stats.get('span', 0),
-                'size_ratio': front_stats.get('size_ratio', '0:0'),
-                'prime_ratio': front_stats.get('prime_ratio', '0:0'),
-                'road012_ratio': front_stats.get('road012_ratio', '0:0:0'),
-                'zone_ratio': front_zone_ratio,
-                'odd_even_ratio': front_stats.get('odd_even_ratio', '0:0'),
-                'back_size_ratio': back_stats.get('size_ratio', '0:0'),
-                'back_prime_ratio': back_stats.get('prime_ratio', '0:0'),
-                'back_road012_ratio': back_stats.get('road012_ratio', '0:0:0'),
+                'back_balls': back_stats['balls'][i],
+                'dragon_head': front_stats['dragon_head'][i],
+                'phoenix_tail': front_stats['phoenix_tail'][i],
+                'sum_value': front_stats['sum_value'][i],
+                'span': front_stats['span'][i],
+                'size_ratio': front_stats['size_ratio'][i],
+                'prime_ratio': front_stats['prime_ratio'][i],
+                'road012_ratio': front_stats['road012_ratio'][i],
+                'zone_ratio': front_stats['zone_ratio'][i],
+                'odd_even_ratio': front_stats['odd_even_ratio'][i],
+                'back_size_ratio': back_stats['size_ratio'][i],
+                'back_prime_ratio': back_stats['prime_ratio'][i],
+                'back_road012_ratio': back_stats['road012_ratio'][i],
                 'back_zone_ratio': '0:0',  # 简化处理
-                'back_odd_even_ratio': back_stats.get('odd_even_ratio', '0:0')
+                'back_odd_even_ratio': back_stats['odd_even_ratio'][i]
             })
         
         return {
@@ -63,17 +54,17 @@ class DLTModel(BaseLotteryModel):
         }
     
     def get_front_basic_trend(self) -> Dict[str, Any]:
-        """获取前区基本走势（对应截图3格式）"""
-        data = self.data.copy()
+        """获取前区基本走势（对应截图3格式），逐期读取只读号码矩阵，不复制数据"""
+        front_matrix = self.draw_matrix('front')
+        keys = [str(i).zfill(2) for i in range(1, 36)]
         
         result = []
-        for _, row in data.iterrows():
-            front_balls = [row[f'front{i}'] for i in range(1, 6)]
-            back_balls = [row['back1'], row['back2']]
-            
+        for issue, front_balls, back_balls, hits in zip(self.issue_array.tolist(), front_matrix.tolist(),
+                                                        self.draw_matrix('back').tolist(),
+                                                        build_presence_matrix(front_matrix, 35).tolist()):
             result.append({
-                'issue': row['issue'],
-                'numbers': {str(i).zfill(2): (i in front_balls) for i in range(1, 36)},
+                'issue': issue,
+                'numbers': dict(zip(keys, hits)),
                 'front_balls': front_balls,
                 'back_balls': back_balls
             })
@@ -85,51 +76,31 @@ class DLTModel(BaseLotteryModel):
     
     def get_back_basic_trend(self) -> Dict[str, Any]:
         """获取后区基本走势（对应截图5格式）"""
-        data = self.data.copy()
+        issues = self.issue_array.tolist()
+        features = self.features['back']
+        balls = features.balls
+        
+        # 逐个号码的属性：大小（以6为界）、质合、012路、区间 (1-4:一区, 5-8:二区, 9-12:三区)、奇偶
+        prime_numbers = (1, 2, 3, 5, 7, 11)
+        sizes = np.where(balls > 6, "大", "小").tolist()
+        prime_types = np.where(np.isin(balls, prime_numbers), "质", "合").tolist()
+        road012s = (balls % 3).tolist()
+        zone_indexes = (balls - 1) // 4
+        zone_indexes = np.where((zone_indexes >= 0) & (zone_indexes <= 2), zone_indexes, 0)
+        zones = np.array(["一区", "二区", "三区"])[zone_indexes].tolist()
+        odd_evens = np.where(balls % 2 == 1, "奇", "偶").tolist()
         
         result = []
-        for _, row in data.iterrows():
-            back_balls = [row['back1'], row['back2']]
-            
-            # 振幅
-            amplitude1 = 0
-            amplitude2 = 0
-            if len(result) > 0:
-                prev_back = result[-1]['back_balls']
-                amplitude1 = abs(back_balls[0] - prev_back[0]) if len(prev_back) > 0 else 0
-                amplitude2 = abs(back_balls[1] - prev_back[1]) if len(prev_back) > 1 else 0
-            
-            # 大小
-            size1 = "大" if back_balls[0] > 6 else "小"
-            size2 = "大" if back_balls[1] > 6 else "小"
-            
-            # 质合
-            prime_numbers = {1, 2, 3, 5, 7, 11}
-            prime_type1 = "质" if back_balls[0] in prime_numbers else "合"
-            prime_type2 = "质" if back_balls[1] in prime_numbers else "合"
-            
-            # 012路
-            road012_1 = back_balls[0] % 3
-            road012_2 = back_balls[1] % 3
-            
-            # 区间 (1-4:一区, 5-8:二区, 9-12:三区)
-            zone_map = {1: "一区", 2: "二区", 3: "三区"}
-            zone1 = zone_map.get((back_balls[0] - 1) // 4 + 1, "一区")
-            zone2 = zone_map.get((back_balls[1] - 1) // 4 + 1, "一区")
-            
-            # 奇偶
-            odd_even1 = "奇" if back_balls[0] % 2 == 1 else "偶"
-            odd_even2 = "奇" if back_balls[1] % 2 == 1 else "偶"
-            
+        for i, (back_balls, amplitude) in enumerate(zip(balls.tolist(), features['amplitude'].tolist())):
             result.append({
-                'issue': row['issue'],
+                'issue': issues[i],
                 'back_balls': back_balls,
-                'amplitude': [amplitude1, amplitude2],
-                'size': [size1, size2],
-                'prime_type': [prime_type1, prime_type2],
-                'road012': [road012_1, road012_2],
-                'zone': [zone1, zone2],
-                'odd_even': [odd_even1, odd_even2],
+                'amplitude': amplitude,
+                'size': sizes[i],
+                'prime_type': prime_types[i],
+                'road012': road012s[i],
+                'zone': zones[i],
+                'odd_even': odd_evens[i],
                 'cold_warm_hot': ["热号", "热号"],  # 简化处理
                 'repeat': 0,
                 'adjacent': 0,
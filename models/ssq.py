@@ -4,50 +4,43 @@ from typing import Dict, List, Any, Tuple
 import numpy as np
 from datetime import datetime
 
+from utils.omission import build_presence_matrix
+
+RED_COLUMNS = ['red1', 'red2', 'red3', 'red4', 'red5', 'red6']
+BLUE_COLUMNS = ['blue']
+
 class SSQModel(BaseLotteryModel):
     """双色球数据模型"""
     
-    def _preprocess_data(self):
-        """预处理双色球数据"""
-        # 重命名列
-        self.data.columns = ['issue', 'red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue']
-        
-        # 转换为整数
-        for col in ['red1', 'red2', 'red3', 'red4', 'red5', 'red6', 'blue']:
-            self.data[col] = pd.to_numeric(self.data[col], errors='coerce').fillna(0).astype(int)
-        
-        # 按期号排序
-        self.data = self.data.sort_values('issue', ascending=True).reset_index(drop=True)
+    game = 'ssq'
     
     def get_basic_trend(self) -> Dict[str, Any]:
         """获取双色球基本走势数据"""
-        data = self.data.copy()
+        issues = self.issue_array.tolist()
+        blues = self.features['blue'].balls[:, 0].tolist()
+        
+        # 红球统计指标与区间比 (1-11, 12-22, 23-33) 均来自特征表
+        stats = self.features['red'].to_lists([
+            'balls', 'dragon_head', 'phoenix_tail', 'sum_value', 'span', 'ac_value',
+            'size_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio', 'odd_even_ratio'
+        ])
         
         result = []
-        for _, row in data.iterrows():
-            red_balls = [row[f'red{i}'] for i in range(1, 7)]
-            blue_ball = row['blue']
-            
-            stats = self._calculate_statistics(red_balls, 33)
-            
-            # 红球区间划分 (1-11, 12-22, 23-33)
-            zones = [(1, 11), (12, 22), (23, 33)]
-            zone_ratio = self._get_zone_ratio(red_balls, zones)
-            
+        for i, red_balls in enumerate(stats['balls']):
             result.append({
-                'issue': row['issue'],
+                'issue': issues[i],
                 'red_balls': red_balls,
-                'blue_ball': blue_ball,
-                'dragon_head': min(red_balls) if red_balls else 0,
-                'phoenix_tail': max(red_balls) if red_balls else 0,
-                'sum_value': stats.get('sum_value', 0),
-                'span': stats.get('span', 0),
-                'ac_value': stats.get('ac_value', 0),
-                'size_ratio': stats.get('size_ratio', '0:0'),
-                'prime_ratio': stats.get('prime_ratio', '0:0'),
-                'road012_ratio': stats.get('road012_ratio', '0:0:0'),
-                'zone_ratio': zone_ratio,
-                'odd_even_ratio': stats.get('odd_even_ratio', '0:0')
+                'blue_ball': blues[i],
+                'dragon_head': stats['dragon_head'][i],
+                'phoenix_tail': stats['phoenix_tail'][i],
+                'sum_value': stats['sum_value'][i],
+                'span': stats['span'][i],
+                'ac_value': stats['ac_value'][i],
+                'size_ratio': stats['size_ratio'][i],
+                'prime_ratio': stats['prime_ratio'][i],
+                'road012_ratio': stats['road012_ratio'][i],
+                'zone_ratio': stats['zone_ratio'][i],
+                'odd_even_ratio': stats['odd_even_ratio'][i]
                 
             })
         
@@ -57,16 +50,18 @@ class SSQModel(BaseLotteryModel):
         }
     
     def get_red_basic_trend(self) -> Dict[str, Any]:
-        """获取红球基本走势（对应截图3格式）"""
-        data = self.data.copy()
+        """获取红球基本走势（对应截图3格式），逐期读取只读号码矩阵，不复制数据"""
+        red_matrix = self.draw_matrix('red')
+        keys = [str(i).zfill(2) for i in range(1, 34)]
         
         result = []
-        for _, row in data.iterrows():
-            red_balls = [row[f'red{i}'] for i in range(1, 7)]
+        for issue, red_balls, blue, hits in zip(self.issue_array.tolist(), red_matrix.tolist(),
+                                                self.draw_matrix('blue')[:, 0].tolist(),
+                                                build_presence_matrix(red_matrix, 33).tolist()):
             result.append({
-                'issue': row['issue'],
-                'numbers': {str(i).zfill(2): (i in red_balls) for i in range(1, 34)},
-                'blue': row['blue'],
+                'issue': issue,
+                'numbers': dict(zip(keys, hits)),
+                'blue': blue,
                 'red_balls': red_balls
             })
         
@@ -77,50 +72,28 @@ class SSQModel(BaseLotteryModel):
     
     def get_blue_basic_trend(self) -> Dict[str, Any]:
         """获取蓝球基本走势（对应截图4格式）"""
-        data = self.data.copy()
+        issues = self.issue_array.tolist()
+        features = self.features['blue']
+        
+        # 区间 (1-4:一区, 5-8:二区, 9-12:三区, 13-16:四区)
+        zone_counts = features['zone_counts'][:, :3]
+        zone_indexes = np.where(zone_counts.any(axis=1), zone_counts.argmax(axis=1), 3).tolist()
+        zone_names = ["一区", "二区", "三区", "四区"]
         
         result = []
-        for _, row in data.iterrows():
-            blue_ball = row['blue']
-            
-            # 计算振幅
-            amplitude = 0
-            if len(result) > 0:
-                prev_blue = result[-1]['blue']
-                amplitude = abs(blue_ball - prev_blue)
-            
-            # 大小
-            size = "大" if blue_ball > 8 else "小"
-            
-            # 质合
-            prime_numbers = {1, 2, 3, 5, 7, 11, 13}
-            prime_type = "质" if blue_ball in prime_numbers else "合"
-            
-            # 012路
-            road012 = blue_ball % 3
-            
-            # 区间 (1-4:一区, 5-8:二区, 9-12:三区, 13-16:四区)
-            if 1 <= blue_ball <= 4:
-                zone = "一区"
-            elif 5 <= blue_ball <= 8:
-                zone = "二区"
-            elif 9 <= blue_ball <= 12:
-                zone = "三区"
-            else:
-                zone = "四区"
-            
-            # 奇偶
-            odd_even = "奇" if blue_ball % 2 == 1 else "偶"
-            
+        for i, (blue_ball, amplitude, is_big, is_prime, is_odd) in enumerate(zip(
+                features.balls[:, 0].tolist(), features['amplitude'][:, 0].tolist(),
+                features['big_count'].tolist(), features['prime_count'].tolist(),
+                features['odd_count'].tolist())):
             result.append({
-                'issue': row['issue'],
+                'issue': issues[i],
                 'blue': blue_ball,
                 'amplitude': amplitude,
-                'size': size,
-                'prime_type': prime_type,
-                'road012': road012,
-                'zone': zone,
-                'odd_even': odd_even,
+                'size': "大" if is_big else "小",
+                'prime_type': "质" if is_prime else "合",
+                'road012': blue_ball % 3,
+                'zone': zone_names[zone_indexes[i]],
+                'odd_even': "奇" if is_odd else "偶",
                 'cold_warm_hot': "热号"  # 简化处理，实际应根据历史出现频率计算
             })
         
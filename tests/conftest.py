@@ -0,0 +1,71 @@
+"""
+测试公共夹具
+数据集注册表与蓝图持有的当前数据是进程级状态，修改它们的测试在结束后恢复原状
+"""
+
+import os
+import shutil
+import tempfile
+
+# 快照、任务存储与二级缓存写到临时目录，不改动仓库中的 data 目录（须在导入配置之前设置）
+_snapshot_dir = None
+if not os.environ.get('SNAPSHOT_DIR'):
+    _snapshot_dir = os.environ['SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='lottery-tests-')
+
+import pytest
+from flask import Flask
+
+from blueprints import ssq_bp, dlt_bp
+from config import Config
+from utils import dataset as dataset_module
+from utils.dataset import LotteryDataset, publish_dataset
+
+BLUEPRINT_MODULES = {'ssq': ssq_bp, 'dlt': dlt_bp}
+DATA_PATHS = {'ssq': Config.SSQ_DATA_PATH, 'dlt': Config.DLT_DATA_PATH}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if _snapshot_dir is not None:
+        shutil.rmtree(_snapshot_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def isolated_datasets():
+    """测试结束后恢复数据集注册表与蓝图模块的当前数据"""
+    registered = dict(dataset_module._datasets)
+    saved = {game: (module.__dict__[f'{game}_data'], module._derived_data)
+             for game, module in BLUEPRINT_MODULES.items()}
+    yield
+    with dataset_module._datasets_lock:
+        dataset_module._datasets.clear()
+        dataset_module._datasets.update(registered)
+    for game, module in BLUEPRINT_MODULES.items():
+        setattr(module, f'{game}_data', saved[game][0])
+        module._derived_data = saved[game][1]
+
+
+@pytest.fixture
+def published_copy(tmp_path, isolated_datasets):
+    """
+    把彩种的历史CSV复制到临时目录，加载并发布为当前数据集（快照也写在临时目录）
+
+    Returns:
+        publish(game) -> LotteryDataset
+    """
+    def publish(game):
+        csv_path = str(tmp_path / os.path.basename(DATA_PATHS[game]))
+        shutil.copyfile(DATA_PATHS[game], csv_path)
+        dataset = LotteryDataset.load(game, csv_path)
+        publish_dataset(dataset)
+        return dataset
+    return publish
+
+
+def make_app(**config):
+    """注册双色球、大乐透蓝图的测试应用（不加载默认数据）"""
+    app = Flask('tests', root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config.from_object(Config)
+    app.config.update(config)
+    for blueprint in (ssq_bp.ssq_page_bp, ssq_bp.ssq_api_bp, dlt_bp.dlt_page_bp, dlt_bp.dlt_api_bp):
+        app.register_blueprint(blueprint)
+    return app
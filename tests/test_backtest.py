@@ -0,0 +1,88 @@
+"""
+策略回测：第 i 期的选号只使用第 i 期及以前的数据（不偷看未来开奖），命中与随后 horizon 期比对，
+分片与进程池并行的结果与单分片一致
+"""
+
+import numpy as np
+import pytest
+
+from utils import pools
+from utils.backtest import build_backtest_context, run_backtest, run_shard, select_numbers, validate_strategy
+from utils.omission import calculate_omission_matrix
+
+STRATEGIES = [
+    {'name': 'cold', 'front': {'type': 'coldest', 'count': 7}, 'back': {'type': 'coldest', 'count': 2}},
+    {'name': 'hot', 'front': {'type': 'frequent', 'count': 6, 'window': 10}},
+    {'name': 'expr', 'front': {'type': 'expression', 'expression': 'missed >= 3 and frequency <= 2'}},
+]
+
+
+def random_draws(count, seed):
+    rng = np.random.default_rng(seed)
+    red = np.array([np.sort(rng.choice(np.arange(1, 34), 6, replace=False)) for _ in range(count)])
+    blue = rng.integers(1, 17, size=(count, 1))
+    return red, blue
+
+
+def make_context(red, blue):
+    return build_backtest_context('ssq', {
+        'front': {'balls': red, 'missed': calculate_omission_matrix(red, 33)},
+        'back': {'balls': blue, 'missed': calculate_omission_matrix(blue, 16)},
+    }, {'sum_value': red.sum(axis=1)}, [str(2020001 + i) for i in range(len(red))])
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES, ids=[s['name'] for s in STRATEGIES])
+def test_selection_ignores_later_draws(strategy):
+    red, blue = random_draws(200, seed=1)
+    future_red, future_blue = random_draws(200, seed=2)
+    cut = 120
+    # 第 cut 期之后的开奖完全不同
+    changed = make_context(np.concatenate([red[:cut], future_red[cut:]]),
+                           np.concatenate([blue[:cut], future_blue[cut:]]))
+    original = make_context(red, blue)
+
+    strategy = validate_strategy(strategy, 'ssq')
+    for area in ('front', 'back'):
+        if area in strategy:
+            assert np.array_equal(select_numbers(original, area, strategy[area], 0, cut),
+                                  select_numbers(changed, area, strategy[area], 0, cut))
+    # 选号期截止到 cut-2，比对的开奖不超过第 cut-1 期
+    assert same_result(run_shard(original, strategy, 0, cut - 1), run_shard(changed, strategy, 0, cut - 1))
+
+
+def same_result(left, right):
+    return left.keys() == right.keys() and all(np.array_equal(left[key], right[key]) for key in left)
+
+
+def test_fixed_pick_is_scored_against_next_draw():
+    red, blue = random_draws(60, seed=3)
+    context = make_context(red, blue)
+    strategy = validate_strategy({'front': {'type': 'fixed', 'numbers': [1, 2, 3, 4, 5, 6]},
+                                  'back': {'type': 'fixed', 'numbers': [1]}}, 'ssq')
+
+    for horizon in (1, 3):
+        result = run_shard(context, strategy, 0, 59, horizon)
+        expected = [np.isin(red[target], [1, 2, 3, 4, 5, 6]).sum()
+                    for i in range(59) for target in range(i + 1, min(i + horizon, 59) + 1)]
+        assert result['draws'] == len(expected)
+        assert result['front_hits'].tolist() == np.bincount(expected, minlength=7).tolist()
+
+
+def test_last_draw_is_never_a_selection_period():
+    red, blue = random_draws(30, seed=4)
+    results = run_backtest(make_context(red, blue), [STRATEGIES[0]])
+    assert results[0]['draws'] == 29
+
+
+def test_sharded_and_parallel_results_match_single_shard():
+    red, blue = random_draws(400, seed=5)
+    context = make_context(red, blue)
+    single = run_backtest(context, STRATEGIES, horizon=2, shard_size=10000)
+    assert run_backtest(context, STRATEGIES, horizon=2, shard_size=37) == single
+    try:
+        assert run_backtest(context, STRATEGIES, horizon=2, shard_size=37, processes=2) == single
+        executor = pools._pools['backtest']['executor']
+        assert run_backtest(context, STRATEGIES, horizon=2, shard_size=37, processes=2) == single
+        assert pools._pools['backtest']['executor'] is executor
+    finally:
+        pools.shutdown_process_pools()
@@ -0,0 +1,85 @@
+"""
+JSON接口缓存：预压缩的 gzip / brotli 变体、各编码变体独立的强ETag 与 304
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import cache as cache_module
+from utils.cache import COMPRESS_MIN_SIZE, cached_json, local_cache
+
+calls = []
+
+
+@cached_json(vary_on=['size'])
+def payload_view():
+    from flask import request
+    calls.append(1)
+    size = int(request.args.get('size', 2000))
+    if size < 0:
+        return jsonify({'error': 'size'}), 400
+    return jsonify({'data': 'x' * size})
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.add_url_rule('/payload', 'payload', payload_view)
+    local_cache.clear()
+    calls.clear()
+    yield app.test_client()
+    local_cache.clear()
+
+
+def test_gzip_variant_has_its_own_etag(client):
+    plain = client.get('/payload', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/payload', headers={'Accept-Encoding': 'gzip'})
+
+    assert plain.headers.get('Content-Encoding') is None
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.get_data())) == plain.get_json()
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert len(calls) == 1
+
+
+@pytest.mark.skipif(cache_module.brotli is None, reason='brotli 未安装')
+def test_brotli_variant_preferred(client):
+    response = client.get('/payload', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['ETag'].endswith('-br"')
+    assert json.loads(cache_module.brotli.decompress(response.get_data()))['data'] == 'x' * 2000
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get(f'/payload?size={COMPRESS_MIN_SIZE // 4}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers.get('Content-Encoding') is None
+    assert not response.headers['ETag'].endswith('-gz"')
+
+
+@pytest.mark.parametrize('held, accept', [('identity', 'gzip'), ('gzip', 'gzip'), ('gzip', 'identity')])
+def test_not_modified_for_any_variant_of_same_content(client, held, accept):
+    first = client.get('/payload', headers={'Accept-Encoding': held})
+    response = client.get('/payload', headers={'Accept-Encoding': accept, 'If-None-Match': first.headers['ETag']})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    etag = first.headers['ETag'].strip('"').removesuffix('-gz')
+    assert response.headers['ETag'] == (f'"{etag}-gz"' if accept == 'gzip' else f'"{etag}"')
+
+
+def test_changed_content_is_sent_again(client):
+    first = client.get('/payload?size=2000', headers={'Accept-Encoding': 'gzip'})
+    response = client.get('/payload?size=3000', headers={'Accept-Encoding': 'gzip',
+                                                          'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+
+
+def test_error_responses_are_not_cached(client):
+    assert client.get('/payload?size=-1').status_code == 400
+    assert client.get('/payload?size=-1').status_code == 400
+    assert len(calls) == 2
@@ -0,0 +1,77 @@
+"""
+请求相关的缓存键：端点、数据版本、函数参数与规范化后的查询参数（vary_on 限定参与的参数）
+"""
+
+import pytest
+from flask import Flask
+
+from utils.cache import LRUCache, cached, local_cache, make_cache_key, register_version_source
+
+version = {'value': 'v1'}
+register_version_source(__name__, lambda: version['value'])
+
+calls = []
+
+
+@cached(vary_on=['type'])
+def typed_view():
+    from flask import request
+    calls.append(request.query_string)
+    return f"{request.args.get('type')}-{len(calls)}"
+
+
+def plain(*args, **kwargs):
+    return None
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.add_url_rule('/typed', 'typed', typed_view)
+    app.add_url_rule('/other', 'other', typed_view)
+    version['value'] = 'v1'
+    local_cache.clear()
+    calls.clear()
+    yield app
+    local_cache.clear()
+
+
+def key_for(app, url, vary_on=None, args=(), kwargs=None):
+    with app.test_request_context(url):
+        return make_cache_key(plain, list(args), kwargs or {}, vary_on=vary_on, backend=LRUCache())
+
+
+def test_query_parameter_order_does_not_matter(app):
+    assert key_for(app, '/typed?a=1&b=2') == key_for(app, '/typed?b=2&a=1')
+    assert key_for(app, '/typed?a=1&b=2') != key_for(app, '/typed?a=1&b=3')
+
+
+def test_vary_on_ignores_undeclared_parameters(app):
+    assert key_for(app, '/typed?type=a&_=123', vary_on=['type']) == key_for(app, '/typed?type=a', vary_on=['type'])
+    assert key_for(app, '/typed?type=a', vary_on=['type']) != key_for(app, '/typed?type=b', vary_on=['type'])
+    assert key_for(app, '/typed?type=a', vary_on=[]) == key_for(app, '/typed?type=b', vary_on=[])
+
+
+def test_key_includes_endpoint_arguments_and_version(app):
+    key = key_for(app, '/typed')
+    assert key.startswith(f'{__name__}@v1:view_typed:')
+    assert key != key_for(app, '/other')
+    assert key != key_for(app, '/typed', args=[1])
+    assert key != key_for(app, '/typed', kwargs={'limit': 10})
+
+
+def test_cached_view_varies_on_declared_parameters(app):
+    client = app.test_client()
+    assert client.get('/typed?type=a').get_data(as_text=True) == 'a-1'
+    assert client.get('/typed?type=a&page=2').get_data(as_text=True) == 'a-1'
+    assert client.get('/typed?type=b').get_data(as_text=True) == 'b-2'
+    assert client.get('/other?type=a').get_data(as_text=True) == 'a-3'
+    assert len(calls) == 3
+
+
+def test_version_change_drops_old_entries(app):
+    client = app.test_client()
+    assert client.get('/typed?type=a').get_data(as_text=True) == 'a-1'
+    version['value'] = 'v2'
+    assert client.get('/typed?type=a').get_data(as_text=True) == 'a-2'
+    assert not [key for key in local_cache._entries if key.startswith(f'{__name__}@v1:')]
@@ -0,0 +1,118 @@
+"""
+SQLite 二级缓存：按代码指纹划分命名空间、条目保存时间上限、多进程共享与回填一级缓存，错误响应不写入缓存
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.cache import LRUCache, SQLiteCache, TieredCache, cache, cached, code_fingerprint, get_cache_backend
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache.sqlite3')
+
+
+def test_namespace_isolates_and_drops_other_code_versions(path):
+    old = SQLiteCache(path, namespace='code-a')
+    old.set('view', 'from a')
+    assert SQLiteCache(path, namespace='code-a').get('view') == 'from a'
+
+    new = SQLiteCache(path, namespace='code-b')
+    assert new.get('view') is None
+    # 新命名空间启动时删除旧命名空间的条目
+    assert new.stats()['entries'] == 0
+    new.set('view', 'from b')
+    assert new.get('view') == 'from b'
+    assert new.delete_prefix('') == 1
+
+
+def test_entry_lifetime_is_capped(path):
+    l2 = SQLiteCache(path, default_timeout=300, max_timeout=100)
+    now = time.time()
+    for key, kwargs in [('forever', {'timeout': 0}), ('long', {'timeout': 10000}),
+                        ('explicit', {'expiry': now + 10000})]:
+        l2.set(key, key, **kwargs)
+        _, expiry = l2.get_with_expiry(key)
+        assert now + 99 <= expiry <= now + 101
+
+    l2.set('short', 'short', timeout=5)
+    assert l2.get_with_expiry('short')[1] <= now + 6
+
+
+def test_expired_and_old_format_entries_miss(path, monkeypatch):
+    l2 = SQLiteCache(path)
+    l2.set('expired', 1, expiry=time.time() - 1)
+    assert l2.get('expired') is None
+
+    l2.set('old', 1)
+    monkeypatch.setattr(SQLiteCache, 'FORMAT_VERSION', SQLiteCache.FORMAT_VERSION + 1)
+    assert l2.get('old') is None
+
+
+def test_unpicklable_values_are_skipped(path):
+    l2 = SQLiteCache(path)
+    assert l2.set('lock', threading.Lock()) is False
+    assert l2.get('lock') is None
+
+
+def test_tiered_cache_shares_between_processes(path):
+    writer = TieredCache(LRUCache(), SQLiteCache(path, namespace='n'))
+    reader = TieredCache(LRUCache(), SQLiteCache(path, namespace='n'))
+    writer.set('key', {'value': 1}, timeout=60)
+
+    assert reader.get('key') == {'value': 1}
+    # 回填一级缓存，沿用二级条目的剩余有效期
+    value, expiry, size = reader.l1._entries['key']
+    assert expiry == pytest.approx(time.time() + 60, abs=2)
+
+    writer.delete_prefix('ke')
+    assert writer.get('key') is None
+    assert reader.l2.get('key') is None
+
+
+def test_code_fingerprint_follows_code_and_templates(tmp_path):
+    (tmp_path / 'app.py').write_text('print(1)')
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'history.json').write_text('{}')
+    before = code_fingerprint(str(tmp_path))
+
+    (tmp_path / 'data' / 'history.json').write_text('{"changed": true}')
+    assert code_fingerprint(str(tmp_path)) == before
+    (tmp_path / 'index.html').write_text('<html>')
+    assert code_fingerprint(str(tmp_path)) != before
+
+
+calls = []
+
+
+@cached(timeout=60)
+def status_view(status):
+    calls.append(status)
+    return f'status {status}', status
+
+
+@pytest.fixture
+def app(path):
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='utils.cache.tiered_cache_factory', CACHE_L2_PATH=path,
+                      CACHE_L2_NAMESPACE='tests')
+    cache.init_app(app)
+    app.add_url_rule('/status/<int:status>', 'status', status_view)
+    calls.clear()
+    return app
+
+
+def test_error_responses_are_not_cached(app):
+    client = app.test_client()
+    for status in (500, 500, 404, 404, 200, 200):
+        assert client.get(f'/status/{status}').status_code == status
+    assert calls == [500, 500, 404, 404, 200]
+
+    with app.app_context():
+        backend = get_cache_backend()
+        assert isinstance(backend, TieredCache)
+        assert backend.l2.stats()['entries'] == 1
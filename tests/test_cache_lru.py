@@ -0,0 +1,111 @@
+"""
+进程内 LRU + TTL 缓存：条目数与字节数上限、最近最少使用淘汰、惰性过期与批量清理、前缀删除
+"""
+
+import types
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的时钟（只替换缓存模块使用的 time）"""
+    now = {'value': 1000.0}
+    fake = types.SimpleNamespace(time=lambda: now['value'])
+    monkeypatch.setattr(cache_module, 'time', fake)
+
+    def advance(seconds):
+        now['value'] += seconds
+    return advance
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=3)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'
+    cache.set('d', 'D')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert cache.stats()['entries'] == 3
+
+
+def test_byte_limit_evicts_and_rejects_oversized_values():
+    cache = LRUCache(max_entries=100, max_bytes=1000)
+    cache.set('a', b'x' * 400)
+    cache.set('b', b'x' * 400)
+    cache.set('c', b'x' * 400)
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 800
+
+    assert cache.set('big', b'x' * 1001) is False
+    assert cache.get('big') is None
+    assert cache.stats()['bytes'] == 800
+
+
+def test_overwrite_replaces_size_accounting():
+    cache = LRUCache(max_bytes=1000)
+    cache.set('a', b'x' * 600)
+    cache.set('a', b'x' * 100)
+    assert cache.stats() == {'entries': 1, 'bytes': 100, 'max_entries': 1000, 'max_bytes': 1000}
+
+
+def test_entries_expire_on_read(clock):
+    cache = LRUCache(default_timeout=10, sweep_interval=3600)
+    cache.set('short', 1)
+    cache.set('long', 2, timeout=100)
+    cache.set('forever', 3, timeout=0)
+
+    clock(11)
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    clock(100)
+    assert cache.get('long') is None
+    assert cache.get('forever') == 3
+
+
+def test_sweep_removes_expired_entries_without_reads(clock):
+    cache = LRUCache(default_timeout=10, sweep_interval=5)
+    for i in range(10):
+        cache.set(f'k{i}', b'x' * 10)
+    cache.set('kept', b'x' * 10, timeout=0)
+
+    clock(11)
+    # 任意一次访问触发批量清理
+    cache.get('missing')
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 10
+    assert cache.get('kept') == b'x' * 10
+
+
+def test_sweep_ignores_overwritten_expiry(clock):
+    cache = LRUCache(default_timeout=10, sweep_interval=5)
+    cache.set('a', 1)
+    clock(8)
+    cache.set('a', 2)
+    clock(4)
+    cache.get('missing')
+    assert cache.get('a') == 2
+
+
+def test_delete_prefix_and_pattern():
+    cache = LRUCache()
+    for key in ['view_a', 'view_b', 'json_a', 'view']:
+        cache.set(key, key)
+    assert cache.delete_prefix('view_') == 2
+    assert cache.get('view') == 'view'
+    assert cache.delete_pattern('json*') == 1
+    assert cache.delete_pattern('vie') == 1
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bytes'] == 0
+
+
+def test_add_does_not_overwrite():
+    cache = LRUCache()
+    assert cache.add('a', 1) is True
+    assert cache.add('a', 2) is False
+    assert cache.get('a') == 1
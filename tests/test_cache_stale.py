@@ -0,0 +1,74 @@
+"""
+按数据版本缓存的视图：新鲜期过后返回旧值，并且只启动一次后台刷新
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.cache import cached, local_cache, register_version_source, _flights
+
+register_version_source(__name__, lambda: 'v1')
+
+calls = []
+release = threading.Event()
+
+
+@cached(vary_on=[])
+def versioned_view():
+    calls.append(time.time())
+    if len(calls) > 1:
+        # 后台刷新阻塞到测试放行，期间的请求都应拿到旧值
+        release.wait(5)
+    return f'value-{len(calls)}'
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.add_url_rule('/versioned', 'versioned', versioned_view)
+    local_cache.clear()
+    calls.clear()
+    release.clear()
+    yield app.test_client()
+    release.set()
+    local_cache.clear()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def cache_entry():
+    keys = [key for key in local_cache._entries if key.startswith(f'{__name__}@v1:')]
+    assert len(keys) == 1
+    return keys[0], local_cache.get(keys[0])
+
+
+def test_versioned_entry_has_freshness_window(client):
+    assert client.get('/versioned').get_data(as_text=True) == 'value-1'
+    _, entry = cache_entry()
+    assert entry['fresh_until'] is not None
+    assert entry['fresh_until'] > time.time()
+
+
+def test_stale_entry_served_while_single_refresh_runs(client):
+    assert client.get('/versioned').get_data(as_text=True) == 'value-1'
+    key, entry = cache_entry()
+    entry['fresh_until'] = time.time() - 1
+
+    bodies = [client.get('/versioned').get_data(as_text=True) for _ in range(5)]
+    assert bodies == ['value-1'] * 5
+    wait_until(lambda: len(calls) == 2)
+    assert len(calls) == 2
+
+    release.set()
+    wait_until(lambda: key not in _flights)
+    assert key not in _flights
+    assert len(calls) == 2
+    assert client.get('/versioned').get_data(as_text=True) == 'value-2'
+    assert len(calls) == 2
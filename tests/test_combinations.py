@@ -0,0 +1,89 @@
+"""
+全组合过滤：条件校验、向量化求值与暴力计算一致、并行求值复用进程池
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from utils import pools
+from utils.combinations import CombinationSpace
+from utils.snapshot import write_atomic
+
+
+@pytest.fixture(scope='module')
+def space(tmp_path_factory):
+    return CombinationSpace.load_or_build('dlt_front', str(tmp_path_factory.mktemp('combinations')))
+
+
+@pytest.mark.parametrize('criteria', [
+    [],
+    {'sum_value': [10]},
+    {'sum_value': [10, 'x']},
+    {'sum_value': [10, float('nan')]},
+    {'span': True},
+    {'size_ratio': '5:1'},
+    {'size_ratio': ['a:b']},
+    {'zone_ratio': ['5:0']},
+    {'odd_even_ratio': 3},
+    {'consecutive': ['不存在']},
+    {'same_tail': [1]},
+    {'include': [0]},
+    {'include': [36]},
+    {'exclude': [True]},
+    {'exclude': '1,2'},
+    {'unknown': 1},
+])
+def test_invalid_criteria_raise_value_error(space, criteria):
+    with pytest.raises(ValueError):
+        space.compile_criteria(criteria)
+
+
+def test_none_values_are_ignored(space):
+    assert space.compile_criteria({'sum_value': None, 'include': None}) == {}
+
+
+def test_filter_matches_brute_force(space):
+    criteria = {'sum_value': [80, 100], 'span': [20, 30], 'odd_even_ratio': ['3:2', '2:3'],
+                'include': [7], 'exclude': [1, 2]}
+    rows = space.filter(criteria)
+
+    balls = np.asarray(space.columns['balls'], dtype=np.int64)
+    expected = np.flatnonzero(
+        (balls.sum(axis=1) >= 80) & (balls.sum(axis=1) <= 100)
+        & (balls[:, -1] - balls[:, 0] >= 20) & (balls[:, -1] - balls[:, 0] <= 30)
+        & np.isin((balls % 2 == 1).sum(axis=1), [2, 3])
+        & (balls == 7).any(axis=1) & ~np.isin(balls, [1, 2]).any(axis=1))
+    assert np.array_equal(rows, expected)
+    assert space.combinations_at(rows[:1])[0] == balls[expected[0]].tolist()
+
+
+def test_parallel_filter_reuses_one_pool(space):
+    criteria = {'sum_value': [60, 120]}
+    expected = space.filter(criteria)
+    try:
+        first = space.filter(criteria, processes=2, chunk_size=65536)
+        executor = pools._pools['combination_filter']['executor']
+        second = space.filter(criteria, processes=2, chunk_size=65536)
+        assert pools._pools['combination_filter']['executor'] is executor
+    finally:
+        pools.shutdown_process_pools()
+    assert np.array_equal(first, expected)
+    assert np.array_equal(second, expected)
+    assert 'combination_filter' not in pools._pools
+
+
+def test_write_atomic_leaves_no_partial_file(tmp_path):
+    path = str(tmp_path / 'data.bin')
+    write_atomic(path, lambda f: f.write(b'old'))
+
+    def fail(f):
+        f.write(b'partial')
+        raise OSError('disk full')
+    with pytest.raises(OSError):
+        write_atomic(path, fail)
+
+    with open(path, 'rb') as f:
+        assert f.read() == b'old'
+    assert os.listdir(tmp_path) == ['data.bin']
@@ -0,0 +1,68 @@
+"""
+组合共现计数：增量合并与整体构建一致，按数据版本从快照目录加载
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from utils.cooccurrence import GroupCooccurrence
+
+
+def random_draws(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.array([np.sort(rng.choice(np.arange(1, 34), 6, replace=False)) for _ in range(count)])
+
+
+@pytest.mark.parametrize('group_size', [3, 4])
+def test_extend_matches_full_build(group_size):
+    draws = random_draws(300)
+    counter = GroupCooccurrence.from_ball_matrix(draws[:200], group_size)
+    previous_keys = counter.keys.copy()
+    extended = counter.extended(draws[200:250])
+    extended.extend(draws[250:])
+    expected = GroupCooccurrence.from_ball_matrix(draws, group_size)
+
+    assert extended.draw_count == expected.draw_count == 300
+    assert np.array_equal(extended.keys, expected.keys)
+    assert np.array_equal(extended.counts, expected.counts)
+    assert np.all(np.diff(extended.keys.astype(np.int64)) > 0)
+    # 旧计数不受影响
+    assert counter.draw_count == 200
+    assert np.array_equal(counter.keys, previous_keys)
+    group = list(draws[0][:group_size])
+    assert counter.count(group) == GroupCooccurrence.from_ball_matrix(draws[:200], group_size).count(group)
+    assert extended.count(group) == expected.count(group)
+
+
+def test_load_or_build_reuses_saved_counter(tmp_path, monkeypatch):
+    draws = random_draws(120)
+    built = GroupCooccurrence.load_or_build(draws, 3, str(tmp_path), 'ssq_red', 'v1')
+    assert os.listdir(tmp_path) == ['ssq_red-v1.groups3.npz']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('应从快照目录加载')
+    monkeypatch.setattr(GroupCooccurrence, 'from_ball_matrix', classmethod(fail))
+    loaded = GroupCooccurrence.load_or_build(draws, 3, str(tmp_path), 'ssq_red', 'v1')
+
+    assert loaded.draw_count == built.draw_count
+    assert np.array_equal(loaded.keys, built.keys)
+    assert np.array_equal(loaded.counts, built.counts)
+
+
+def test_load_or_build_rebuilds_for_new_version(tmp_path):
+    draws = random_draws(120)
+    GroupCooccurrence.load_or_build(draws[:100], 3, str(tmp_path), 'ssq_red', 'v1')
+    GroupCooccurrence.load_or_build(draws[:100], 3, str(tmp_path), 'dlt_front', 'v1')
+    counter = GroupCooccurrence.load_or_build(draws, 3, str(tmp_path), 'ssq_red', 'v2')
+
+    assert counter.draw_count == 120
+    assert sorted(os.listdir(tmp_path)) == ['dlt_front-v1.groups3.npz', 'ssq_red-v2.groups3.npz']
+
+
+def test_load_or_build_without_directory_stays_in_memory(tmp_path):
+    draws = random_draws(50)
+    counter = GroupCooccurrence.load_or_build(draws, 4)
+    assert counter.draw_count == 50
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,34 @@
+"""
+DataProcessor 的遗漏查询：注册表中的数据集复用常驻的出现位置索引，结果与遗漏矩阵一致
+"""
+
+from blueprints.ssq_bp import RED_COLUMNS
+from utils.data_processor import DataProcessor
+from utils.omission import OccurrenceIndex
+
+
+def test_registered_dataset_reuses_occurrence_index(published_copy, monkeypatch):
+    dataset = published_copy('ssq')
+    frame = dataset.frame
+    assert DataProcessor.occurrence_index(frame, RED_COLUMNS, 33) is dataset.derived['red_occurrences']
+
+    def rebuild(*args, **kwargs):
+        raise AssertionError('注册表中的数据不应重新构建出现位置索引')
+
+    monkeypatch.setattr(OccurrenceIndex, 'from_ball_matrix', rebuild)
+    missed = DataProcessor.get_missed_periods_for_selection(frame, RED_COLUMNS, list(range(1, 34)))
+    expected = dataset.derived['red_missed'][-1]
+    assert missed == {number: int(expected[number - 1]) for number in range(1, 34)}
+    assert DataProcessor.get_missed_periods_for_number(frame, RED_COLUMNS, 7) == int(expected[6])
+
+
+def test_unregistered_frame_builds_index_once(published_copy):
+    dataset = published_copy('ssq')
+    subset = dataset.frame.iloc[:500].reset_index(drop=True)
+    missed = DataProcessor.get_missed_periods_for_selection(subset, RED_COLUMNS, [1, 16, 33, 34, 0])
+    expected = dataset.derived['red_missed'][499]
+    assert missed[1] == expected[0] and missed[16] == expected[15] and missed[33] == expected[32]
+    # 越界号码按从未出现处理
+    assert missed[34] == 18 and missed[0] == 18
+    assert DataProcessor.get_missed_periods_for_number(subset, RED_COLUMNS, 16) == expected[15]
+    assert DataProcessor.get_missed_periods_for_selection(subset.iloc[:0], RED_COLUMNS, [1]) == {1: 18}
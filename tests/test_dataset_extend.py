@@ -0,0 +1,117 @@
+"""
+增量追加开奖的回归测试
+LotteryDataset.extend 加上蓝图的 extend_derived_indexes 得到的派生数据，须与对完整数据重新构建的结果一致
+"""
+
+import numpy as np
+import pytest
+
+from blueprints import ssq_bp, dlt_bp
+from config import Config
+from utils.dataset import GAME_SPECS, LotteryDataset, read_draw_csv
+
+GAMES = {
+    'ssq': (ssq_bp, Config.SSQ_DATA_PATH),
+    'dlt': (dlt_bp, Config.DLT_DATA_PATH)
+}
+
+# 分批追加的期数：单期、多期，以及连续多次追加（检验预留容量的派生数组）
+BATCHES = [[1], [6], [2, 1, 3]]
+
+
+def build_full(game, frame):
+    blueprint = GAMES[game][0]
+    dataset = LotteryDataset(game, frame)
+    blueprint.prepare_dataset_indexes(dataset)
+    return dataset
+
+
+def build_extended(game, frame, batches):
+    blueprint = GAMES[game][0]
+    count = len(frame) - sum(batches)
+    dataset = LotteryDataset(game, frame.iloc[:count].reset_index(drop=True))
+    blueprint.prepare_dataset_indexes(dataset)
+    for size in batches:
+        extended = dataset.extend(frame.iloc[count:count + size])
+        blueprint.extend_derived_indexes(dataset.derived, extended.derived)
+        dataset, count = extended, count + size
+    return dataset
+
+
+@pytest.fixture(scope='module', params=list(GAMES))
+def game_frame(request):
+    game = request.param
+    return game, read_draw_csv(GAMES[game][1], game)
+
+
+@pytest.mark.parametrize('batches', BATCHES)
+def test_extend_matches_rebuild(game_frame, batches):
+    game, frame = game_frame
+    full = build_full(game, frame)
+    extended = build_extended(game, frame, batches)
+    expected, actual = full.derived, extended.derived
+    count = len(frame)
+    windows = [(0, count), (count - 30, count), (count - 100, count - 2)]
+
+    assert extended.version == full.version
+    assert actual['issues'] == expected['issues']
+    np.testing.assert_array_equal(actual['issue_numbers'], expected['issue_numbers'])
+
+    for name, area in GAME_SPECS[game]['areas'].items():
+        # 遗漏
+        np.testing.assert_array_equal(actual[f'{name}_missed'], expected[f'{name}_missed'])
+
+        # 特征表
+        features, expected_features = actual[f'{name}_features'], expected[f'{name}_features']
+        np.testing.assert_array_equal(features.balls, expected_features.balls)
+        assert list(features.columns) == list(expected_features.columns)
+        for column, values in expected_features.columns.items():
+            np.testing.assert_array_equal(features.columns[column], values, err_msg=f'{name}_features.{column}')
+
+        # 出现位置
+        occurrences, expected_occurrences = actual[f'{name}_occurrences'], expected[f'{name}_occurrences']
+        assert occurrences.count == expected_occurrences.count
+        for number in range(area['max_number']):
+            np.testing.assert_array_equal(occurrences.occurrences[number], expected_occurrences.occurrences[number])
+
+        # 号码对共现
+        if area['pairs']:
+            for start, stop in windows:
+                np.testing.assert_array_equal(actual[f'{name}_cooccurrence'].matrix(start, stop),
+                                              expected[f'{name}_cooccurrence'].matrix(start, stop))
+
+    # 3码、4码组合计数
+    assert set(actual['group_counters']) == set(expected['group_counters'])
+    for group_size, counter in expected['group_counters'].items():
+        extended_counter = actual['group_counters'][group_size]
+        assert extended_counter.draw_count == counter.draw_count
+        np.testing.assert_array_equal(extended_counter.keys, counter.keys)
+        np.testing.assert_array_equal(extended_counter.counts, counter.counts)
+
+    # 分布计数：沿用上一份数据的计数表追加；新取值超出自动分箱而未追加的，与请求时一样按需构建
+    assert actual.get('distributions')
+    blueprint = GAMES[game][0]
+    for chart_type, index in expected['distributions'].items():
+        extended_index = blueprint.get_distribution_index(chart_type, actual)
+        for start, stop in windows:
+            assert extended_index.to_dict(start, stop) == index.to_dict(start, stop), f'{chart_type} [{start}, {stop})'
+
+
+def test_extend_leaves_previous_dataset_unchanged(game_frame):
+    game, frame = game_frame
+    base = LotteryDataset(game, frame.iloc[:-3].reset_index(drop=True))
+    issues, version = list(base.derived['issues']), base.version
+
+    first = base.extend(frame.iloc[-3:-1])
+    # 从同一个旧数据集再次追加（底层缓冲区已被占用时复制）
+    second = base.extend(frame.iloc[-3:])
+
+    assert len(base) == len(base.frame) == len(base.derived['issues']) == len(frame) - 3
+    assert list(base.derived['issues']) == issues
+    assert base.version == version
+    assert len(first) == len(frame) - 1
+    assert first.derived['issues'][-1] == str(frame['issue'].iloc[-2])
+    assert first.version == LotteryDataset(game, frame.iloc[:-1].reset_index(drop=True)).version
+    assert second.version == LotteryDataset(game, frame).version
+    np.testing.assert_array_equal(second.issue_array, frame['issue'].to_numpy())
+    assert second.frame.equals(frame)
@@ -0,0 +1,73 @@
+"""
+追加开奖：令牌校验、请求体校验，以及内存中追加失败时不写入CSV
+"""
+
+import pytest
+
+from blueprints import ssq_bp, dlt_bp
+from conftest import make_app
+from utils.dataset import registered_datasets
+
+TOKEN = 'secret-token'
+NEW_DRAWS = {
+    'ssq': {'red': [2, 8, 15, 21, 27, 33], 'blue': 9},
+    'dlt': {'front': [3, 11, 19, 26, 34], 'back': [2, 10]}
+}
+MODULES = {'ssq': ssq_bp, 'dlt': dlt_bp}
+
+
+def next_draw(game, dataset):
+    return dict(NEW_DRAWS[game], issue=int(dataset.frame['issue'].iloc[-1]) + 1)
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('game', ['ssq', 'dlt'])
+def test_failed_extend_leaves_csv_and_dataset_unchanged(game, published_copy, monkeypatch):
+    dataset = published_copy(game)
+    before = read_bytes(dataset.csv_path)
+    draw = next_draw(game, dataset)
+
+    def broken(previous, derived):
+        raise RuntimeError('索引追加失败')
+
+    monkeypatch.setattr(MODULES[game], 'extend_derived_indexes', broken)
+    with pytest.raises(RuntimeError):
+        MODULES[game].ingest_draws([draw])
+    assert read_bytes(dataset.csv_path) == before
+    assert registered_datasets()[game] is dataset
+
+    # 重试不会因为CSV中已有该期而被当作重复期号拒绝
+    monkeypatch.undo()
+    result = MODULES[game].ingest_draws([draw])
+    assert result['added'] == 1
+    assert result['draws'] == len(dataset) + 1
+    assert read_bytes(dataset.csv_path).startswith(before)
+    last_line = read_bytes(dataset.csv_path).rstrip(b'\n').rsplit(b'\n', 1)[-1]
+    assert last_line.startswith(f"{draw['issue']},".encode())
+    assert registered_datasets()[game].version == result['version']
+
+
+@pytest.mark.parametrize('game', ['ssq', 'dlt'])
+def test_ingest_requires_token_and_object_body(game, published_copy):
+    dataset = published_copy(game)
+    draw = next_draw(game, dataset)
+    url = f'/api/v1/{game}/draws?persist=false'
+
+    client = make_app(INGEST_TOKEN=None).test_client()
+    assert client.post(url, json={'draws': [draw]}).status_code == 403
+
+    client = make_app(INGEST_TOKEN=TOKEN).test_client()
+    assert client.post(url, json={'draws': [draw]}).status_code == 401
+    assert client.post(url, json={'draws': [draw]}, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    headers = {'X-API-Token': TOKEN}
+    assert client.post(url, json=[draw], headers=headers).status_code == 400
+    assert client.post(url, json={'draws': []}, headers=headers).status_code == 400
+    response = client.post(url, json={'draws': [draw]}, headers={'Authorization': f'Bearer {TOKEN}'})
+    assert response.status_code == 200
+    assert response.get_json()['added'] == 1
+    assert registered_datasets()[game].version == response.get_json()['version']
@@ -0,0 +1,117 @@
+"""
+后台任务队列：相同参数的提交去重，请求取消的任务不参与去重，所属进程已退出或心跳超时的任务被回收
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.jobs import (JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_RUNNING, JobQueue, current_owner,
+                        job_key, register_job_kind)
+
+release = threading.Event()
+started = threading.Event()
+
+
+def run_blocking(params, job):
+    started.set()
+    while not release.wait(0.01):
+        job.check_cancelled()
+    return {'value': params['value']}
+
+
+register_job_kind('tests.blocking', run_blocking)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    app = Flask(__name__)
+    app.config.update(JOB_STORE_PATH=str(tmp_path / 'jobs.sqlite3'), JOB_WORKERS=1,
+                      JOB_STALE_TIMEOUT=60, JOB_HEARTBEAT_INTERVAL=10)
+    release.clear()
+    started.clear()
+    queue = JobQueue(app)
+    yield queue
+    release.set()
+    queue._executor.shutdown(wait=True)
+
+
+def wait_for_status(queue, job_id, status, timeout=5):
+    deadline = time.time() + timeout
+    while queue.status(job_id)['status'] != status and time.time() < deadline:
+        time.sleep(0.01)
+    return queue.status(job_id)['status']
+
+
+def insert_job(queue, params, status, owner, heartbeat):
+    with queue._connect() as db:
+        db.execute('INSERT INTO jobs (id, kind, key, params, status, created, owner, heartbeat) '
+                   'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                   (f'orphan-{owner}', 'tests.blocking', job_key('tests.blocking', params), '{}', status,
+                    heartbeat, owner, heartbeat))
+    return f'orphan-{owner}'
+
+
+def test_same_params_share_one_job(queue):
+    job, created = queue.submit('tests.blocking', {'value': 1})
+    again, created_again = queue.submit('tests.blocking', {'value': 1})
+    other, created_other = queue.submit('tests.blocking', {'value': 2})
+
+    assert created and not created_again and created_other
+    assert again['id'] == job['id'] != other['id']
+    release.set()
+    assert wait_for_status(queue, job['id'], JOB_DONE) == JOB_DONE
+    assert queue.result(job['id'])[1] == {'value': 1}
+    assert queue.submit('tests.blocking', {'value': 1})[0]['id'] == job['id']
+
+
+def test_cancelled_running_job_is_not_reused(queue):
+    job, _ = queue.submit('tests.blocking', {'value': 1})
+    assert started.wait(5)
+    queue.cancel(job['id'])
+
+    # 请求取消后、任务停止前的重新提交不会合并到正在取消的任务上
+    replacement, created = queue.submit('tests.blocking', {'value': 1})
+    assert created and replacement['id'] != job['id']
+    assert wait_for_status(queue, job['id'], JOB_CANCELLED) == JOB_CANCELLED
+
+
+def test_cancelled_queued_job_is_not_reused(queue):
+    blocker, _ = queue.submit('tests.blocking', {'value': 0})
+    queued, _ = queue.submit('tests.blocking', {'value': 1})
+    assert queue.cancel(queued['id'])['status'] == JOB_CANCELLED
+
+    replacement, created = queue.submit('tests.blocking', {'value': 1})
+    assert created and replacement['id'] != queued['id']
+    release.set()
+    assert wait_for_status(queue, replacement['id'], JOB_DONE) == JOB_DONE
+
+
+def test_job_of_exited_process_is_reclaimed(queue):
+    # 同一主机上不存在的进程号
+    orphan = insert_job(queue, {'value': 1}, JOB_RUNNING, f'{socket.gethostname()}:99999999:dead', time.time())
+
+    job, created = queue.submit('tests.blocking', {'value': 1})
+    assert created and job['id'] != orphan
+    assert queue.status(orphan)['status'] == JOB_FAILED
+
+
+def test_own_job_missing_from_pool_is_reclaimed(queue):
+    # 进程号被复用（如容器重启）：所属标识与本进程相同但任务不在线程池中
+    orphan = insert_job(queue, {'value': 1}, JOB_RUNNING, current_owner(), time.time())
+    assert queue.status(orphan)['status'] == JOB_FAILED
+
+
+def test_remote_job_reclaimed_only_after_heartbeat_timeout(queue):
+    alive = insert_job(queue, {'value': 1}, JOB_RUNNING, 'other-host:1:alive', time.time())
+    job, created = queue.submit('tests.blocking', {'value': 1})
+    assert not created and job['id'] == alive
+
+    stale = insert_job(queue, {'value': 2}, JOB_RUNNING, 'other-host:2:stale', time.time() - 120)
+    job, created = queue.submit('tests.blocking', {'value': 2})
+    assert created and job['id'] != stale
+    assert queue.status(stale)['status'] == JOB_FAILED
+    assert queue.status(alive)['status'] == JOB_RUNNING
@@ -0,0 +1,99 @@
+"""
+共享数据集：派生数组换成快照目录中的只读内存映射，同一版本的其他进程直接映射已有文件；
+是否共享由当前应用的 SHARE_DATASETS 决定（包括蓝图注册时的首次加载）
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from blueprints import ssq_bp
+from conftest import DATA_PATHS, make_app
+from utils import dataset as dataset_module
+from utils.dataset import LotteryDataset, game_columns, registered_datasets, share_dataset
+from utils.snapshot import load_snapshot, snapshot_to_frame
+
+
+def is_mapped(array):
+    """数组是否引用内存映射文件"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base if isinstance(array, np.ndarray) else None
+    return False
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    csv_path = str(tmp_path / os.path.basename(DATA_PATHS['ssq']))
+    shutil.copyfile(DATA_PATHS['ssq'], csv_path)
+    return LotteryDataset.load('ssq', csv_path)
+
+
+def test_share_maps_derived_arrays(dataset, tmp_path):
+    directory = str(tmp_path / 'shared')
+    shared = dataset.share(directory)
+
+    assert shared is not dataset and shared.version == dataset.version
+    assert is_mapped(shared.derived['red_missed'])
+    assert not shared.derived['red_missed'].flags.writeable
+    assert np.array_equal(shared.derived['red_missed'], dataset.derived['red_missed'])
+    assert np.array_equal(shared.features['red'].balls, dataset.features['red'].balls)
+    # 原数据集不变
+    assert not is_mapped(dataset.derived['red_missed'])
+    assert list(shared.derived['issues']) == list(dataset.derived['issues'])
+
+
+def test_same_version_maps_existing_files(dataset, tmp_path):
+    directory = str(tmp_path / 'shared')
+    dataset.share(directory)
+    version_dir = os.path.join(directory, f'ssq-{dataset.version}')
+    mtimes = {name: os.stat(os.path.join(version_dir, name)).st_mtime_ns for name in os.listdir(version_dir)}
+
+    # 另一个进程加载同一版本：直接映射，不重写文件
+    again = LotteryDataset.load('ssq', dataset.csv_path).share(directory)
+    assert is_mapped(again.derived['red_missed'])
+    assert {name: os.stat(os.path.join(version_dir, name)).st_mtime_ns for name in os.listdir(version_dir)} == mtimes
+
+
+def test_new_version_removes_old_files(dataset, tmp_path):
+    directory = str(tmp_path / 'shared')
+    dataset.share(directory)
+    extended = dataset.extend(dataset.frame.iloc[-1:].assign(issue=dataset.frame['issue'].iloc[-1] + 1))
+    extended.share(directory)
+    assert os.listdir(directory) == [f'ssq-{extended.version}']
+
+
+def test_share_dataset_follows_app_config(dataset):
+    app = make_app(SHARE_DATASETS=False)
+    with app.app_context():
+        assert share_dataset(dataset) is dataset
+
+    app = make_app(SHARE_DATASETS=True)
+    with app.app_context():
+        shared = share_dataset(dataset)
+    assert shared is not dataset
+    assert is_mapped(shared.derived['red_missed'])
+
+
+def test_blueprint_first_load_uses_registering_app_config(dataset, isolated_datasets):
+    with dataset_module._datasets_lock:
+        dataset_module._datasets.pop('ssq', None)
+    ssq_bp.ssq_data = None
+
+    make_app(SHARE_DATASETS=True, SSQ_DATA_PATH=dataset.csv_path)
+    loaded = registered_datasets()['ssq']
+    assert ssq_bp.ssq_data is loaded.frame
+    assert is_mapped(loaded.derived['red_missed'])
+
+
+def test_snapshot_frame_references_mapping(dataset):
+    columns = game_columns('ssq')
+    snapshot = load_snapshot(dataset.csv_path, columns)
+    assert snapshot is not None and is_mapped(snapshot['balls'])
+
+    frame = snapshot_to_frame(snapshot, columns)
+    assert np.shares_memory(frame['issue'].to_numpy(), snapshot['issues'])
+    assert frame[columns].to_numpy().tolist() == dataset.frame[columns].to_numpy().tolist()
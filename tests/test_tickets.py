@@ -0,0 +1,99 @@
+"""
+批量兑奖：命中个数到奖级的映射，/check 接口的票据来源
+"""
+
+import io
+import json
+
+import numpy as np
+import pytest
+
+from conftest import make_app
+from utils.tickets import TICKET_RULES, TicketChecker, build_tier_table, parse_ticket
+
+
+@pytest.mark.parametrize('hits, tier', [
+    ((6, 1), 1), ((6, 0), 2), ((5, 1), 3), ((5, 0), 4), ((4, 1), 4),
+    ((4, 0), 5), ((3, 1), 5), ((2, 1), 6), ((1, 1), 6), ((0, 1), 6),
+    ((3, 0), 0), ((2, 0), 0), ((0, 0), 0),
+])
+def test_ssq_tier_table(hits, tier):
+    assert build_tier_table('ssq')[hits] == tier
+
+
+@pytest.mark.parametrize('hits, tier', [
+    ((5, 2), 1), ((5, 1), 2), ((5, 0), 3), ((4, 2), 4), ((4, 1), 5), ((3, 2), 6), ((4, 0), 7),
+    ((3, 1), 8), ((2, 2), 8), ((3, 0), 9), ((1, 2), 9), ((2, 1), 9), ((0, 2), 9),
+    ((2, 0), 0), ((1, 1), 0), ((0, 1), 0), ((0, 0), 0),
+])
+def test_dlt_tier_table(hits, tier):
+    assert build_tier_table('dlt')[hits] == tier
+
+
+def test_tier_table_covers_every_hit_count():
+    for game, rules in TICKET_RULES.items():
+        table = build_tier_table(game)
+        assert table.shape == (rules['front']['count'] + 1, rules['back']['count'] + 1)
+        assert set(np.unique(table)) <= set(range(len(rules['names'])))
+
+
+def test_check_draw_maps_hits_to_tiers():
+    def masks(numbers):
+        return np.array([sum(1 << (n - 1) for n in numbers)], dtype=np.uint64)
+
+    checker = TicketChecker('ssq', masks([1, 2, 3, 4, 5, 6]), masks([7]), ['2024001'])
+    for front, back, expected in [([1, 2, 3, 4, 5, 6], [7], 1), ([1, 2, 3, 4, 5, 33], [7], 3),
+                                  ([1, 2, 3, 4, 32, 33], [8], 5), ([28, 29, 30, 31, 32, 33], [7], 6),
+                                  ([1, 2, 30, 31, 32, 33], [8], 0)]:
+        front_hits, back_hits, tiers = checker.check_draw(masks(front), masks(back), 0)
+        assert int(tiers[0]) == expected
+
+
+def test_parse_ticket_rejects_invalid_numbers():
+    assert parse_ticket('06 05 04 03 02 01 + 07', 'ssq') == ([1, 2, 3, 4, 5, 6], [7])
+    for line in ['1 2 3 4 5 + 7', '1 2 3 4 5 5 + 7', '1 2 3 4 5 34 + 7', '1 2 3 4 5 6 + 7 + 8']:
+        with pytest.raises(ValueError):
+            parse_ticket(line, 'ssq')
+
+
+@pytest.fixture
+def ssq_client(published_copy):
+    dataset = published_copy('ssq')
+    return make_app().test_client(), dataset
+
+
+def latest_ticket(dataset):
+    row = dataset.frame.iloc[-1]
+    red = ' '.join(str(int(row[f'red{i}'])) for i in range(1, 7))
+    return f"{red} + {int(row['blue'])}\n"
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_check_raw_body(ssq_client):
+    client, dataset = ssq_client
+    response = client.post('/api/v1/ssq/check', data=latest_ticket(dataset), content_type='text/plain')
+    assert response.status_code == 200
+    records = read_ndjson(response)
+    assert records[1]['tier'] == 1
+    assert records[-1]['summary']['tiers']['一等奖'] == 1
+
+
+def test_check_multipart_file(ssq_client):
+    client, dataset = ssq_client
+    response = client.post('/api/v1/ssq/check', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(latest_ticket(dataset).encode()), 'tickets.txt')})
+    assert response.status_code == 200
+    assert read_ndjson(response)[1]['prize'] == '一等奖'
+
+
+@pytest.mark.parametrize('game', ['ssq', 'dlt'])
+def test_check_multipart_without_file_is_rejected(published_copy, game):
+    published_copy(game)
+    client = make_app().test_client()
+    response = client.post(f'/api/v1/{game}/check', content_type='multipart/form-data',
+                           data={'tickets': (io.BytesIO(b'1 2 3 4 5 6 + 7\n'), 'tickets.txt')})
+    assert response.status_code == 400
+    assert 'file' in response.get_json()['error']
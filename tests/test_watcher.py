@@ -0,0 +1,83 @@
+"""
+数据文件监视：文件连续两次轮询不变才重新加载，重新加载后整体替换数据集（旧数据集保持不变），
+内容未变或加载失败时不发布
+"""
+
+import os
+
+from blueprints import ssq_bp
+from utils.dataset import registered_datasets
+from utils.watcher import DatasetWatcher
+
+
+def append_line(path, line):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+
+
+def next_line(dataset, offset=1):
+    return f"{int(dataset.frame['issue'].iloc[-1]) + offset},2,8,15,21,27,33,9"
+
+
+def test_reload_waits_until_file_is_stable(published_copy):
+    dataset = published_copy('ssq')
+    watcher = DatasetWatcher()
+    assert watcher.check_once() == []
+
+    append_line(dataset.csv_path, next_line(dataset, 1))
+    assert watcher.check_once() == []
+    # 两次轮询之间文件仍在写入
+    append_line(dataset.csv_path, next_line(dataset, 2))
+    assert watcher.check_once() == []
+    assert registered_datasets()['ssq'] is dataset
+
+    assert watcher.check_once() == ['ssq']
+    assert len(registered_datasets()['ssq']) == len(dataset) + 2
+    assert watcher.check_once() == []
+
+
+def test_reload_swaps_dataset_without_touching_old_one(published_copy):
+    dataset = published_copy('ssq')
+    old_frame, old_version, old_issues = dataset.frame, dataset.version, list(dataset.derived['issues'])
+    watcher = DatasetWatcher()
+    watcher.check_once()
+
+    append_line(dataset.csv_path, next_line(dataset))
+    watcher.check_once()
+    assert watcher.check_once() == ['ssq']
+
+    current = registered_datasets()['ssq']
+    assert current is not dataset
+    assert current.version != old_version
+    # 处理中的请求持有的旧数据集不受影响
+    assert dataset.frame is old_frame and len(dataset.frame) == len(old_issues)
+    assert list(dataset.derived['issues']) == old_issues
+    # 蓝图切换到新数据集，派生索引已在发布前构建
+    assert ssq_bp.ssq_data is current.frame
+    assert ssq_bp.get_derived_data() is current.derived
+    assert set(current.derived['group_counters']) == {3, 4}
+
+
+def test_unchanged_content_is_not_republished(published_copy):
+    dataset = published_copy('ssq')
+    watcher = DatasetWatcher()
+    watcher.check_once()
+
+    stat = os.stat(dataset.csv_path)
+    os.utime(dataset.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    watcher.check_once()
+    assert watcher.check_once() == []
+    assert registered_datasets()['ssq'] is dataset
+
+
+def test_failed_reload_keeps_old_dataset(published_copy):
+    dataset = published_copy('ssq')
+    watcher = DatasetWatcher()
+    watcher.check_once()
+
+    with open(dataset.csv_path, 'w', encoding='utf-8') as f:
+        f.write('not,a,lottery,file\n1,2\n')
+    watcher.check_once()
+    assert watcher.check_once() == []
+    assert registered_datasets()['ssq'] is dataset
+    assert ssq_bp.get_derived_data() is dataset.derived
@@ -0,0 +1,42 @@
+"""
+接口令牌校验
+写入类接口（如追加开奖数据）要求请求携带与配置项一致的令牌：
+Authorization: Bearer <令牌> 或 X-API-Token: <令牌>；配置项为空时接口关闭
+"""
+
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+
+def request_token():
+    """从请求头取得令牌，没有时返回None"""
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):].strip()
+    return request.headers.get('X-API-Token')
+
+
+def token_error(config_key):
+    """校验请求令牌与 current_app.config[config_key] 一致，不一致时返回错误响应，一致时返回None"""
+    expected = current_app.config.get(config_key)
+    if not expected:
+        return jsonify({'error': '接口未启用'}), 403
+    token = request_token()
+    if token is None or not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+        return jsonify({'error': '令牌无效'}), 401
+    return None
+
+
+def require_token(config_key):
+    """视图装饰器：校验请求令牌与 current_app.config[config_key] 一致"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            error = token_error(config_key)
+            if error is not None:
+                return error
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
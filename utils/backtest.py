@@ -0,0 +1,389 @@
+"""
+选号策略回测
+策略在第 i 期开奖后只使用第 i 期及以前的数据选号（遗漏值、近期出现次数、当期特征），
+与第 i+1 ~ i+horizon 期开奖号码比对，统计命中个数分布与（复式）中奖注数。
+策略之间、期区间之间互不依赖，可按 (策略, 期区间) 分片交给进程内复用的进程池并行计算，
+开奖数据随每批分片传入一次，以只读数组共享
+"""
+
+import ast
+import math
+import numpy as np
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.bitmask import popcount
+from utils.omission import build_presence_matrix
+from utils.pools import discard_process_pool, get_process_pool
+from utils.tickets import TICKET_RULES, build_tier_table
+
+# 每个分片的期数
+BACKTEST_SHARD_SIZE = 500
+
+# 近期出现次数的默认统计期数
+DEFAULT_FREQUENCY_WINDOW = 30
+
+# 号码选择规则
+STRATEGY_TYPES = ['coldest', 'hottest', 'omission_above', 'omission_below', 'frequent', 'infrequent',
+                  'fixed', 'expression']
+
+# 表达式中允许的运算
+_BINARY_OPERATORS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.true_divide, ast.FloorDiv: np.floor_divide, ast.Mod: np.mod,
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: np.equal, ast.NotEq: np.not_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+}
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array = np.ascontiguousarray(array)
+    array.flags.writeable = False
+    return array
+
+
+def build_backtest_context(game: str, areas: Dict[str, Dict[str, np.ndarray]],
+                           features: Dict[str, np.ndarray], issues: List[str]) -> Dict[str, Any]:
+    """
+    构建回测所需的只读数据
+
+    Args:
+        game: 'ssq' 或 'dlt'
+        areas: {'front': {'balls', 'missed'}, 'back': {...}}，按期排列的号码矩阵与遗漏值矩阵
+        features: 前区每期的整数特征列（表达式中可引用，如 sum_value、span）
+        issues: 期号列表
+    """
+    rules = TICKET_RULES[game]
+    context = {'game': game, 'issues': list(issues), 'features': {}}
+    for area in ('front', 'back'):
+        max_number = rules[area]['max_number']
+        presence = build_presence_matrix(areas[area]['balls'], max_number)
+        prefix = np.zeros((len(presence) + 1, max_number), dtype=np.int32)
+        np.cumsum(presence, axis=0, out=prefix[1:])
+        bits = np.left_shift(np.uint64(1), np.arange(max_number, dtype=np.uint64))
+        masks = np.bitwise_or.reduce(np.where(presence, bits, np.uint64(0)), axis=1) \
+            if len(presence) else np.zeros(0, dtype=np.uint64)
+        context[area] = {
+            'max_number': max_number,
+            'masks': _read_only(masks),
+            'missed': _read_only(np.asarray(areas[area]['missed'], dtype=np.int64)),
+            'prefix': _read_only(prefix),
+        }
+
+    for name, values in features.items():
+        values = np.asarray(values)
+        if values.ndim == 1 and values.dtype.kind in 'iu' and name != 'bitmask':
+            context['features'][name] = _read_only(values.astype(np.int64))
+    return context
+
+
+def _evaluate_expression(node, variables: Dict[str, np.ndarray]):
+    """对表达式语法树做向量化求值，只允许变量、数字、算术、比较与逻辑运算"""
+    if isinstance(node, ast.Expression):
+        return _evaluate_expression(node.body, variables)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError(f'表达式中的变量不存在: {node.id}')
+        return variables[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](_evaluate_expression(node.left, variables),
+                                                _evaluate_expression(node.right, variables))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return np.negative(_evaluate_expression(node.operand, variables))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return np.logical_not(_evaluate_expression(node.operand, variables))
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result = _evaluate_expression(node.values[0], variables)
+        for value in node.values[1:]:
+            result = combine(result, _evaluate_expression(value, variables))
+        return result
+    if isinstance(node, ast.Compare):
+        result, left = True, _evaluate_expression(node.left, variables)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE_OPERATORS:
+                raise ValueError('表达式中含不支持的比较运算')
+            right = _evaluate_expression(comparator, variables)
+            result = np.logical_and(result, _COMPARE_OPERATORS[type(op)](left, right))
+            left = right
+        return result
+    raise ValueError('表达式中含不支持的语法')
+
+
+def compile_expression(expression: str) -> ast.Expression:
+    """
+    解析号码筛选表达式，如 'missed > 5 and missed < 20 and number % 2 == 1'
+
+    Raises:
+        ValueError: 语法错误
+    """
+    try:
+        return ast.parse(expression, mode='eval')
+    except SyntaxError:
+        raise ValueError(f'表达式语法错误: {expression}')
+
+
+def validate_strategy(strategy: Dict[str, Any], game: str) -> Dict[str, Any]:
+    """
+    校验并规范化策略定义
+
+    策略格式：{"name": "最冷6码", "front": {"type": "coldest", "count": 6}, "back": {...}}，
+    front/back 至少提供一个；各号码区的选号规则：
+        coldest / hottest: 遗漏值最大 / 最小的 count 个号码
+        omission_above / omission_below: 遗漏值大于 / 小于 threshold 的号码
+        frequent / infrequent: 最近 window 期出现次数最多 / 最少的 count 个号码
+        fixed: 固定号码 numbers
+        expression: 表达式为真的号码，可用变量 number、missed、frequency（最近 window 期出现次数）
+                    及前区每期特征（如 sum_value、span、ac_value、repeat_count）
+
+    Raises:
+        ValueError: 定义无效
+    """
+    if not isinstance(strategy, dict):
+        raise ValueError('策略必须为对象')
+    rules = TICKET_RULES[game]
+    normalized = {'name': str(strategy.get('name') or '')}
+    for area in ('front', 'back'):
+        rule = strategy.get(area)
+        if rule is None:
+            continue
+        if not isinstance(rule, dict) or rule.get('type') not in STRATEGY_TYPES:
+            raise ValueError(f'选号规则无效，可选: {STRATEGY_TYPES}')
+        max_number = rules[area]['max_number']
+        rule = dict(rule)
+        if rule['type'] in ('coldest', 'hottest', 'frequent', 'infrequent'):
+            count = rule.get('count', rules[area]['count'])
+            if not isinstance(count, int) or not 1 <= count <= max_number:
+                raise ValueError(f'选号个数必须在1~{max_number}之间')
+            rule['count'] = count
+        if rule['type'] in ('omission_above', 'omission_below'):
+            if not isinstance(rule.get('threshold'), (int, float)):
+                raise ValueError('遗漏阈值 threshold 必须为数字')
+        if rule['type'] == 'fixed':
+            numbers = rule.get('numbers') or []
+            if any(not isinstance(n, int) or not 1 <= n <= max_number for n in numbers):
+                raise ValueError('固定号码超出范围')
+        if rule['type'] == 'expression':
+            compile_expression(str(rule.get('expression', '')))
+        if rule['type'] in ('frequent', 'infrequent', 'expression'):
+            window = rule.get('window', DEFAULT_FREQUENCY_WINDOW)
+            if not isinstance(window, int) or window < 1:
+                raise ValueError('统计期数 window 必须为正整数')
+            rule['window'] = window
+        normalized[area] = rule
+
+    if 'front' not in normalized and 'back' not in normalized:
+        raise ValueError('策略至少需要前区或后区的选号规则')
+    return normalized
+
+
+def select_numbers(context: Dict[str, Any], area: str, rule: Dict[str, Any],
+                   start: int, stop: int) -> np.ndarray:
+    """
+    第 start ~ stop-1 期开奖后按规则选出的号码
+
+    Returns:
+        (stop-start, max_number) 布尔矩阵
+    """
+    data = context[area]
+    max_number = data['max_number']
+    missed = data['missed'][start:stop]
+    rows = stop - start
+    kind = rule['type']
+
+    def frequency():
+        window = rule['window']
+        ends = np.arange(start, stop) + 1
+        return data['prefix'][ends] - data['prefix'][np.maximum(ends - window, 0)]
+
+    def top(scores):
+        # 分数相同按号码升序（稳定排序）
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :rule['count']]
+        selected = np.zeros((rows, max_number), dtype=bool)
+        np.put_along_axis(selected, order, True, axis=1)
+        return selected
+
+    if kind == 'coldest':
+        return top(missed)
+    if kind == 'hottest':
+        return top(-missed)
+    if kind == 'frequent':
+        return top(frequency())
+    if kind == 'infrequent':
+        return top(-frequency())
+    if kind == 'omission_above':
+        return missed > rule['threshold']
+    if kind == 'omission_below':
+        return missed < rule['threshold']
+    if kind == 'fixed':
+        selected = np.zeros((rows, max_number), dtype=bool)
+        selected[:, np.asarray(rule['numbers'], dtype=np.int64) - 1] = True
+        return selected
+
+    variables = {name: values[start:stop, None] for name, values in context['features'].items()}
+    variables.update({
+        'number': np.arange(1, max_number + 1)[None, :],
+        'missed': missed,
+        'frequency': frequency(),
+    })
+    result = _evaluate_expression(compile_expression(rule['expression']), variables)
+    return np.broadcast_to(np.asarray(result, dtype=bool), (rows, max_number))
+
+
+def _selection_masks(selected: np.ndarray) -> np.ndarray:
+    bits = np.left_shift(np.uint64(1), np.arange(selected.shape[1], dtype=np.uint64))
+    return np.bitwise_or.reduce(np.where(selected, bits, np.uint64(0)), axis=1)
+
+
+def _ticket_tiers(game: str, picked: Tuple[int, int], hits: Tuple[int, int]) -> np.ndarray:
+    """复式选号（前区 f 个、后区 b 个，分别命中 hf、hb 个）拆分为单式后各奖级的注数"""
+    rules = TICKET_RULES[game]
+    tier_table = build_tier_table(game)
+    (front_picked, back_picked), (front_hits, back_hits) = picked, hits
+    front_count, back_count = rules['front']['count'], rules['back']['count']
+    counts = np.zeros(len(rules['names']), dtype=np.int64)
+    for i in range(front_count + 1):
+        front_ways = math.comb(front_hits, i) * math.comb(front_picked - front_hits, front_count - i)
+        if not front_ways:
+            continue
+        for j in range(back_count + 1):
+            ways = front_ways * math.comb(back_hits, j) * math.comb(back_picked - back_hits, back_count - j)
+            counts[tier_table[i, j]] += ways
+    return counts
+
+
+def run_shard(context: Dict[str, Any], strategy: Dict[str, Any], start: int, stop: int,
+              horizon: int = 1) -> Dict[str, Any]:
+    """
+    回测一个分片：第 start ~ stop-1 期开奖后选号，与随后 horizon 期比对
+
+    未提供后区规则时按后区未命中计算奖级（只统计前区可中的奖级）
+    """
+    game = context['game']
+    rules = TICKET_RULES[game]
+    draw_count = len(context['front']['masks'])
+    stop = min(stop, draw_count)
+
+    picked, picked_counts = {}, {}
+    for area in ('front', 'back'):
+        if area in strategy:
+            picked[area] = _selection_masks(select_numbers(context, area, strategy[area], start, stop))
+            picked_counts[area] = popcount(picked[area])
+        else:
+            picked[area] = np.zeros(max(stop - start, 0), dtype=np.uint64)
+            picked_counts[area] = np.full(max(stop - start, 0), rules[area]['count'], dtype=np.int64)
+
+    front_hits, back_hits, groups = [], [], []
+    picked_total = 0
+    for offset in range(1, horizon + 1):
+        targets = np.arange(start, stop) + offset
+        scored = targets < draw_count
+        if not scored.any():
+            break
+        front = popcount(picked['front'][scored] & context['front']['masks'][targets[scored]])
+        back = popcount(picked['back'][scored] & context['back']['masks'][targets[scored]])
+        front_hits.append(front)
+        back_hits.append(back)
+        picked_total += int(picked_counts['front'][scored].sum())
+        groups.append(np.stack([picked_counts['front'][scored], front,
+                                picked_counts['back'][scored], back], axis=1))
+
+    tiers = np.zeros(len(rules['names']), dtype=np.int64)
+    tickets = 0
+    if groups:
+        front_hits, back_hits = np.concatenate(front_hits), np.concatenate(back_hits)
+        # 按 (前区选号数, 前区命中, 后区选号数, 后区命中) 去重后计算复式拆分注数
+        combos, multiplicity = np.unique(np.concatenate(groups), axis=0, return_counts=True)
+        for (front_picked, front_hit, back_picked, back_hit), times in zip(combos.tolist(), multiplicity.tolist()):
+            tiers += _ticket_tiers(game, (front_picked, back_picked), (front_hit, back_hit)) * times
+            tickets += math.comb(front_picked, rules['front']['count']) * \
+                math.comb(back_picked, rules['back']['count']) * times
+    else:
+        front_hits = back_hits = np.zeros(0, dtype=np.int64)
+
+    return {
+        'draws': int(len(front_hits)),
+        'front_hits': np.bincount(front_hits, minlength=rules['front']['count'] + 1),
+        'back_hits': np.bincount(back_hits, minlength=rules['back']['count'] + 1),
+        'tiers': tiers,
+        'tickets': tickets,
+        'picked_total': picked_total
+    }
+
+
+def _run_shard_task(task) -> Tuple[int, Dict[str, Any]]:
+    """多进程分片回测（子进程中执行）"""
+    context, strategy_index, strategy, start, stop, horizon = task
+    return strategy_index, run_shard(context, strategy, start, stop, horizon)
+
+
+def run_backtest(context: Dict[str, Any], strategies: List[Dict[str, Any]], start: int = 0,
+                 stop: Optional[int] = None, horizon: int = 1, processes: int = 0,
+                 shard_size: int = BACKTEST_SHARD_SIZE) -> List[Dict[str, Any]]:
+    """
+    回测多个策略
+
+    Args:
+        context: build_backtest_context 构建的数据
+        strategies: 策略定义列表，见 validate_strategy
+        start, stop: 选号期区间 [start, stop)，stop 缺省为最后一期（最后一期之后没有开奖可比对）
+        horizon: 每次选号比对随后的期数
+        processes: 大于1时按 (策略, 期区间) 分片交给进程池并行，同一进程数的进程池在进程内复用
+        shard_size: 每个分片的期数
+
+    Returns:
+        每个策略的命中分布与奖级注数
+    """
+    game = context['game']
+    names = TICKET_RULES[game]['names']
+    draw_count = len(context['front']['masks'])
+    stop = draw_count - 1 if stop is None else min(stop, draw_count - 1)
+    strategies = [validate_strategy(strategy, game) for strategy in strategies]
+
+    tasks = [(i, strategy, shard_start, min(shard_start + shard_size, stop), horizon)
+             for i, strategy in enumerate(strategies)
+             for shard_start in range(max(start, 0), stop, shard_size)]
+
+    parts = None
+    if processes > 1 and len(tasks) > 1:
+        # 进程池在进程内复用；任务按进程数分批提交，同一批任务一起序列化，开奖数据每批只传一次
+        executor = get_process_pool('backtest', processes)
+        try:
+            parts = list(executor.map(_run_shard_task, [(context,) + task for task in tasks],
+                                      chunksize=math.ceil(len(tasks) / processes)))
+        except BrokenProcessPool as e:
+            print(f"警告: 回测进程池已损坏，改为在当前进程中计算: {e}")
+            discard_process_pool('backtest', executor)
+    if parts is None:
+        parts = [(task[0], run_shard(context, *task[1:])) for task in tasks]
+
+    totals = [{'draws': 0, 'front_hits': 0, 'back_hits': 0, 'tiers': 0, 'tickets': 0, 'picked_total': 0}
+              for _ in strategies]
+    for strategy_index, part in parts:
+        for key, value in part.items():
+            totals[strategy_index][key] = totals[strategy_index][key] + value
+
+    results = []
+    for strategy, total in zip(strategies, totals):
+        front_hits = np.asarray(total['front_hits'], dtype=np.int64).reshape(-1)
+        draws = total['draws']
+        results.append({
+            'name': strategy['name'],
+            'strategy': strategy,
+            'draws': draws,
+            'average_picked': round(total['picked_total'] / draws, 2) if draws else 0,
+            'average_front_hits': round(float((front_hits * np.arange(len(front_hits))).sum()) / draws, 4)
+            if draws else 0,
+            'front_hits': {str(k): int(v) for k, v in enumerate(front_hits.tolist())},
+            'back_hits': {str(k): int(v) for k, v in
+                          enumerate(np.asarray(total['back_hits'], dtype=np.int64).reshape(-1).tolist())},
+            'tickets': int(total['tickets']),
+            'tiers': {names[t]: int(c) for t, c in
+                      enumerate(np.asarray(total['tiers'], dtype=np.int64).reshape(-1).tolist()) if t}
+        })
+    return results
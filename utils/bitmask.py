@@ -0,0 +1,82 @@
+"""
+开奖号码位掩码表示
+每期号码存为一个整数位掩码（号码n对应第 n-1 位），双色球红/蓝球 33/16 位，大乐透前/后区 35/12 位。
+重号个数 = popcount(a & b)，邻号个数 = popcount(a & ((b << 1) | (b >> 1)))，
+可对整个历史向量化计算
+"""
+
+import numpy as np
+from typing import List
+
+# 单字节 popcount 查找表，用于不支持 np.bitwise_count 的 NumPy 版本
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """向量化统计每个位掩码中1的个数"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int64)
+
+    counts = _POPCOUNT_TABLE[masks.view(np.uint8)].reshape(masks.shape + (8,))
+    return counts.sum(axis=-1, dtype=np.int64)
+
+
+def build_bitmasks(ball_matrix: np.ndarray) -> np.ndarray:
+    """
+    将 (期数, 号码个数) 号码矩阵转换为每期一个 uint64 位掩码
+
+    号码须在1~64之间，越界号码（如缺失值0）忽略
+    """
+    balls = np.asarray(ball_matrix, dtype=np.int64)
+    valid = (balls >= 1) & (balls <= 64)
+    bits = np.left_shift(np.uint64(1), np.where(valid, balls - 1, 0).astype(np.uint64))
+    bits = np.where(valid, bits, np.uint64(0))
+    return np.bitwise_or.reduce(bits, axis=1) if balls.shape[1] else np.zeros(len(balls), dtype=np.uint64)
+
+
+def numbers_to_mask(numbers: List[int]) -> int:
+    """单组号码转换为位掩码"""
+    mask = 0
+    for num in numbers:
+        if 1 <= num <= 64:
+            mask |= 1 << (num - 1)
+    return mask
+
+
+def mask_to_numbers(mask: int) -> List[int]:
+    """位掩码还原为升序号码列表"""
+    numbers = []
+    num = 1
+    while mask:
+        if mask & 1:
+            numbers.append(num)
+        mask >>= 1
+        num += 1
+    return numbers
+
+
+def adjacent_mask(masks):
+    """与给定号码相差±1的号码集合的位掩码"""
+    if isinstance(masks, np.ndarray):
+        one = np.uint64(1)
+        return (masks << one) | (masks >> one)
+    return (masks << 1) | (masks >> 1)
+
+
+def repeat_counts(masks: np.ndarray) -> np.ndarray:
+    """每期与上期的重号个数，第一期为0"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    counts = np.zeros(len(masks), dtype=np.int64)
+    if len(masks) > 1:
+        counts[1:] = popcount(masks[1:] & masks[:-1])
+    return counts
+
+
+def adjacent_counts(masks: np.ndarray) -> np.ndarray:
+    """每期与上期的邻号个数（当期号码与上期任一号码相差±1即计一次），第一期为0"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    counts = np.zeros(len(masks), dtype=np.int64)
+    if len(masks) > 1:
+        counts[1:] = popcount(masks[1:] & adjacent_mask(masks[:-1]))
+    return counts
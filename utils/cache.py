@@ -1,100 +1,937 @@
 """
 缓存工具模块
-如果flask_caching不可用，使用简易缓存替代
+提供有界的 LRU + TTL 内存缓存后端：
+- 限制最大条目数与总字节数，超出时按最近最少使用淘汰
+- 读取时惰性过期，并按固定间隔批量清理过期条目
+- 维护有序键索引，按前缀删除无需扫描全部键
+以及同一主机上多个 gunicorn worker 共享的 SQLite 二级缓存（SQLiteCache），
+两者组合为 TieredCache：进程内 LRU 为一级，SQLite 为二级。
+flask_caching 可用时通过 CACHE_TYPE = 'utils.cache.tiered_cache_factory'（或 lru_cache_factory）
+作为应用缓存后端，不可用或未接入应用时直接作为进程内缓存
 """
 
+import bisect
+import gzip
+import hashlib
+import heapq
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
 try:
-    from flask_caching import Cache
-    cache = Cache()
-    
-    def cached(timeout=300, key_prefix='view_'):
-        """缓存装饰器 - 使用flask_caching"""
-        from functools import wraps
-        import hashlib
-        import json
-        
-        def decorator(f):
-            @wraps(f)
-            def decorated_function(*args, **kwargs):
-                cache_key = key_prefix + hashlib.md5(
-                    (f.__name__ + json.dumps(args, sort_keys=True) + 
-                     json.dumps(kwargs, sort_keys=True)).encode('utf-8')
-                ).hexdigest()
-                
-                cached_result = cache.get(cache_key)
-                if cached_result is not None:
-                    return cached_result
-                
-                result = f(*args, **kwargs)
-                cache.set(cache_key, result, timeout=timeout)
-                return result
-            return decorated_function
-        return decorator
-    
+    import brotli
 except ImportError:
-    # 如果flask_caching不可用，使用简易内存缓存
-    print("警告: flask_caching 未安装，使用简易内存缓存")
-    
-    class SimpleCache:
-        def __init__(self):
-            self._cache = {}
-        
-        def get(self, key):
-            return self._cache.get(key)
-        
-        def set(self, key, value, timeout=None):
-            self._cache[key] = value
-        
-        def delete(self, key):
-            if key in self._cache:
-                del self._cache[key]
-        
-        def clear(self):
-            self._cache.clear()
-        
-        def delete_pattern(self, pattern):
-            keys_to_delete = [k for k in self._cache.keys() if pattern in k]
+    brotli = None
+
+
+class LRUCache:
+    """有界 LRU + TTL 内存缓存（线程安全）"""
+
+    def __init__(self, max_entries=1000, max_bytes=128 * 1024 * 1024,
+                 default_timeout=300, sweep_interval=60):
+        """
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 缓存值的估算总字节数上限
+            default_timeout: 默认过期时间（秒），0 表示永不过期
+            sweep_interval: 批量清理过期条目的间隔（秒）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_timeout = default_timeout
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.RLock()
+        # key -> (value, expiry, size)，按访问顺序排列，最久未使用的在前
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        # 过期时间小顶堆 (expiry, key)，用于定期清理
+        self._expiry_heap = []
+        # 有序键列表，用于前缀删除
+        self._sorted_keys = []
+        self._last_sweep = time.time()
+
+    # ---------------- 内部方法 ----------------
+
+    @staticmethod
+    def _estimate_size(value):
+        """估算缓存值占用的字节数"""
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        if isinstance(value, str):
+            return sys.getsizeof(value)
+        if isinstance(value, dict):
+            # 缓存条目（如JSON的各编码变体）按各值分别估算
+            return sum(LRUCache._estimate_size(v) for v in value.values()) + 64 * len(value)
+        if hasattr(value, 'get_data'):
+            # Flask Response
+            try:
+                return len(value.get_data()) + 512
+            except Exception:
+                pass
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(value)
+
+    def _expiry_for(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return time.time() + timeout if timeout and timeout > 0 else None
+
+    def _remove(self, key):
+        value, expiry, size = self._entries.pop(key)
+        self._total_bytes -= size
+        index = bisect.bisect_left(self._sorted_keys, key)
+        if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+            del self._sorted_keys[index]
+
+    def _evict(self):
+        """按LRU顺序淘汰，直到满足条目数与字节数限制"""
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def _sweep(self, now):
+        """批量清理已过期的条目"""
+        self._last_sweep = now
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expiry, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # 条目可能已被覆盖或删除，只有过期时间一致时才清理
+            if entry is not None and entry[1] == expiry:
+                self._remove(key)
+
+        # 堆中失效记录过多时重建
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(entry[1], key) for key, entry in self._entries.items()
+                                 if entry[1] is not None]
+            heapq.heapify(self._expiry_heap)
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        return now
+
+    # ---------------- 缓存接口 ----------------
+
+    def get(self, key):
+        with self._lock:
+            now = self._maybe_sweep()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expiry, size = entry
+            if expiry is not None and expiry <= now:
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def set(self, key, value, timeout=None):
+        size = self._estimate_size(value)
+        with self._lock:
+            self._maybe_sweep()
+            if key in self._entries:
+                self._remove(key)
+
+            # 单个值超过字节上限时不缓存
+            if size > self.max_bytes:
+                return False
+
+            expiry = self._expiry_for(timeout)
+            self._entries[key] = (value, expiry, size)
+            self._total_bytes += size
+            bisect.insort(self._sorted_keys, key)
+            if expiry is not None:
+                heapq.heappush(self._expiry_heap, (expiry, key))
+
+            self._evict()
+            return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if self.get(key) is not None:
+                return False
+            return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def get_dict(self, *keys):
+        return {key: self.get(key) for key in keys}
+
+    def set_many(self, mapping, timeout=None):
+        return [key for key, value in mapping.items() if self.set(key, value, timeout)]
+
+    def delete_many(self, *keys):
+        return [key for key in keys if self.delete(key)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap = []
+            self._sorted_keys = []
+            self._total_bytes = 0
+            return True
+
+    def delete_prefix(self, prefix):
+        """删除指定前缀的所有键（基于有序键索引，O(log n + k)）"""
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_keys, prefix)
+            end = start
+            while end < len(self._sorted_keys) and self._sorted_keys[end].startswith(prefix):
+                end += 1
+
+            keys = self._sorted_keys[start:end]
+            del self._sorted_keys[start:end]
+            for key in keys:
+                value, expiry, size = self._entries.pop(key)
+                self._total_bytes -= size
+            return len(keys)
+
+    def delete_pattern(self, pattern):
+        """
+        按模式删除键
+        以 '*' 结尾的模式按前缀删除，其余按子串匹配（兼容旧行为）
+        """
+        if pattern.endswith('*') and '*' not in pattern[:-1]:
+            return self.delete_prefix(pattern[:-1])
+
+        with self._lock:
+            keys_to_delete = [k for k in self._entries if pattern in k]
             for key in keys_to_delete:
-                del self._cache[key]
-    
-    cache = SimpleCache()
-    
-    def cached(timeout=300, key_prefix='view_'):
-        """简易缓存装饰器"""
-        from functools import wraps
-        import hashlib
-        import json
-        import time
-        
-        def decorator(f):
-            @wraps(f)
-            def decorated_function(*args, **kwargs):
-                cache_key = key_prefix + hashlib.md5(
-                    (f.__name__ + json.dumps(args, sort_keys=True) + 
-                     json.dumps(kwargs, sort_keys=True)).encode('utf-8')
-                ).hexdigest()
-                
-                # 检查缓存
-                cached_data = cache.get(cache_key)
-                if cached_data and cached_data.get('expiry', 0) > time.time():
-                    return cached_data['value']
-                
-                # 执行函数
-                result = f(*args, **kwargs)
-                
-                # 缓存结果
-                cache.set(cache_key, {
-                    'value': result,
-                    'expiry': time.time() + timeout
-                })
-                
-                return result
-            return decorated_function
-        return decorator
+                self._remove(key)
+            return len(keys_to_delete)
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+
+class SQLiteCache:
+    """
+    SQLite 文件缓存（同一主机上的多个进程共享，线程安全）
+
+    每个条目为一行：键、pickle 序列化的值、过期时间与条目格式版本，单条写入是一个事务，
+    并发进程不会读到半写入的条目；格式版本不一致的条目视为未命中。
+    缓存键本身带有数据版本标签（见 make_cache_key），数据更新后由 delete_prefix 清除旧版本；
+    文件跨重启与部署保留，因此键还带有命名空间（代码指纹），代码或模板变化后旧条目不再命中，
+    所有条目最长保存 max_timeout 秒
+    """
+
+    # 条目格式版本：缓存值的结构变化时递增，旧格式条目自动失效
+    FORMAT_VERSION = 1
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expiry REAL,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        format INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_created ON cache (created);
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, default_timeout=300, sweep_interval=60,
+                 namespace='', max_timeout=24 * 3600):
+        """
+        Args:
+            path: SQLite 文件路径
+            max_bytes: 条目总字节数上限，超出时按写入时间从早到晚淘汰
+            default_timeout: 默认过期时间（秒），0 表示不超过 max_timeout
+            sweep_interval: 清理过期条目与容量检查的间隔（秒）
+            namespace: 键的命名空间（如代码指纹），启动时删除其他命名空间的条目
+            max_timeout: 条目最长保存时间（秒）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_timeout = default_timeout
+        self.sweep_interval = sweep_interval
+        self.namespace = namespace
+        self.max_timeout = max_timeout
+        self._prefix = f'{namespace}/' if namespace else ''
+        self._local = threading.local()
+        self._last_sweep = 0.0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connection()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(self._SCHEMA)
+        # 其他命名空间（旧代码写入）的条目不会再命中，直接删除
+        db.execute('DELETE FROM cache WHERE NOT (key >= ? AND key < ?)', (self._prefix, self._prefix + '\uffff'))
+
+    def _connection(self):
+        """每个线程一个连接；fork 后的子进程重新建立连接"""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _expiry_for(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        if not timeout or timeout <= 0 or timeout > self.max_timeout:
+            timeout = self.max_timeout
+        return time.time() + timeout
+
+    def _maybe_sweep(self, db):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        db.execute('DELETE FROM cache WHERE expiry IS NOT NULL AND expiry <= ?', (now,))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total > self.max_bytes:
+            # 按写入时间淘汰到上限的 90%
+            excess = total - int(self.max_bytes * 0.9)
+            rows = db.execute('SELECT key, size FROM cache ORDER BY created').fetchall()
+            expired = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                expired.append((key,))
+                excess -= size
+            db.executemany('DELETE FROM cache WHERE key = ?', expired)
+
+    def get_with_expiry(self, key):
+        """返回 (值, 过期时间)，未命中时返回 (None, None)"""
+        try:
+            row = self._connection().execute(
+                'SELECT value, expiry, format FROM cache WHERE key = ?', (self._prefix + key,)).fetchone()
+        except sqlite3.Error:
+            return None, None
+        if row is None or row[2] != self.FORMAT_VERSION:
+            return None, None
+        value, expiry, _ = row
+        if expiry is not None and expiry <= time.time():
+            return None, None
+        try:
+            return pickle.loads(value), expiry
+        except Exception:
+            return None, None
+
+    def get(self, key):
+        return self.get_with_expiry(key)[0]
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def set(self, key, value, timeout=None, expiry=None):
+        """写入条目；无法序列化（如 Response 对象）或超过容量上限的值不写入"""
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if len(payload) > self.max_bytes:
+            return False
+
+        expiry = min(expiry, self._expiry_for(0)) if expiry is not None else self._expiry_for(timeout)
+        try:
+            db = self._connection()
+            db.execute('INSERT OR REPLACE INTO cache (key, value, expiry, size, created, format) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       (self._prefix + key, sqlite3.Binary(payload), expiry, len(payload), time.time(), self.FORMAT_VERSION))
+            self._maybe_sweep(db)
+        except sqlite3.Error:
+            return False
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.get(key) is not None:
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        try:
+            return self._connection().execute('DELETE FROM cache WHERE key = ?',
+                                              (self._prefix + key,)).rowcount > 0
+        except sqlite3.Error:
+            return False
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def get_dict(self, *keys):
+        return {key: self.get(key) for key in keys}
+
+    def set_many(self, mapping, timeout=None):
+        return [key for key, value in mapping.items() if self.set(key, value, timeout)]
+
+    def delete_many(self, *keys):
+        return [key for key in keys if self.delete(key)]
+
+    def clear(self):
+        return self.delete_prefix('') >= 0
+
+    def delete_prefix(self, prefix):
+        """删除指定前缀的所有键（主键索引上的范围查询）"""
+        prefix = self._prefix + prefix
+        try:
+            return self._connection().execute(
+                'DELETE FROM cache WHERE key >= ? AND key < ?', (prefix, prefix + '\uffff')).rowcount
+        except sqlite3.Error:
+            return 0
+
+    def delete_pattern(self, pattern):
+        """按模式删除键，规则同 LRUCache.delete_pattern"""
+        if pattern.endswith('*') and '*' not in pattern[:-1]:
+            return self.delete_prefix(pattern[:-1])
+        try:
+            return self._connection().execute(
+                "DELETE FROM cache WHERE key >= ? AND key < ? AND instr(substr(key, ?), ?) > 0",
+                (self._prefix, self._prefix + '\uffff', len(self._prefix) + 1, pattern)).rowcount
+        except sqlite3.Error:
+            return 0
+
+    def stats(self):
+        """缓存统计信息"""
+        entries, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        return {'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes, 'path': self.path,
+                'namespace': self.namespace}
+
+
+class TieredCache:
+    """
+    两级缓存：一级为进程内 LRUCache，二级为多进程共享的 SQLiteCache
+
+    读取先查一级，未命中再查二级并回填一级（沿用二级条目的剩余有效期）；
+    写入与删除同时作用于两级，某个 worker 计算的结果其他 worker 可直接复用
+    """
+
+    def __init__(self, l1, l2):
+        self.l1 = l1
+        self.l2 = l2
+
+    def get(self, key):
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+
+        value, expiry = self.l2.get_with_expiry(key)
+        if value is not None:
+            remaining = expiry - time.time() if expiry is not None else 0
+            if expiry is None or remaining > 0:
+                self.l1.set(key, value, timeout=remaining)
+        return value
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def set(self, key, value, timeout=None):
+        stored = self.l1.set(key, value, timeout)
+        self.l2.set(key, value, timeout)
+        return stored
+
+    def add(self, key, value, timeout=None):
+        if self.get(key) is not None:
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        deleted = self.l1.delete(key)
+        return self.l2.delete(key) or deleted
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def get_dict(self, *keys):
+        return {key: self.get(key) for key in keys}
+
+    def set_many(self, mapping, timeout=None):
+        return [key for key, value in mapping.items() if self.set(key, value, timeout)]
+
+    def delete_many(self, *keys):
+        return [key for key in keys if self.delete(key)]
+
+    def clear(self):
+        self.l1.clear()
+        return self.l2.clear()
+
+    def delete_prefix(self, prefix):
+        return max(self.l1.delete_prefix(prefix), self.l2.delete_prefix(prefix))
+
+    def delete_pattern(self, pattern):
+        return max(self.l1.delete_pattern(pattern), self.l2.delete_pattern(pattern))
+
+    def stats(self):
+        """缓存统计信息"""
+        return {'l1': self.l1.stats(), 'l2': self.l2.stats()}
+
+
+def lru_cache_factory(app, config, args, kwargs):
+    """flask_caching 后端工厂：CACHE_TYPE = 'utils.cache.lru_cache_factory'"""
+    return LRUCache(
+        max_entries=config.get('CACHE_THRESHOLD', 1000),
+        max_bytes=config.get('CACHE_MAX_BYTES', 128 * 1024 * 1024),
+        default_timeout=kwargs.get('default_timeout', config.get('CACHE_DEFAULT_TIMEOUT', 300)),
+        sweep_interval=config.get('CACHE_SWEEP_INTERVAL', 60)
+    )
+
+
+# 计算代码指纹时包含的文件（视图代码、模板与配置决定缓存内容）
+FINGERPRINT_SUFFIXES = ('.py', '.html', '.jinja', '.json')
+FINGERPRINT_SKIP_DIRS = {'.git', '__pycache__', 'data', 'node_modules', '.snapshot'}
+
+
+def code_fingerprint(root=None):
+    """
+    代码指纹：root（默认为项目根目录）下代码与模板文件的路径与内容哈希，
+    部署新代码或修改模板后指纹变化，二级缓存中旧代码生成的条目随之失效
+    """
+    root = root or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in FINGERPRINT_SKIP_DIRS)
+        for filename in sorted(filenames):
+            if not filename.endswith(FINGERPRINT_SUFFIXES):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            digest.update(os.path.relpath(path, root).encode('utf-8') + b'\0' + content + b'\0')
+    return digest.hexdigest()[:12]
+
+
+def tiered_cache_factory(app, config, args, kwargs):
+    """
+    flask_caching 后端工厂：CACHE_TYPE = 'utils.cache.tiered_cache_factory'
+    一级为进程内 LRU，二级为 CACHE_L2_PATH 指向的 SQLite 文件；二级不可用（如只读文件系统）时只使用一级。
+    二级缓存的命名空间为 CACHE_L2_NAMESPACE（如部署版本号），未配置时取代码指纹
+    """
+    l1 = lru_cache_factory(app, config, args, kwargs)
+    path = config.get('CACHE_L2_PATH')
+    if not path:
+        return l1
+    try:
+        l2 = SQLiteCache(path,
+                         max_bytes=config.get('CACHE_L2_MAX_BYTES', 512 * 1024 * 1024),
+                         default_timeout=kwargs.get('default_timeout', config.get('CACHE_DEFAULT_TIMEOUT', 300)),
+                         sweep_interval=config.get('CACHE_SWEEP_INTERVAL', 60),
+                         namespace=config.get('CACHE_L2_NAMESPACE') or code_fingerprint(),
+                         max_timeout=config.get('CACHE_L2_MAX_TIMEOUT', 24 * 3600))
+    except (OSError, sqlite3.Error) as e:
+        print(f"警告: 二级缓存 {path} 不可用，仅使用进程内缓存: {e}")
+        return l1
+    return TieredCache(l1, l2)
+
+
+# 未接入Flask应用（或flask_caching不可用）时使用的进程内缓存
+local_cache = LRUCache()
+
+try:
+    from flask_caching import Cache
+    cache = Cache(config={'CACHE_TYPE': 'utils.cache.tiered_cache_factory'})
+except ImportError:
+    # 如果flask_caching不可用，直接使用有界LRU内存缓存
+    print("警告: flask_caching 未安装，使用内置LRU内存缓存")
+    cache = local_cache
+
+
+def get_cache_backend():
+    """
+    获取当前可用的缓存后端
+    cache 已通过 init_app 绑定到当前应用时使用应用的后端，否则使用进程内 local_cache
+    """
+    if cache is local_cache:
+        return local_cache
+
+    try:
+        from flask import current_app
+        backend = current_app.extensions.get('cache', {}).get(cache)
+    except RuntimeError:
+        # 不在应用上下文中
+        backend = None
+    return backend if backend is not None else local_cache
+
+
+# 数据集版本来源：模块名 -> 返回当前数据版本的函数
+_version_sources = {}
+# 各模块最近一次使用的数据版本，版本变化时清理旧版本缓存
+_current_versions = {}
+_version_lock = threading.Lock()
+# 数据版本变化时的回调：callback(模块名, 新版本)
+_version_listeners = []
+
+# 未登记数据版本的视图的默认过期时间（秒）
+DEFAULT_TIMEOUT = 300
+# 已登记数据版本的视图在同一版本内的新鲜期（秒），可由 CACHE_VERSIONED_TIMEOUT 配置，0 表示同一版本内不过期
+DEFAULT_VERSIONED_TIMEOUT = 3600
+
+
+def register_version_source(module_name, get_version):
+    """
+    登记模块的数据集版本函数，该模块中 @cached 视图的缓存键会带上数据版本：
+    同一版本的缓存超过 CACHE_VERSIONED_TIMEOUT 后先返回旧值并在后台刷新一次（仍受LRU容量限制，
+    二级缓存最长保存 CACHE_L2_MAX_TIMEOUT），数据更新后旧版本缓存整体清除
+    """
+    _version_sources[module_name] = get_version
+
+
+def on_version_change(callback):
+    """登记数据版本变化回调 callback(模块名, 新版本)，如缓存预热；进程内首次取得版本时不触发"""
+    if callback not in _version_listeners:
+        _version_listeners.append(callback)
+
+
+def data_versions():
+    """所有已登记模块的当前数据版本 {模块名: 版本}"""
+    return {module_name: get_version() for module_name, get_version in sorted(_version_sources.items())}
+
+
+def _version_tag(module_name, backend):
+    """
+    返回缓存键中的版本标签 '模块@版本'，未登记版本时只返回模块名
+    检测到版本变化时按前缀删除旧版本的全部缓存
+    """
+    get_version = _version_sources.get(module_name)
+    if get_version is None:
+        return module_name
+
+    version = get_version()
+    with _version_lock:
+        previous = _current_versions.get(module_name)
+        _current_versions[module_name] = version
+
+    if previous is not None and previous != version:
+        if hasattr(backend, 'delete_prefix'):
+            backend.delete_prefix(f'{module_name}@{previous}:')
+        for callback in list(_version_listeners):
+            try:
+                callback(module_name, version)
+            except Exception as e:
+                print(f"警告: 数据版本变化回调失败: {e}")
+    return f'{module_name}@{version}'
+
+
+def _normalized_query_string(vary_on):
+    """
+    规范化当前请求的查询参数：按参数名排序，只保留 vary_on 中声明的参数
+    vary_on 为 None 时保留全部参数；不在请求上下文中时返回空字符串
+    """
+    from flask import has_request_context, request
+    from urllib.parse import urlencode
+
+    if not has_request_context():
+        return ''
+
+    items = []
+    for name in sorted(request.args.keys()):
+        if vary_on is not None and name not in vary_on:
+            continue
+        for value in request.args.getlist(name):
+            items.append((name, value))
+    return urlencode(items)
+
+
+def make_cache_key(f, args, kwargs, key_prefix='view_', vary_on=None, backend=None):
+    """
+    生成缓存键：版本标签 + 前缀 + 端点名 + 摘要
+    摘要覆盖函数参数、路由参数与规范化后的查询字符串
+    """
+    import json
+    from flask import has_request_context, request
+
+    if has_request_context() and request.endpoint:
+        endpoint = request.endpoint
+    else:
+        endpoint = f'{f.__module__}.{f.__name__}'
+
+    tag = _version_tag(f.__module__, backend if backend is not None else get_cache_backend())
+
+    digest = hashlib.md5(
+        (f.__name__ + json.dumps(args, sort_keys=True) +
+         json.dumps(kwargs, sort_keys=True) +
+         '?' + _normalized_query_string(vary_on)).encode('utf-8')
+    ).hexdigest()
+    return f'{tag}:{key_prefix}{endpoint}:{digest}'
+
+
+# 过期条目在后台刷新期间继续提供的最长时间（秒），可由 CACHE_STALE_WHILE_REVALIDATE 配置
+DEFAULT_STALE_TIMEOUT = 60
+# 同一缓存键的并发请求等待首个请求计算结果的最长时间（秒），可由 CACHE_SINGLE_FLIGHT_TIMEOUT 配置
+DEFAULT_SINGLE_FLIGHT_TIMEOUT = 30
+
+
+class _Flight:
+    """同一缓存键正在进行的一次计算"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.ok = False
+
+
+# 进行中的计算（缓存未命中或后台刷新），按缓存键登记
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _single_flight(cache_key, compute, wait_timeout):
+    """
+    同一缓存键同一时刻只由一个调用者计算，其余调用者等待并复用其结果
+
+    compute 返回 (值, 是否可缓存)；不可缓存的结果（如错误响应）不共享，
+    等待超时或计算失败时等待者自行计算
+    """
+    with _flights_lock:
+        flight = _flights.get(cache_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[cache_key] = _Flight()
+
+    if not leader:
+        if flight.event.wait(wait_timeout) and flight.ok:
+            return flight.value, True
+        return compute()
+
+    try:
+        value, cacheable = compute()
+        if cacheable:
+            flight.value, flight.ok = value, True
+        return value, cacheable
+    finally:
+        with _flights_lock:
+            _flights.pop(cache_key, None)
+        flight.event.set()
+
+
+def _refresh_in_background(cache_key, refresh):
+    """过期条目的后台刷新：同一缓存键只启动一个刷新线程"""
+    with _flights_lock:
+        if cache_key in _flights:
+            return
+        flight = _flights[cache_key] = _Flight()
+
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            print(f"警告: 后台刷新缓存 {cache_key} 失败: {e}")
+        finally:
+            with _flights_lock:
+                _flights.pop(cache_key, None)
+            flight.event.set()
+
+    threading.Thread(target=run, name='cache-refresh', daemon=True).start()
+
+
+def _cache_settings(f, timeout, stale_timeout):
+    """
+    计算 (新鲜期, 后端保存时间, 单飞等待时间)
+    新鲜期为0表示永不过期；带过期时间的条目在后端多保存 stale_timeout 秒，供后台刷新期间继续使用
+    """
+    from flask import current_app, has_app_context
+
+    config = current_app.config if has_app_context() else {}
+    if timeout is not None:
+        fresh = timeout
+    elif f.__module__ in _version_sources:
+        fresh = config.get('CACHE_VERSIONED_TIMEOUT', DEFAULT_VERSIONED_TIMEOUT)
+    else:
+        fresh = DEFAULT_TIMEOUT
+    if stale_timeout is None:
+        stale_timeout = config.get('CACHE_STALE_WHILE_REVALIDATE', DEFAULT_STALE_TIMEOUT)
+    keep = fresh + stale_timeout if fresh else 0
+    return fresh, keep, config.get('CACHE_SINGLE_FLIGHT_TIMEOUT', DEFAULT_SINGLE_FLIGHT_TIMEOUT)
+
+
+def _request_replay(args, kwargs, call):
+    """
+    生成在后台线程中重放当前请求的函数（后台刷新使用）：
+    按原路径与查询字符串建立新的请求上下文后调用 call(*args, **kwargs)
+    """
+    from flask import current_app, has_request_context, request
+
+    app = current_app._get_current_object()
+    if has_request_context():
+        path, query_string = request.path, request.environ.get('QUERY_STRING', '')
+    else:
+        path, query_string = '/', ''
+
+    def replay():
+        with app.test_request_context(path, query_string=query_string):
+            call(*args, **kwargs)
+    return replay
+
+
+def _cached_call(f, args, kwargs, key_prefix, vary_on, timeout, stale_timeout, compute):
+    """
+    缓存装饰器的公共流程：
+    - 命中且未过期：直接返回
+    - 命中但已过期（仍在 stale 期内）：返回旧值，同时后台刷新一次
+    - 未命中：单飞计算并写入缓存
+    compute 返回 (值, 是否可缓存)，可缓存的值会包装为 {'value', 'fresh_until'} 写入后端
+
+    Returns:
+        (值, 是否来自缓存或可缓存)
+    """
+    backend = get_cache_backend()
+    cache_key = make_cache_key(f, args, kwargs, key_prefix, vary_on, backend)
+    fresh, keep, wait_timeout = _cache_settings(f, timeout, stale_timeout)
+
+    def compute_and_store(*call_args, **call_kwargs):
+        value, cacheable = compute(*call_args, **call_kwargs)
+        if cacheable:
+            fresh_until = time.time() + fresh if fresh else None
+            backend.set(cache_key, {'value': value, 'fresh_until': fresh_until}, timeout=keep)
+        return value, cacheable
+
+    entry = backend.get(cache_key)
+    if entry is not None:
+        if entry['fresh_until'] is not None and time.time() >= entry['fresh_until']:
+            _refresh_in_background(cache_key, _request_replay(args, kwargs, compute_and_store))
+        return entry['value'], True
+
+    return _single_flight(cache_key, lambda: compute_and_store(*args, **kwargs), wait_timeout)
+
+
+def _cacheable_result(value):
+    """视图返回值及是否可缓存：(响应体, 状态码) 元组或 Response 的状态码不是200时不缓存"""
+    status = getattr(value, 'status_code', None)
+    if isinstance(value, tuple) and len(value) > 1 and isinstance(value[1], int):
+        status = value[1]
+    return value, status is None or status == 200
+
+
+def cached(timeout=None, key_prefix='view_', vary_on=None, stale_timeout=None):
+    """
+    缓存装饰器
+
+    同一缓存键的并发未命中只计算一次，其余请求等待并复用结果；
+    过期条目在 stale_timeout 秒内继续返回，同时只启动一个后台刷新
+
+    Args:
+        timeout: 过期时间（秒）；为None时，已登记数据版本的视图取 CACHE_VERSIONED_TIMEOUT，其余为 DEFAULT_TIMEOUT
+        key_prefix: 缓存键前缀
+        vary_on: 影响响应内容的查询参数名列表，None 表示全部参数，[] 表示忽略查询参数
+        stale_timeout: 过期后继续返回旧值的最长时间（秒），None 时取 CACHE_STALE_WHILE_REVALIDATE
+    """
+    from functools import wraps
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            value, _ = _cached_call(f, args, kwargs, key_prefix, vary_on, timeout, stale_timeout,
+                                    lambda *a, **kw: _cacheable_result(f(*a, **kw)))
+            return value
+        return decorated_function
+    return decorator
+
+
+# 小于该字节数的响应不压缩
+COMPRESS_MIN_SIZE = 1024
+# 各编码变体的ETag后缀：强ETag要求字节相同，同一内容的不同编码须使用不同的ETag
+ETAG_SUFFIXES = {'identity': '', 'gzip': '-gz', 'br': '-br'}
+
+
+def encode_json_entry(body, mimetype='application/json'):
+    """
+    将已编码的JSON响应体预先压缩，生成可缓存的条目：
+    原始字节、gzip（及可用时的brotli）变体与基于内容的强ETag（各编码变体加后缀区分，见 ETAG_SUFFIXES）
+    """
+    entry = {
+        'mimetype': mimetype,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'identity': body
+    }
+    if len(body) >= COMPRESS_MIN_SIZE:
+        entry['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body, quality=5)
+    return entry
+
+
+def make_json_response(entry):
+    """根据请求头返回304或选择合适编码的缓存响应"""
+    from flask import Response, request
+
+    encoding = 'identity'
+    accept = request.accept_encodings
+    if 'br' in entry and accept['br']:
+        encoding = 'br'
+    elif 'gzip' in entry and accept['gzip']:
+        encoding = 'gzip'
+
+    # 客户端持有任一编码变体时内容均未变化，返回304并给出本次协商编码的ETag
+    if any(request.if_none_match.contains_weak(entry['etag'] + suffix)
+           for suffix in ETAG_SUFFIXES.values()):
+        response = Response(status=304)
+    else:
+        response = Response(entry[encoding], mimetype=entry['mimetype'])
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(entry['etag'] + ETAG_SUFFIXES[encoding])
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def cached_json(timeout=None, key_prefix='json_', vary_on=None, stale_timeout=None):
+    """
+    JSON接口缓存装饰器
+
+    缓存编码后的JSON字节及其压缩变体（而非Response对象），
+    命中时按 Accept-Encoding 直接返回，If-None-Match 匹配时返回304；
+    非200响应（如参数错误）不缓存。参数含义与单飞、后台刷新行为同 cached
+    """
+    from functools import wraps
+    from flask import current_app
+
+    def decorator(f):
+        def compute(*args, **kwargs):
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response, False
+            return encode_json_entry(response.get_data(), response.mimetype), True
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            value, cacheable = _cached_call(f, args, kwargs, key_prefix, vary_on, timeout, stale_timeout, compute)
+            return make_json_response(value) if cacheable else value
+        return decorated_function
+    return decorator
+
 
 def clear_cache(pattern=None):
     """清除缓存"""
-    if pattern:
-        cache.delete_pattern(pattern)
+    backend = get_cache_backend()
+    if pattern and hasattr(backend, 'delete_pattern'):
+        backend.delete_pattern(pattern)
     else:
-        cache.clear()
\ No newline at end of file
+        backend.clear()
@@ -0,0 +1,366 @@
+"""
+全组合空间过滤引擎
+预先计算号码区全部组合（双色球红球 C(33,6)=1107568 注，大乐透前区 C(35,5)=324632 注）的
+和值、跨度、AC值、大小/奇偶/质合/012路/区间个数、连号与同尾形态，按列保存为 .npy 文件，
+服务进程以内存映射方式加载；过滤条件在整列上向量化求值，可选按行分块交给多进程并行
+"""
+
+import json
+import math
+import os
+import numpy as np
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.features import AREA_SPECS, SAME_TAIL_SIZES, calculate_ac_values, \
+    describe_consecutive, describe_same_tail
+from utils.bitmask import build_bitmasks
+from utils.pools import discard_process_pool, get_process_pool
+from utils.snapshot import write_atomic
+
+COMBINATION_FORMAT_VERSION = 1
+
+# 各号码区每注选号个数
+COMBINATION_PICKS = {
+    'ssq_red': 6,
+    'dlt_front': 5,
+}
+
+# 区间比、012路比等计数编码的进位基数（每注号码个数小于8）
+_CODE_BASE = 8
+
+# 过滤接口支持的范围条件与比值条件
+RANGE_FILTERS = ['sum_value', 'span', 'ac_value', 'missed_sum']
+RATIO_FILTERS = ['size_ratio', 'odd_even_ratio', 'prime_ratio', 'road012_ratio', 'zone_ratio',
+                 'cold_warm_hot_ratio']
+PATTERN_FILTERS = ['consecutive', 'same_tail']
+
+
+def combination_matrix(max_number: int, pick: int) -> np.ndarray:
+    """
+    向量化生成 1~max_number 中选 pick 个号码的全部组合（字典序，每行升序）
+
+    从最后一列开始逐列向前扩展：已有组合首位为 f 时，可在其前放置 0~f-1 中任一号码
+    """
+    combos = np.arange(max_number, dtype=np.int64)[:, None]
+    for _ in range(pick - 1):
+        repeats = combos[:, 0]
+        total = int(repeats.sum())
+        offsets = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        leading = np.arange(total, dtype=np.int64) - offsets
+        combos = np.column_stack([leading, np.repeat(combos, repeats, axis=0)])
+
+    order = np.lexsort(combos.T[::-1])
+    return (combos[order] + 1).astype(np.uint8)
+
+
+def _encode_counts(count_matrix: np.ndarray) -> np.ndarray:
+    """将 (n, k) 计数矩阵编码为一个整数（计数均小于 _CODE_BASE）"""
+    weights = _CODE_BASE ** np.arange(count_matrix.shape[1])
+    return (count_matrix * weights).sum(axis=1).astype(np.uint16)
+
+
+def _describe_codes(codes: np.ndarray, describe) -> Tuple[np.ndarray, List[str]]:
+    """把形态编码映射为标签编号，返回 (每行标签编号, 标签列表)"""
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    labels = [describe(int(code)) for code in unique_codes]
+    distinct = sorted(set(labels))
+    label_ids = np.array([distinct.index(label) for label in labels], dtype=np.uint8)
+    return label_ids[inverse.reshape(-1)], distinct
+
+
+def _is_number(value) -> bool:
+    """是否为有限的数值（布尔值不算）"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _as_list(name: str, value) -> list:
+    """把单个字符串或字符串列表形式的条件统一为列表"""
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f'条件 {name} 应为字符串或字符串列表')
+    return list(value)
+
+
+def build_combination_columns(area: str) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+    """
+    计算号码区全组合的特征列
+
+    Returns:
+        (列名 -> 数组, 形态列名 -> 标签列表)
+    """
+    spec = AREA_SPECS[area]
+    pick = COMBINATION_PICKS[area]
+    balls = combination_matrix(spec['max_number'], pick)
+    values = balls.astype(np.int64)
+
+    columns = {
+        'balls': balls,
+        'bitmask': build_bitmasks(values),
+        'sum_value': values.sum(axis=1).astype(np.uint16),
+        'span': (values[:, -1] - values[:, 0]).astype(np.uint8),
+        'ac_value': calculate_ac_values(values).astype(np.uint8),
+        'big_count': (values > spec['big_threshold']).sum(axis=1).astype(np.uint8),
+        'odd_count': (values % 2 == 1).sum(axis=1).astype(np.uint8),
+        'prime_count': np.isin(values, spec['primes']).sum(axis=1).astype(np.uint8),
+        'road_code': _encode_counts(np.stack([(values % 3 == r).sum(axis=1) for r in range(3)], axis=1)),
+        'zone_code': _encode_counts(np.stack([((values >= low) & (values <= high)).sum(axis=1)
+                                              for low, high in spec['zones']], axis=1)),
+    }
+
+    # 连号：相邻号码差为1的位置打包为整数；同尾：2/3/4同尾组个数打包为整数
+    is_next = np.diff(values, axis=1) == 1
+    consecutive_codes = (is_next * (1 << np.arange(pick - 1))).sum(axis=1)
+    tails = values % 10
+    tail_counts = np.stack([(tails == t).sum(axis=1) for t in range(10)], axis=1)
+    same_tail_codes = _encode_counts(np.stack([(tail_counts == size).sum(axis=1)
+                                               for size in SAME_TAIL_SIZES], axis=1))
+
+    columns['consecutive'], consecutive_labels = _describe_codes(
+        consecutive_codes,
+        lambda code: describe_consecutive([bool(code >> j & 1) for j in range(pick - 1)]))
+    columns['same_tail'], same_tail_labels = _describe_codes(
+        same_tail_codes,
+        lambda code: describe_same_tail([code // _CODE_BASE ** j % _CODE_BASE
+                                          for j in range(len(SAME_TAIL_SIZES))]))
+
+    return columns, {'consecutive': consecutive_labels, 'same_tail': same_tail_labels}
+
+
+class CombinationSpace:
+    """号码区全组合特征表（内存映射只读）"""
+
+    def __init__(self, area: str, directory: str, columns: Dict[str, np.ndarray],
+                 labels: Dict[str, List[str]]):
+        self.area = area
+        self.directory = directory
+        self.columns = columns
+        self.labels = labels
+        self.spec = AREA_SPECS[area]
+        self.pick = COMBINATION_PICKS[area]
+
+    def __len__(self) -> int:
+        return len(self.columns['balls'])
+
+    @staticmethod
+    def _area_directory(directory: str, area: str) -> str:
+        return os.path.join(directory, f'combinations-{area}')
+
+    @classmethod
+    def load(cls, area: str, directory: str) -> Optional['CombinationSpace']:
+        """加载已构建的组合特征表，不存在或版本不符时返回None"""
+        area_dir = cls._area_directory(directory, area)
+        try:
+            with open(os.path.join(area_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != COMBINATION_FORMAT_VERSION:
+                return None
+            columns = {name: np.load(os.path.join(area_dir, f'{name}.npy'), mmap_mode='r')
+                       for name in meta['columns']}
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(area, directory, columns, meta['labels'])
+
+    @classmethod
+    def build(cls, area: str, directory: str) -> 'CombinationSpace':
+        """
+        构建组合特征表并写入目录（元数据最后原子写入）；
+        目录不可写时仅在内存中使用
+        """
+        columns, labels = build_combination_columns(area)
+        area_dir = cls._area_directory(directory, area)
+        try:
+            os.makedirs(area_dir, exist_ok=True)
+            for name, values in columns.items():
+                write_atomic(os.path.join(area_dir, f'{name}.npy'), lambda f, v=values: np.save(f, v))
+            meta = {
+                'version': COMBINATION_FORMAT_VERSION,
+                'area': area,
+                'rows': int(len(columns['balls'])),
+                'columns': list(columns),
+                'labels': labels
+            }
+            write_atomic(os.path.join(area_dir, 'meta.json'),
+                         lambda f: f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8')))
+        except OSError as e:
+            print(f"警告: 无法写入组合特征表 {area_dir}: {e}")
+            return cls(area, directory, columns, labels)
+
+        return cls.load(area, directory) or cls(area, directory, columns, labels)
+
+    @classmethod
+    def load_or_build(cls, area: str, directory: str) -> 'CombinationSpace':
+        """优先加载内存映射的特征表，不存在时构建"""
+        return cls.load(area, directory) or cls.build(area, directory)
+
+    def compile_criteria(self, criteria: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        校验并编译过滤条件
+
+        支持的条件：
+            sum_value / span / ac_value / missed_sum: [最小值, 最大值]（含端点）或单个值
+            size_ratio / odd_even_ratio / prime_ratio / road012_ratio / zone_ratio /
+            cold_warm_hot_ratio: 允许的比值字符串列表，如 ["3:3", "4:2"]
+            consecutive / same_tail: 允许的形态列表，如 ["无连号", "2连"]
+            include: 必须包含的号码（胆码）；exclude: 必须排除的号码（杀号）
+
+        Raises:
+            ValueError: 条件格式错误
+        """
+        if not isinstance(criteria, dict):
+            raise ValueError('过滤条件应为对象')
+        compiled = {}
+        for name, value in criteria.items():
+            if value is None:
+                continue
+            if name in RANGE_FILTERS:
+                if _is_number(value):
+                    value = [value, value]
+                if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(map(_is_number, value)):
+                    raise ValueError(f'条件 {name} 应为 [最小值, 最大值]')
+                compiled[name] = (float(value[0]), float(value[1]))
+            elif name in RATIO_FILTERS:
+                compiled[name] = self._compile_ratios(name, value)
+            elif name in PATTERN_FILTERS:
+                values = _as_list(name, value)
+                unknown = [v for v in values if v not in self.labels[name]]
+                if unknown:
+                    raise ValueError(f'条件 {name} 的取值无效: {unknown}，可选: {self.labels[name]}')
+                compiled[name] = [self.labels[name].index(v) for v in values]
+            elif name in ('include', 'exclude'):
+                if not isinstance(value, (list, tuple)) or not all(isinstance(n, int) and not isinstance(n, bool)
+                                                                   for n in value):
+                    raise ValueError(f'条件 {name} 应为号码（整数）列表')
+                numbers = list(value)
+                if any(not 1 <= n <= self.spec['max_number'] for n in numbers):
+                    raise ValueError(f'条件 {name} 含超出范围的号码')
+                mask = 0
+                for n in numbers:
+                    mask |= 1 << (n - 1)
+                compiled[name] = mask
+            else:
+                raise ValueError(f'不支持的过滤条件: {name}')
+        return compiled
+
+    def _compile_ratios(self, name: str, value) -> List[int]:
+        """把比值字符串列表转换为与特征列对应的编码"""
+        values = _as_list(name, value)
+        parts_count = {'size_ratio': 2, 'odd_even_ratio': 2, 'prime_ratio': 2, 'road012_ratio': 3,
+                       'zone_ratio': len(self.spec['zones']), 'cold_warm_hot_ratio': 3}[name]
+        codes = []
+        for ratio in values:
+            try:
+                parts = [int(p) for p in str(ratio).split(':')]
+            except ValueError:
+                raise ValueError(f'条件 {name} 的比值格式错误: {ratio}')
+            if len(parts) != parts_count or sum(parts) != self.pick or min(parts) < 0:
+                raise ValueError(f'条件 {name} 的比值无效: {ratio}')
+            # 大小、奇偶、质合比只需比较第一项的个数
+            codes.append(parts[0] if parts_count == 2 else
+                         sum(p * _CODE_BASE ** j for j, p in enumerate(parts)))
+        return codes
+
+    def evaluate(self, compiled: Dict[str, Any], start: int = 0, stop: Optional[int] = None,
+                 missed_vector: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        在行区间 [start, stop) 上求值已编译的条件
+
+        Returns:
+            满足全部条件的组合行号（升序）
+        """
+        stop = len(self) if stop is None else stop
+        rows = slice(start, stop)
+        mask = np.ones(stop - start, dtype=bool)
+
+        def column(name):
+            return self.columns[name][rows]
+
+        for name in ('sum_value', 'span', 'ac_value'):
+            if name in compiled:
+                low, high = compiled[name]
+                values = column(name)
+                mask &= (values >= low) & (values <= high)
+
+        ratio_columns = {'size_ratio': 'big_count', 'odd_even_ratio': 'odd_count',
+                         'prime_ratio': 'prime_count', 'road012_ratio': 'road_code', 'zone_ratio': 'zone_code'}
+        for name, column_name in ratio_columns.items():
+            if name in compiled:
+                mask &= np.isin(column(column_name), compiled[name])
+
+        for name in PATTERN_FILTERS:
+            if name in compiled:
+                mask &= np.isin(column(name), compiled[name])
+
+        if 'include' in compiled or 'exclude' in compiled:
+            bitmask = column('bitmask')
+            if 'include' in compiled:
+                include = np.uint64(compiled['include'])
+                mask &= (bitmask & include) == include
+            if 'exclude' in compiled:
+                mask &= (bitmask & np.uint64(compiled['exclude'])) == 0
+
+        # 遗漏条件：按当前遗漏向量取出每注各号码的遗漏值
+        if missed_vector is not None and ('missed_sum' in compiled or 'cold_warm_hot_ratio' in compiled):
+            missed = np.asarray(missed_vector, dtype=np.int64)[column('balls').astype(np.int64) - 1]
+            if 'missed_sum' in compiled:
+                low, high = compiled['missed_sum']
+                total = missed.sum(axis=1)
+                mask &= (total >= low) & (total <= high)
+            if 'cold_warm_hot_ratio' in compiled:
+                cold = (missed > 16).sum(axis=1)
+                warm = ((missed >= 4) & (missed <= 16)).sum(axis=1)
+                hot = (missed < 4).sum(axis=1)
+                codes = cold + warm * _CODE_BASE + hot * _CODE_BASE ** 2
+                mask &= np.isin(codes, compiled['cold_warm_hot_ratio'])
+
+        return np.flatnonzero(mask) + start
+
+    def filter(self, criteria: Dict[str, Any], missed_vector: Optional[np.ndarray] = None,
+               processes: int = 0, chunk_size: int = 262144) -> np.ndarray:
+        """
+        过滤全组合空间
+
+        Args:
+            criteria: 过滤条件，见 compile_criteria
+            missed_vector: 各号码（1~max_number）当前的遗漏值，遗漏类条件需要
+            processes: 大于1时按 chunk_size 行分块交给多进程并行求值（需已写入磁盘的特征表），
+                       同一进程数的进程池在进程内复用
+            chunk_size: 分块行数
+
+        Returns:
+            满足条件的组合行号（升序）
+        """
+        compiled = self.compile_criteria(criteria)
+        on_disk = all(isinstance(values, np.memmap) for values in self.columns.values())
+        if processes <= 1 or not on_disk or len(self) <= chunk_size:
+            return self.evaluate(compiled, missed_vector=missed_vector)
+
+        tasks = [(self.area, self.directory, compiled, start, min(start + chunk_size, len(self)), missed_vector)
+                 for start in range(0, len(self), chunk_size)]
+        # 进程池在进程内复用，子进程保留已映射的特征表（见 _evaluate_chunk）
+        executor = get_process_pool('combination_filter', processes)
+        try:
+            parts = list(executor.map(_evaluate_chunk, tasks))
+        except BrokenProcessPool as e:
+            print(f"警告: 组合过滤进程池已损坏，改为在当前进程中求值: {e}")
+            discard_process_pool('combination_filter', executor)
+            return self.evaluate(compiled, missed_vector=missed_vector)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def combinations_at(self, rows: np.ndarray) -> List[List[int]]:
+        """按行号取出组合号码"""
+        return np.asarray(self.columns['balls'][rows], dtype=np.int64).tolist()
+
+
+# 子进程内按目录缓存已映射的组合特征表
+_worker_spaces = {}
+
+
+def _evaluate_chunk(task) -> np.ndarray:
+    """多进程分块求值（子进程中执行）"""
+    area, directory, compiled, start, stop, missed_vector = task
+    key = (area, directory)
+    if key not in _worker_spaces:
+        _worker_spaces[key] = CombinationSpace.load(area, directory)
+    return _worker_spaces[key].evaluate(compiled, start, stop, missed_vector)
@@ -0,0 +1,282 @@
+"""
+号码共现统计
+- PairCooccurrence：对每一对号码 (a, b) 沿期方向累积同期出现次数（前缀和），
+  任意窗口 [start, stop) 的共现次数即 prefix[stop] - prefix[start]，
+  只保存上三角的号码对（双色球红球528对、大乐透前区595对），对角线为单个号码的出现次数
+- GroupCooccurrence：3码、4码组合的稀疏计数，组合以位掩码为键存入升序 uint64 数组，
+  可随新开奖增量合并，按组合查询为一次二分查找；按数据版本保存在快照目录中，启动时直接加载
+"""
+
+import copy
+import itertools
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.omission import build_presence_matrix
+from utils.bitmask import popcount, numbers_to_mask, mask_to_numbers
+from utils.growable import GrowableArray
+from utils.snapshot import write_atomic
+
+
+class PairCooccurrence:
+    """号码对共现前缀计数表"""
+
+    def __init__(self, max_number: int):
+        self.max_number = max_number
+        # 号码对 (pair_left[k]+1, pair_right[k]+1)，按 (a, b) 字典序排列
+        self.pair_left, self.pair_right = np.triu_indices(max_number, k=1)
+        self._pair_rows = GrowableArray.wrap(np.zeros((1, len(self.pair_left)), dtype=np.int32))
+        self._single_rows = GrowableArray.wrap(np.zeros((1, max_number), dtype=np.int32))
+        self.pair_prefix = self._pair_rows.view()
+        self.single_prefix = self._single_rows.view()
+
+    @classmethod
+    def from_ball_matrix(cls, ball_matrix: np.ndarray, max_number: int) -> 'PairCooccurrence':
+        """由 (期数, 列数) 号码矩阵构建"""
+        cooccurrence = cls(max_number)
+        cooccurrence.extend(ball_matrix)
+        return cooccurrence
+
+    def __len__(self) -> int:
+        return len(self.pair_prefix) - 1
+
+    def extend(self, ball_matrix: np.ndarray) -> None:
+        """追加若干期开奖号码"""
+        presence = build_presence_matrix(ball_matrix, self.max_number)
+        if len(presence) == 0:
+            return
+
+        pairs = presence[:, self.pair_left] & presence[:, self.pair_right]
+        pair_rows = np.cumsum(pairs, axis=0, dtype=np.int32) + self.pair_prefix[-1]
+        single_rows = np.cumsum(presence, axis=0, dtype=np.int32) + self.single_prefix[-1]
+        # 首次构建按实际大小分配，之后追加新开奖时预留增长空间
+        headroom = len(self) > 0
+        self._pair_rows = self._pair_rows.extend(pair_rows, headroom)
+        self._single_rows = self._single_rows.extend(single_rows, headroom)
+        self.pair_prefix = self._pair_rows.view()
+        self.single_prefix = self._single_rows.view()
+
+    def extended(self, ball_matrix: np.ndarray) -> 'PairCooccurrence':
+        """返回追加若干期后的新计数表，自身不变（正在读取旧计数表的调用方不受影响）"""
+        cooccurrence = copy.copy(self)
+        cooccurrence.extend(ball_matrix)
+        return cooccurrence
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可放入共享内存映射的数组"""
+        return {'pair_prefix': self.pair_prefix, 'single_prefix': self.single_prefix}
+
+    def with_shared(self, arrays: Dict[str, np.ndarray]) -> 'PairCooccurrence':
+        """返回以 arrays（shared_arrays 各数组的只读映射）为数据的新计数表（再追加时复制到进程内）"""
+        cooccurrence = copy.copy(self)
+        cooccurrence._pair_rows = GrowableArray.wrap(arrays['pair_prefix'])
+        cooccurrence._single_rows = GrowableArray.wrap(arrays['single_prefix'])
+        cooccurrence.pair_prefix = cooccurrence._pair_rows.view()
+        cooccurrence.single_prefix = cooccurrence._single_rows.view()
+        return cooccurrence
+
+    def _bounds(self, start: int, stop: Optional[int]) -> Tuple[int, int]:
+        stop = len(self) if stop is None else min(max(stop, 0), len(self))
+        return min(max(start, 0), stop), stop
+
+    def pair_counts(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """窗口内各号码对的共现次数（与 pair_left/pair_right 对应）"""
+        start, stop = self._bounds(start, stop)
+        return self.pair_prefix[stop] - self.pair_prefix[start]
+
+    def matrix(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        窗口内的完整共现矩阵
+
+        Returns:
+            (max_number, max_number) 对称矩阵，[a-1, b-1] 为号码a、b同期出现次数，对角线为号码出现次数
+        """
+        start, stop = self._bounds(start, stop)
+        counts = self.pair_counts(start, stop)
+        result = np.zeros((self.max_number, self.max_number), dtype=np.int64)
+        result[self.pair_left, self.pair_right] = counts
+        result[self.pair_right, self.pair_left] = counts
+        result[np.diag_indices(self.max_number)] = self.single_prefix[stop] - self.single_prefix[start]
+        return result
+
+    def top_pairs(self, k: int = 20, start: int = 0, stop: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """
+        窗口内共现次数最多的k个号码对
+
+        Returns:
+            [(号码a, 号码b, 次数), ...]，按次数降序，次数相同按号码升序
+        """
+        counts = self.pair_counts(start, stop)
+        k = max(0, min(k, len(counts)))
+        if k == 0:
+            return []
+
+        # 按 (-次数, 号码对序号) 排序；号码对序号本身即 (a, b) 字典序
+        order = np.lexsort((np.arange(len(counts)), -counts))[:k]
+        return [(int(self.pair_left[i]) + 1, int(self.pair_right[i]) + 1, int(counts[i])) for i in order]
+
+
+class GroupCooccurrence:
+    """
+    号码组（3码、4码）同期出现次数的稀疏计数
+
+    keys 为出现过的号码组位掩码（升序），counts 为对应的出现次数
+    """
+
+    def __init__(self, group_size: int):
+        self.group_size = group_size
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.draw_count = 0
+
+    @classmethod
+    def from_ball_matrix(cls, ball_matrix: np.ndarray, group_size: int) -> 'GroupCooccurrence':
+        """由 (期数, 列数) 号码矩阵构建"""
+        counter = cls(group_size)
+        counter.extend(ball_matrix)
+        return counter
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _group_masks(self, ball_matrix: np.ndarray) -> np.ndarray:
+        """每期开奖号码中全部 group_size 码组合的位掩码"""
+        balls = np.asarray(ball_matrix, dtype=np.int64)
+        if balls.ndim != 2 or balls.shape[1] < self.group_size or len(balls) == 0:
+            return np.zeros(0, dtype=np.uint64)
+
+        valid = (balls >= 1) & (balls <= 64)
+        shifts = np.where(valid, balls - 1, 0).astype(np.uint64)
+        bits = np.where(valid, np.left_shift(np.uint64(1), shifts), np.uint64(0))
+
+        positions = np.array(list(itertools.combinations(range(balls.shape[1]), self.group_size)))
+        masks = np.bitwise_or.reduce(bits[:, positions], axis=2).reshape(-1)
+        # 含缺失值或重复号码的组合不足 group_size 个号码，不计数
+        return masks[popcount(masks) == self.group_size]
+
+    def extend(self, ball_matrix: np.ndarray) -> None:
+        """追加若干期开奖号码，与已有计数合并"""
+        new_keys, new_counts = np.unique(self._group_masks(ball_matrix), return_counts=True)
+        self.draw_count += len(ball_matrix)
+        if len(new_keys) == 0:
+            return
+
+        # 已有键升序：二分定位新键，已出现的累加计数，未出现的按位置插入（不重新排序全部键）
+        positions = np.searchsorted(self.keys, new_keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == new_keys[found]
+        # 数组可能与旧版本共享（extended）或为只读映射，不原地修改
+        counts = self.counts.copy()
+        counts[positions[found]] += new_counts[found]
+        keys = self.keys
+        if not found.all():
+            missing = ~found
+            keys = np.insert(keys, positions[missing], new_keys[missing])
+            counts = np.insert(counts, positions[missing], new_counts[missing])
+        self.keys, self.counts = keys, counts
+
+    def extended(self, ball_matrix: np.ndarray) -> 'GroupCooccurrence':
+        """返回追加若干期后的新计数，自身不变"""
+        counter = copy.copy(self)
+        counter.extend(ball_matrix)
+        return counter
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可放入共享内存映射的数组"""
+        return {'keys': self.keys, 'counts': self.counts}
+
+    def with_shared(self, arrays: Dict[str, np.ndarray]) -> 'GroupCooccurrence':
+        """返回以 arrays（shared_arrays 各数组的只读映射）为数据的新计数"""
+        counter = copy.copy(self)
+        counter.keys, counter.counts = arrays['keys'], arrays['counts']
+        return counter
+
+    def count(self, numbers: Sequence[int]) -> int:
+        """指定号码组的出现次数（号码个数须等于 group_size）"""
+        mask = numbers_to_mask(numbers)
+        if bin(mask).count('1') != self.group_size or len(numbers) != self.group_size:
+            return 0
+
+        position = int(np.searchsorted(self.keys, np.uint64(mask)))
+        if position < len(self.keys) and int(self.keys[position]) == mask:
+            return int(self.counts[position])
+        return 0
+
+    def top(self, k: int = 20) -> List[Tuple[List[int], int]]:
+        """
+        出现次数最多的k个号码组
+
+        Returns:
+            [(号码组, 次数), ...]，按次数降序，次数相同按位掩码升序
+        """
+        k = max(0, min(k, len(self.keys)))
+        if k == 0:
+            return []
+
+        if k < len(self.counts):
+            # 先取出次数不低于第k名的候选，再对候选精确排序
+            threshold = np.partition(self.counts, len(self.counts) - k)[len(self.counts) - k]
+            candidates = np.flatnonzero(self.counts >= threshold)
+        else:
+            candidates = np.arange(len(self.counts))
+
+        order = candidates[np.lexsort((self.keys[candidates], -self.counts[candidates]))][:k]
+        return [(mask_to_numbers(int(self.keys[i])), int(self.counts[i])) for i in order]
+
+    def save(self, path: str) -> None:
+        """原子写入 .npz 文件（其他进程或下次启动直接加载）"""
+        write_atomic(path, lambda f: np.savez(f, group_size=self.group_size, draw_count=self.draw_count,
+                                              keys=self.keys, counts=self.counts))
+
+    @classmethod
+    def load(cls, path: str) -> Optional['GroupCooccurrence']:
+        """从 save 生成的 .npz 文件加载，文件不存在或损坏时返回None"""
+        try:
+            with np.load(path) as archive:
+                counter = cls(int(archive['group_size']))
+                counter.draw_count = int(archive['draw_count'])
+                counter.keys = archive['keys'].astype(np.uint64)
+                counter.counts = archive['counts'].astype(np.int64)
+        except (OSError, ValueError, KeyError):
+            return None
+        return counter
+
+    @classmethod
+    def load_or_build(cls, ball_matrix: np.ndarray, group_size: int, directory: Optional[str] = None,
+                      name: str = 'groups', version: str = '') -> 'GroupCooccurrence':
+        """
+        优先加载快照目录中已保存的计数，不存在时构建并保存
+
+        Args:
+            directory: 快照目录，None 时只在内存中构建
+            name: 文件名前缀（如 'ssq_red'）
+            version: 数据集版本，文件为 <name>-<version>.groups<group_size>.npz，
+                     保存后删除同一前缀下其他版本的文件
+        """
+        if directory is None:
+            return cls.from_ball_matrix(ball_matrix, group_size)
+
+        suffix = f'.groups{group_size}.npz'
+        filename = f'{name}-{version}{suffix}'
+        path = os.path.join(directory, filename)
+        counter = cls.load(path)
+        if counter is not None and counter.group_size == group_size and counter.draw_count == len(ball_matrix):
+            return counter
+
+        counter = cls.from_ball_matrix(ball_matrix, group_size)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            counter.save(path)
+        except OSError as e:
+            print(f"警告: 无法写入组合计数 {path}: {e}")
+            return counter
+
+        # 删除旧版本的计数文件（已加载的进程不受影响）
+        for old_file in os.listdir(directory):
+            if old_file.startswith(f'{name}-') and old_file.endswith(suffix) and old_file != filename:
+                try:
+                    os.remove(os.path.join(directory, old_file))
+                except OSError:
+                    pass
+        return counter
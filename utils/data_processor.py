@@ -5,6 +5,11 @@ import json
 from datetime import datetime
 from collections import defaultdict, Counter
 
+from utils.omission import build_ball_matrix, calculate_omission_matrix, OccurrenceIndex
+from utils.dataset import GAME_SPECS, find_dataset
+from utils.bitmask import (build_bitmasks, numbers_to_mask, mask_to_numbers, adjacent_mask,
+                           repeat_counts, adjacent_counts)
+
 class DataProcessor:
     """数据处理工具类"""
     
@@ -25,7 +30,7 @@ class DataProcessor:
     def calculate_missed_values(data: pd.DataFrame, ball_columns: List[str], max_number: int) -> List[Dict[int, int]]:
         """
         计算每期的遗漏值矩阵
-        按照从当前期往前查找的逻辑
+        基于遗漏值引擎单次正向遍历（维护各号码最近出现位置）
         
         Args:
             data: 包含开奖数据的DataFrame，按时间顺序排列（旧期在前，新期在后）
@@ -39,48 +44,12 @@ class DataProcessor:
         if data.empty:
             return []
         
-        # 获取开奖号码列表
-        winning_numbers = []
-        for _, row in data.iterrows():
-            issue_numbers = []
-            for col in ball_columns:
-                if col in data.columns and pd.notna(row[col]):
-                    try:
-                        issue_numbers.append(int(row[col]))
-                    except (ValueError, TypeError):
-                        continue
-            winning_numbers.append(issue_numbers)
-        
-        data_count = len(winning_numbers)
-        missed_values_matrix = []
+        # 单次正向遍历计算遗漏矩阵，从未出现过的号码设为18
+        ball_matrix = build_ball_matrix(data, ball_columns)
+        missed_matrix = calculate_omission_matrix(ball_matrix, max_number)
         
-        # 对于每一期，计算每个号码的遗漏值
-        for current_index in range(data_count):
-            row_missed = {}
-            
-            # 计算每个号码的遗漏值
-            for num in range(1, max_number + 1):
-                found = False
-                last_seen_index = -1  # 从未出现过
-                
-                # 从当前期往前查找（向更早期查找）
-                for search_index in range(current_index, -1, -1):
-                    if num in winning_numbers[search_index]:
-                        # 找到最近一次出现
-                        last_seen_index = search_index
-                        found = True
-                        break
-                
-                if found:
-                    # 计算遗漏值 = 当前期索引 - 找到期索引
-                    row_missed[num] = current_index - last_seen_index
-                else:
-                    # 从未出现过，设为18
-                    row_missed[num] = 18
-            
-            missed_values_matrix.append(row_missed)
-        
-        return missed_values_matrix
+        numbers = range(1, max_number + 1)
+        return [dict(zip(numbers, row)) for row in missed_matrix.tolist()]
     
     @staticmethod
     def get_cold_warm_hot_status(missed_periods: int) -> str:
@@ -198,31 +167,27 @@ class DataProcessor:
         Returns:
             遗漏期数，如果从未出现过返回18
         """
-        if data.empty:
+        if data.empty or number < 1:
             return 18
         
-        # 获取开奖号码列表
-        winning_numbers = []
-        for _, row in data.iterrows():
-            issue_numbers = []
-            for col in ball_columns:
-                if col in data.columns and pd.notna(row[col]):
-                    try:
-                        issue_numbers.append(int(row[col]))
-                    except (ValueError, TypeError):
-                        continue
-            winning_numbers.append(issue_numbers)
-        
-        data_count = len(winning_numbers)
-        
-        # 从最新一期开始往前查找
-        for search_index in range(data_count - 1, -1, -1):
-            if number in winning_numbers[search_index]:
-                # 找到最近一次出现的期数
-                return (data_count - 1) - search_index
-        
-        # 从未出现过
-        return 18
+        # 在号码出现位置索引中二分查找最新一期之前最近一次出现
+        occurrences = DataProcessor.occurrence_index(data, ball_columns, number)
+        return occurrences.missed_at(number, len(data) - 1)
+    
+    @staticmethod
+    def occurrence_index(data: pd.DataFrame, ball_columns: List[str], max_number: int) -> OccurrenceIndex:
+        """
+        号码出现位置索引：data 是注册表中的数据集时直接使用其常驻索引，
+        其他数据（如截取的子集）才按 max_number 单独构建
+        """
+        for game, spec in GAME_SPECS.items():
+            dataset = find_dataset(game, data)
+            if dataset is None:
+                continue
+            for name, area in spec['areas'].items():
+                if list(ball_columns) == area['columns']:
+                    return dataset.derived[f'{name}_occurrences']
+        return OccurrenceIndex.from_ball_matrix(build_ball_matrix(data, ball_columns), max_number)
     
     @staticmethod
     def analyze_consecutive_numbers(data: pd.DataFrame, ball_columns: List[str]) -> List[List[int]]:
@@ -259,17 +224,32 @@ class DataProcessor:
     
     @staticmethod
     def analyze_repeat_numbers(current_numbers: List[int], prev_numbers: List[int]) -> List[int]:
-        """分析重号"""
-        return list(set(current_numbers) & set(prev_numbers))
+        """分析重号（位掩码求交集）"""
+        return mask_to_numbers(numbers_to_mask(current_numbers) & numbers_to_mask(prev_numbers))
     
     @staticmethod
     def analyze_adjacent_numbers(current_numbers: List[int], prev_numbers: List[int]) -> List[int]:
-        """分析邻号"""
-        adjacent = []
-        for num in prev_numbers:
-            if num - 1 in current_numbers or num + 1 in current_numbers:
-                adjacent.append(num)
-        return adjacent
+        """分析邻号（上期号码中与本期号码相差±1的号码）"""
+        current_adjacent = adjacent_mask(numbers_to_mask(current_numbers))
+        return [num for num in prev_numbers if 1 <= num <= 64 and current_adjacent >> (num - 1) & 1]
+    
+    @staticmethod
+    def calculate_repeat_adjacent_counts(data: pd.DataFrame, ball_columns: List[str]) -> Dict[str, List[int]]:
+        """
+        向量化计算每期与上期的重号、邻号个数
+        
+        Args:
+            data: 包含开奖数据的DataFrame，按时间顺序排列
+            ball_columns: 号码列名列表
+            
+        Returns:
+            {'repeat': [...], 'adjacent': [...]}，第一期均为0
+        """
+        masks = build_bitmasks(build_ball_matrix(data, ball_columns))
+        return {
+            'repeat': repeat_counts(masks).tolist(),
+            'adjacent': adjacent_counts(masks).tolist()
+        }
     
     @staticmethod
     def calculate_distribution_graph_data(numbers_data: Dict[int, List[int]]) -> Dict[str, Any]:
@@ -289,20 +269,23 @@ class DataProcessor:
             })
             node_index[number] = node_id
         
-        # 创建连接（基于共同出现的次数）
-        connections = defaultdict(int)
+        # 创建连接（基于共同出现的次数）：出现标记矩阵相乘一次得到全部号码对的共现次数
         numbers_list = list(numbers_data.keys())
+        occurrence_sets = [sorted(set(numbers_data[number])) for number in numbers_list]
+        all_draws = sorted(set().union(*occurrence_sets)) if occurrence_sets else []
+        draw_positions = {draw: pos for pos, draw in enumerate(all_draws)}
+        
+        presence = np.zeros((len(all_draws), len(numbers_list)), dtype=np.int32)
+        for col, draws in enumerate(occurrence_sets):
+            presence[[draw_positions[draw] for draw in draws], col] = 1
+        common_counts = (presence.T @ presence).tolist()
         
+        connections = {}
         for i in range(len(numbers_list)):
             for j in range(i + 1, len(numbers_list)):
-                num1 = numbers_list[i]
-                num2 = numbers_list[j]
-                
-                # 计算共同出现的次数
-                common_count = len(set(numbers_data[num1]) & set(numbers_data[num2]))
-                
+                common_count = common_counts[i][j]
                 if common_count > 0:
-                    connections[(num1, num2)] = common_count
+                    connections[(numbers_list[i], numbers_list[j])] = common_count
         
         # 添加最强的连接
         sorted_connections = sorted(connections.items(), key=lambda x: x[1], reverse=True)[:20]
@@ -421,6 +404,11 @@ class DataProcessor:
             每个选中号码的遗漏期数字典
         """
         result = {}
+        if data.empty or not selected_numbers:
+            return {num: 18 for num in selected_numbers}
+        
+        # 所有号码共用一个出现位置索引，每个号码一次二分查找
+        occurrences = DataProcessor.occurrence_index(data, ball_columns, max(max(selected_numbers), 1))
         for num in selected_numbers:
-            result[num] = DataProcessor.get_missed_periods_for_number(data, ball_columns, num)
+            result[num] = occurrences.missed_at(num, len(data) - 1)
         return result
\ No newline at end of file
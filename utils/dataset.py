@@ -0,0 +1,450 @@
+"""
+开奖数据集注册表
+每个彩种的历史数据在进程内只加载一次：解析（或映射快照）得到 DataFrame 后，
+一次性构建号码矩阵、遗漏矩阵、出现位置索引、号码对共现与特征表，
+蓝图与数据模型都从注册表取得同一个 LotteryDataset，数组均为只读，
+内存与加载时间只随彩种数增长，与使用数据的代码路径数无关。
+新开奖通过 LotteryDataset.extend 增量追加：只计算新增期的遗漏、特征与计数，返回新的数据集对象，
+旧数据集保持不变，正在使用旧数据集的请求不受影响
+"""
+
+import copy
+import hashlib
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.omission import build_ball_matrix, calculate_omission_matrix, OccurrenceIndex, OmissionTracker
+from utils.features import build_feature_table
+from utils.growable import GrowableArray, GrowableList
+from utils.cooccurrence import PairCooccurrence
+from utils.snapshot import (load_draw_frame, update_frame_hash, format_frame_version, file_signature, share_arrays,
+                            snapshot_directory, SHARED_DIR_NAME)
+
+# 彩种定义：各号码区的列名、最大号码、特征表区域，以及是否统计号码对共现
+GAME_SPECS = {
+    'ssq': {
+        'config_key': 'SSQ_DATA_PATH',
+        'areas': {
+            'red': {'columns': ['red1', 'red2', 'red3', 'red4', 'red5', 'red6'], 'max_number': 33,
+                    'feature_area': 'ssq_red', 'pairs': True},
+            'blue': {'columns': ['blue'], 'max_number': 16, 'feature_area': 'ssq_blue', 'pairs': False}
+        }
+    },
+    'dlt': {
+        'config_key': 'DLT_DATA_PATH',
+        'areas': {
+            'front': {'columns': ['front1', 'front2', 'front3', 'front4', 'front5'], 'max_number': 35,
+                      'feature_area': 'dlt_front', 'pairs': True},
+            'back': {'columns': ['back1', 'back2'], 'max_number': 12, 'feature_area': 'dlt_back', 'pairs': True}
+        }
+    }
+}
+
+
+def game_columns(game: str) -> List[str]:
+    """彩种的全部号码列（按号码区顺序）"""
+    return [col for area in GAME_SPECS[game]['areas'].values() for col in area['columns']]
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+def read_draw_csv(csv_path: str, game: str) -> pd.DataFrame:
+    """解析开奖历史CSV：首列为期号，其后为各号码列，号码转为整数，按期号从旧到新排序"""
+    df = pd.read_csv(csv_path)
+    columns = ['issue'] + game_columns(game)
+
+    # 检查列名
+    if len(df.columns) >= len(columns):
+        df = df.iloc[:, :len(columns)]
+        df.columns = columns
+    else:
+        # 尝试自动检测列名
+        print("警告: CSV列数不足，尝试自动处理...")
+
+    # 转换为整数
+    for col in columns[1:]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+
+    # 按期号排序（从旧到新）
+    return df.sort_values('issue', ascending=True).reset_index(drop=True)
+
+
+class LotteryDataset:
+    """
+    单个彩种的开奖数据与派生索引
+
+    号码矩阵、期号数组与特征表各列均为只读数组，调用方可直接切片、迭代而无需复制；
+    derived 为派生数据字典（键名如 'red_missed'、'front_features'），
+    蓝图按需构建的分布前缀计数、组合计数等也缓存在其中，随数据集一起共享与替换
+    """
+
+    def __init__(self, game: str, frame: pd.DataFrame, csv_path: Optional[str] = None):
+        self.game = game
+        self.csv_path = csv_path
+        self.frame = frame
+        # 版本哈希的中间状态：追加新开奖时复制后只写入新增行
+        self._version_hash = update_frame_hash(hashlib.sha1(), frame, game_columns(game))
+        self.version = format_frame_version(len(frame), self._version_hash)
+        self.features = {}
+        # 派生数组的只追加版本（增量追加时创建），键与 derived 相同
+        self._rows = {}
+        # 加载时源文件的 (inode, 修改时间, 大小)，文件监视据此判断是否需要重新加载
+        self.source_signature = None
+
+        issue_numbers = pd.to_numeric(frame['issue'], errors='coerce').to_numpy() if len(frame) else np.zeros(0)
+        # 期号列的只读视图（整数期号时与 frame 共享内存）
+        self.issue_array = _readonly(frame['issue'].to_numpy()) if len(frame) else np.zeros(0, dtype=np.int64)
+        derived = {
+            'source': frame,
+            'version': self.version,
+            'issues': GrowableList.wrap(frame['issue'].astype(str).tolist() if len(frame) else []),
+            'issue_numbers': _readonly(issue_numbers)
+        }
+        for name, area in GAME_SPECS[game]['areas'].items():
+            matrix = _readonly(build_ball_matrix(frame, area['columns']))
+            missed = _readonly(calculate_omission_matrix(matrix, area['max_number']))
+            derived[f'{name}_missed'] = missed
+            derived[f'{name}_occurrences'] = OccurrenceIndex.from_ball_matrix(matrix, area['max_number'])
+            if area['pairs']:
+                derived[f'{name}_cooccurrence'] = PairCooccurrence.from_ball_matrix(matrix, area['max_number'])
+            features = build_feature_table(matrix, area['feature_area'], missed)
+            _readonly(features.balls)
+            for column in features.columns.values():
+                _readonly(column)
+            derived[f'{name}_features'] = self.features[name] = features
+        self.derived = derived
+
+    @classmethod
+    def load(cls, game: str, csv_path: str) -> 'LotteryDataset':
+        """从CSV（或其二进制快照）加载"""
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"数据文件不存在: {csv_path}")
+        # 先取文件签名再读取：读取期间文件又被替换时，签名不一致会触发下一次重新加载
+        signature = file_signature(csv_path)
+        frame = load_draw_frame(csv_path, game_columns(game), lambda path: read_draw_csv(path, game))
+        dataset = cls(game, frame, csv_path)
+        dataset.source_signature = signature
+        return dataset
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def share(self, directory: str) -> 'LotteryDataset':
+        """
+        返回派生数组（号码矩阵、遗漏矩阵、特征表数值列、出现位置、共现与分布前缀计数等）
+        改为只读内存映射的同一数据集，自身不变
+
+        数组文件写在 directory 下按版本区分的子目录中，同一版本的其他进程直接映射已有文件；
+        字符串列、期号列表与 DataFrame 留在进程内。目录不可写时返回自身
+        """
+        arrays = {}
+        for key, value in _flatten_derived(self.derived):
+            if isinstance(value, np.ndarray):
+                if value.dtype != object:
+                    arrays[key] = value
+            elif hasattr(value, 'shared_arrays'):
+                for part, array in value.shared_arrays().items():
+                    arrays[f'{key}.{part}'] = array
+
+        shared = share_arrays(os.path.join(directory, f'{self.game}-{self.version}'), arrays)
+        if shared is None:
+            return self
+        # 删除旧版本的数组文件（已映射的进程不受影响）
+        for name in os.listdir(directory):
+            if name.startswith(f'{self.game}-') and name != f'{self.game}-{self.version}':
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        def attach(key, value):
+            if isinstance(value, np.ndarray):
+                return shared.get(key, value)
+            if hasattr(value, 'with_shared'):
+                return value.with_shared({part: shared[f'{key}.{part}'] for part in value.shared_arrays()})
+            return value
+
+        dataset = copy.copy(self)
+        dataset._rows = {}
+        derived = {}
+        for key, value in self.derived.items():
+            if isinstance(value, dict):
+                derived[key] = {name: attach(f'{key}.{name}', item) for name, item in value.items()}
+            else:
+                derived[key] = attach(key, value)
+        dataset.derived = derived
+        dataset.features = {name: derived[f'{name}_features'] for name in self.features}
+        return dataset
+
+    def _grow(self, key: str, current: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """把 rows 追加到派生数组 current 之后，返回只读视图并记录只追加数组"""
+        growable = self._rows.get(key)
+        if growable is None:
+            growable = GrowableArray.wrap(current)
+        self._rows[key] = growable = growable.extend(rows)
+        return growable.view()
+
+    def extend(self, rows: pd.DataFrame) -> 'LotteryDataset':
+        """
+        返回追加若干期开奖后的新数据集，自身不变
+
+        遗漏值从各号码最近一次出现的位置接续计算，特征表只计算新增期（振幅、重号等依赖上一期的特征带上前一期一起计算），
+        出现位置索引与号码对共现前缀计数只追加新增行，派生数组按比例预留容量，追加摊还 O(新增期数 × 号码数)；
+        DataFrame 各列、期号列表同样只追加，版本哈希由上一版本的哈希状态接续计算，与整体重新计算的结果一致
+
+        Args:
+            rows: 新增开奖（issue 与号码列，期号须大于已有期号），见 normalize_draws
+        """
+        count = len(self.frame)
+        if count == 0 or len(rows) == 0:
+            frame = pd.concat([self.frame, rows], ignore_index=True) if count else rows.reset_index(drop=True)
+            return LotteryDataset(self.game, frame, self.csv_path)
+
+        dataset = copy.copy(self)
+        dataset.features = {}
+        dataset._rows = dict(self._rows)
+        # 各列追加到只追加数组后由视图组成新的 DataFrame（不复制），旧数据集的 DataFrame 不变
+        columns = {column: dataset._grow(f'frame.{column}', self.frame[column].to_numpy(),
+                                         rows[column].to_numpy(dtype=self.frame[column].dtype))
+                   for column in self.frame.columns}
+        frame = dataset.frame = pd.DataFrame(columns, copy=False)
+        dataset.issue_array = columns['issue']
+        dataset._version_hash = update_frame_hash(self._version_hash.copy(), rows, game_columns(self.game))
+        dataset.version = format_frame_version(len(frame), dataset._version_hash)
+
+        previous = self.derived
+        derived = {
+            'source': frame,
+            'version': dataset.version,
+            'issues': GrowableList.wrap(previous['issues']).extend(rows['issue'].astype(str)),
+            'issue_numbers': dataset._grow('issue_numbers', previous['issue_numbers'],
+                                           pd.to_numeric(rows['issue'], errors='coerce').to_numpy())
+        }
+        for name, area in GAME_SPECS[self.game]['areas'].items():
+            matrix = rows[area['columns']].to_numpy(dtype=np.int64)
+            occurrences = previous[f'{name}_occurrences']
+
+            tracker = OmissionTracker(area['max_number'])
+            tracker.last_seen, tracker.count = occurrences.last_seen(), count
+            missed = tracker.extend(matrix)
+            derived[f'{name}_missed'] = dataset._grow(f'{name}_missed', previous[f'{name}_missed'], missed)
+            derived[f'{name}_occurrences'] = occurrences.extended(matrix)
+            if area['pairs']:
+                derived[f'{name}_cooccurrence'] = previous[f'{name}_cooccurrence'].extended(matrix)
+
+            # 带上前一期计算，再去掉前一期
+            features = self.features[name]
+            table = build_feature_table(np.vstack([features.balls[-1:], matrix]), area['feature_area'],
+                                        np.vstack([previous[f'{name}_missed'][-1:], missed])).slice(1)
+            derived[f'{name}_features'] = dataset.features[name] = features.extended(table)
+        dataset.derived = derived
+        return dataset
+
+
+def _flatten_derived(derived: Dict[str, Any]):
+    """逐项列出派生数据 (键, 值)，嵌套字典（分布计数、组合计数）展开为 '外层键.内层键'"""
+    for key, value in derived.items():
+        if isinstance(value, dict):
+            for name, item in value.items():
+                yield f'{key}.{name}', item
+        else:
+            yield key, value
+
+
+def normalize_draws(game: str, draws: List[Dict[str, Any]], dataset: Optional[LotteryDataset] = None) -> pd.DataFrame:
+    """
+    校验新增开奖并转换为与数据集一致的 DataFrame
+
+    Args:
+        draws: [{"issue": 2026018, "red": [1, 2, 3, 4, 5, 6], "blue": [7]}, ...]，
+               号码区名称见 GAME_SPECS（双色球 red/blue，大乐透 front/back），单个号码可直接写整数
+        dataset: 已有数据集，新期号须大于其最新期号
+
+    Raises:
+        ValueError: 格式、号码个数、号码范围或期号顺序不正确
+    """
+    if not isinstance(draws, list) or not draws:
+        raise ValueError('draws 须为非空列表')
+
+    areas = GAME_SPECS[game]['areas']
+    last_issue = int(dataset.issue_array[-1]) if dataset is not None and len(dataset) else None
+    records = []
+    for i, draw in enumerate(draws, start=1):
+        if not isinstance(draw, dict):
+            raise ValueError(f'第{i}条开奖格式不正确')
+        try:
+            issue = int(str(draw.get('issue')).strip())
+        except ValueError:
+            raise ValueError(f'第{i}条开奖期号无效: {draw.get("issue")}')
+        if last_issue is not None and issue <= last_issue:
+            raise ValueError(f'第{i}条开奖期号 {issue} 须大于已有的最新期号 {last_issue}')
+        last_issue = issue
+
+        record = {'issue': issue}
+        for name, area in areas.items():
+            numbers = draw.get(name)
+            numbers = [numbers] if isinstance(numbers, int) else numbers
+            if (not isinstance(numbers, list) or len(numbers) != len(area['columns'])
+                    or not all(isinstance(n, int) and 1 <= n <= area['max_number'] for n in numbers)
+                    or len(set(numbers)) != len(numbers)):
+                raise ValueError(f"第{i}条开奖 {name} 须为 {len(area['columns'])} 个 1~{area['max_number']} 之间不重复的号码")
+            record.update(zip(area['columns'], numbers))
+        records.append(record)
+
+    frame = pd.DataFrame.from_records(records, columns=['issue'] + game_columns(game))
+    return frame.astype(np.int64)
+
+
+def append_draws_to_csv(csv_path: str, game: str, rows: pd.DataFrame) -> None:
+    """
+    把新增开奖追加到历史CSV末尾（一次写入；CSV变化后快照在下次加载时自动重建）
+    写入失败时截断回原长度，不留下半行
+    """
+    columns = ['issue'] + game_columns(game)
+    lines = ''.join(','.join(str(int(value)) for value in row) + '\n'
+                    for row in rows[columns].itertuples(index=False))
+    # 不带缓冲写入：失败时已写出的部分都在文件中，截断即可恢复
+    with open(csv_path, 'rb+', buffering=0) as f:
+        size = f.seek(0, os.SEEK_END)
+        if size > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                lines = '\n' + lines
+        data = lines.encode('utf-8')
+        try:
+            written = 0
+            while written < len(data):
+                written += f.write(data[written:])
+        except OSError:
+            f.truncate(size)
+            raise
+
+
+# 进程内注册表：彩种 -> 当前数据集
+_datasets: Dict[str, LotteryDataset] = {}
+_datasets_lock = threading.Lock()
+# 数据集更新锁：彩种 -> 锁，追加开奖与文件重新加载等替换数据集的操作串行执行（读取不加锁）
+_update_locks: Dict[str, threading.Lock] = {}
+# 数据集钩子：彩种 -> {'prepare': [发布前在后台构建附加索引], 'adopt': [发布后切换到新数据集]}
+_dataset_hooks: Dict[str, Dict[str, list]] = {}
+
+
+def _config_value(key: str, default: Any = None) -> Any:
+    """当前应用配置（无应用上下文时为默认配置）中的配置项"""
+    try:
+        from flask import current_app
+        return current_app.config[key]
+    except (RuntimeError, KeyError):
+        from config import Config
+        return getattr(Config, key, default)
+
+
+def _default_csv_path(game: str) -> str:
+    """当前应用配置（无应用上下文时为默认配置）中的数据文件路径"""
+    return _config_value(GAME_SPECS[game]['config_key'])
+
+
+def _same_path(a: Optional[str], b: Optional[str]) -> bool:
+    return a is not None and b is not None and os.path.abspath(a) == os.path.abspath(b)
+
+
+def get_dataset(game: str, csv_path: Optional[str] = None) -> LotteryDataset:
+    """
+    获取彩种的共享数据集，首次使用时加载并登记（并发调用只加载一次）
+
+    Args:
+        game: 'ssq' 或 'dlt'
+        csv_path: 数据文件路径，缺省为配置中的路径；与已登记数据集的路径不同时单独加载，不登记
+
+    Raises:
+        ValueError: 不支持的彩种
+        FileNotFoundError: 数据文件不存在
+    """
+    if game not in GAME_SPECS:
+        raise ValueError(f'不支持的彩种: {game}')
+
+    dataset = _datasets.get(game)
+    if dataset is not None and (csv_path is None or _same_path(dataset.csv_path, csv_path)):
+        return dataset
+
+    with _datasets_lock:
+        dataset = _datasets.get(game)
+        if dataset is not None and (csv_path is None or _same_path(dataset.csv_path, csv_path)):
+            return dataset
+        if dataset is not None:
+            return LotteryDataset.load(game, csv_path)
+        dataset = share_dataset(LotteryDataset.load(game, csv_path or _default_csv_path(game)), prepare=True)
+        _datasets[game] = dataset
+        return dataset
+
+
+def find_dataset(game: str, frame: pd.DataFrame) -> Optional[LotteryDataset]:
+    """已登记且数据正是 frame 的数据集，没有时返回None"""
+    dataset = _datasets.get(game)
+    return dataset if dataset is not None and dataset.frame is frame else None
+
+
+def dataset_update_lock(game: str) -> threading.Lock:
+    """彩种的数据集更新锁"""
+    with _datasets_lock:
+        return _update_locks.setdefault(game, threading.Lock())
+
+
+def register_dataset_hooks(game: str, prepare: Optional[Callable[[LotteryDataset], None]] = None,
+                           adopt: Optional[Callable[[LotteryDataset], None]] = None) -> None:
+    """
+    登记数据集钩子
+
+    Args:
+        prepare: 重新加载的数据集发布前调用（在加载线程中），用于预先构建附加索引，发布后请求无需再构建
+        adopt: 数据集发布后调用，用于把模块持有的当前数据切换到新数据集
+    """
+    hooks = _dataset_hooks.setdefault(game, {'prepare': [], 'adopt': []})
+    if prepare is not None:
+        hooks['prepare'].append(prepare)
+    if adopt is not None:
+        hooks['adopt'].append(adopt)
+
+
+def prepare_dataset(dataset: LotteryDataset) -> None:
+    """执行数据集的 prepare 钩子（发布前调用）"""
+    for prepare in _dataset_hooks.get(dataset.game, {}).get('prepare', []):
+        prepare(dataset)
+
+
+def share_dataset(dataset: LotteryDataset, prepare: bool = False) -> LotteryDataset:
+    """
+    启用 SHARE_DATASETS 时把数据集的派生数组换成快照目录中的共享只读内存映射，未启用时原样返回
+
+    gunicorn 以 preload_app 启动时主进程加载并映射，fork 出的 worker 继承映射，
+    各 worker 的常驻内存不随 worker 数增加；未预加载时各 worker 映射同一组文件，效果相同
+
+    Args:
+        prepare: 映射前先执行 prepare 钩子，使按需构建的分布计数、组合计数等也放入共享映射
+    """
+    if not _config_value('SHARE_DATASETS', False) or not dataset.csv_path:
+        return dataset
+    if prepare:
+        prepare_dataset(dataset)
+    return dataset.share(os.path.join(snapshot_directory(dataset.csv_path), SHARED_DIR_NAME))
+
+
+def publish_dataset(dataset: LotteryDataset) -> None:
+    """
+    登记（替换）彩种的当前数据集并通知 adopt 钩子
+    替换只是引用赋值：已取得旧数据集的调用方继续使用旧对象直至完成（读-复制-更新）
+    """
+    with _datasets_lock:
+        _datasets[dataset.game] = dataset
+    for adopt in _dataset_hooks.get(dataset.game, {}).get('adopt', []):
+        adopt(dataset)
+
+
+def registered_datasets() -> Dict[str, LotteryDataset]:
+    """当前已登记的数据集 {彩种: 数据集}"""
+    return dict(_datasets)
@@ -0,0 +1,99 @@
+"""
+窗口分布统计引擎
+对任意按期排列的特征列（龙头、和值、各类比值、冷温热等）预先构建前缀计数表，
+prefix[i, b] 为前 i 期中取值落在第 b 个分箱的次数，
+任意窗口 [start, stop) 的分布即 prefix[stop] - prefix[start]，复杂度 O(分箱数)
+"""
+
+import copy
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.growable import GrowableArray
+
+# 分布图默认统计最近的期数
+DEFAULT_DISTRIBUTION_WINDOW = 100
+
+
+class DistributionIndex:
+    """
+    单个特征列的前缀计数表
+
+    bins 为有序的分箱取值列表；未指定时取特征列中出现过的全部取值（升序）。
+    valid 为 False 的期（如第一期的振幅）及不在分箱中的取值不计数
+    """
+
+    def __init__(self, values: Sequence[Any], bins: Optional[List[Any]] = None,
+                 valid: Optional[np.ndarray] = None):
+        values = np.asarray(values)
+        if bins is None:
+            bins = np.unique(values[valid] if valid is not None else values).tolist()
+        self.bins = list(bins)
+        self._bin_codes = {value: code for code, value in enumerate(self.bins)}
+        self._prefix_rows = GrowableArray.wrap(np.zeros((1, len(self.bins)), dtype=np.int32))
+        self.prefix = self._prefix_rows.view()
+        self.extend(values, valid)
+
+    def __len__(self) -> int:
+        return len(self.prefix) - 1
+
+    def _encode(self, values: np.ndarray, valid: Optional[np.ndarray]) -> np.ndarray:
+        """取值转换为分箱编号，不计数的期记为-1"""
+        codes = np.array([self._bin_codes.get(value, -1) for value in values.tolist()], dtype=np.int64)
+        if valid is not None:
+            codes[~np.asarray(valid, dtype=bool)] = -1
+        return codes
+
+    def extend(self, values: Sequence[Any], valid: Optional[np.ndarray] = None) -> None:
+        """追加若干期的取值（超出现有分箱的新取值不计数，需要时重新构建）"""
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+
+        codes = self._encode(values, valid)
+        one_hot = np.zeros((len(codes), len(self.bins)), dtype=np.int32)
+        counted = codes >= 0
+        one_hot[np.flatnonzero(counted), codes[counted]] = 1
+
+        rows = np.cumsum(one_hot, axis=0, dtype=np.int32) + self.prefix[-1]
+        # 首次构建按实际大小分配，之后追加新开奖时预留增长空间
+        self._prefix_rows = self._prefix_rows.extend(rows, headroom=len(self) > 0)
+        self.prefix = self._prefix_rows.view()
+
+    def covers(self, values: Sequence[Any]) -> bool:
+        """取值是否都在现有分箱中（新取值超出分箱时追加会漏计，应重新构建）"""
+        return all(value in self._bin_codes for value in np.asarray(values).tolist())
+
+    def extended(self, values: Sequence[Any], valid: Optional[np.ndarray] = None) -> 'DistributionIndex':
+        """返回追加若干期后的新计数表，自身不变（正在读取旧计数表的调用方不受影响）"""
+        index = copy.copy(self)
+        index.extend(values, valid)
+        return index
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可放入共享内存映射的数组"""
+        return {'prefix': self.prefix}
+
+    def with_shared(self, arrays: Dict[str, np.ndarray]) -> 'DistributionIndex':
+        """返回以 arrays（shared_arrays 各数组的只读映射）为数据的新计数表（再追加时复制到进程内）"""
+        index = copy.copy(self)
+        index._prefix_rows = GrowableArray.wrap(arrays['prefix'])
+        index.prefix = index._prefix_rows.view()
+        return index
+
+    def counts(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """窗口 [start, stop) 内各分箱的计数"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = min(max(start, 0), stop)
+        return self.prefix[stop] - self.prefix[start]
+
+    def to_dict(self, start: int = 0, stop: Optional[int] = None,
+                keep_empty: bool = False) -> Dict[Any, int]:
+        """
+        窗口分布，按分箱顺序返回 {取值: 次数}
+
+        Args:
+            keep_empty: 是否保留计数为0的分箱（固定分箱的图表如大小、奇偶需要保留）
+        """
+        counts = self.counts(start, stop).tolist()
+        return {value: count for value, count in zip(self.bins, counts) if keep_empty or count}
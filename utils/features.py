@@ -0,0 +1,260 @@
+"""
+每期特征表
+在数据加载时对整个开奖号码矩阵一次性向量化计算龙头、凤尾、和值、跨度、AC值、
+大小比、质合比、012路比、区间比、奇偶比、连号、同尾、冷温热比、振幅、重号、邻号等特征，
+走势接口与模板只需按行切片读取
+"""
+
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from utils.bitmask import build_bitmasks, repeat_counts, adjacent_counts
+from utils.growable import GrowableArray
+
+# 各号码区的统计口径（与原有逐行计算函数保持一致）
+AREA_SPECS = {
+    'ssq_red': {
+        'max_number': 33,
+        'big_threshold': 16,
+        'primes': (1, 2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31),
+        'zones': [(1, 11), (12, 22), (23, 33)],
+    },
+    'ssq_blue': {
+        'max_number': 16,
+        'big_threshold': 8,
+        'primes': (1, 2, 3, 5, 7, 11, 13),
+        'zones': [(1, 4), (5, 8), (9, 12), (13, 16)],
+    },
+    'dlt_front': {
+        'max_number': 35,
+        'big_threshold': 17,
+        'primes': (1, 2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31),
+        'zones': [(1, 12), (13, 24), (25, 35)],
+    },
+    'dlt_back': {
+        'max_number': 12,
+        'big_threshold': 6,
+        'primes': (1, 2, 3, 5, 7, 11),
+        'zones': [(1, 4), (5, 8), (9, 12)],
+    },
+}
+
+# 同尾只统计2~4个号码同尾的情况
+SAME_TAIL_SIZES = (2, 3, 4)
+
+
+def _format_ratio(count_matrix: np.ndarray) -> np.ndarray:
+    """将 (期数, k) 计数矩阵格式化为 'a:b:c' 字符串列（按不同组合去重后格式化）"""
+    if len(count_matrix) == 0:
+        return np.array([], dtype=object)
+
+    unique_rows, inverse = np.unique(count_matrix, axis=0, return_inverse=True)
+    labels = np.array([':'.join(str(v) for v in row) for row in unique_rows.tolist()], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def describe_consecutive(is_next: List[bool]) -> str:
+    """根据相邻号码是否连续的标记生成连号描述，如 '2连+3连'"""
+    consecutive_types = []
+    run = 0
+    for flag in list(is_next) + [False]:
+        if flag:
+            run += 1
+        elif run:
+            consecutive_types.append(f'{run + 1}连')
+            run = 0
+
+    consecutive_types.sort()
+    return '+'.join(consecutive_types) if consecutive_types else '无连号'
+
+
+def describe_same_tail(size_counts: List[int]) -> str:
+    """根据各同尾组大小的出现次数生成同尾描述，如 '2同尾+2同尾'"""
+    same_tail_types = []
+    for size, count in zip(SAME_TAIL_SIZES, size_counts):
+        same_tail_types.extend([f'{size}同尾'] * count)
+
+    same_tail_types.sort()
+    return '+'.join(same_tail_types) if same_tail_types else '无同尾'
+
+
+def _map_unique_rows(matrix: np.ndarray, describe) -> np.ndarray:
+    """对矩阵的不同行分别生成描述，再映射回每一期"""
+    if len(matrix) == 0:
+        return np.array([], dtype=object)
+
+    unique_rows, inverse = np.unique(matrix, axis=0, return_inverse=True)
+    labels = np.array([describe(row) for row in unique_rows.tolist()], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def calculate_ac_values(ball_matrix: np.ndarray) -> np.ndarray:
+    """向量化计算AC值：不同差值个数 - (号码个数 - 1)"""
+    draw_count, ball_count = ball_matrix.shape
+    if ball_count < 2:
+        return np.zeros(draw_count, dtype=np.int64)
+
+    left, right = np.triu_indices(ball_count, k=1)
+    differences = np.sort(np.abs(ball_matrix[:, right] - ball_matrix[:, left]), axis=1)
+    distinct = 1 + (np.diff(differences, axis=1) != 0).sum(axis=1)
+    return distinct - (ball_count - 1)
+
+
+def calculate_cold_warm_hot_counts(ball_matrix: np.ndarray, missed_matrix: np.ndarray) -> np.ndarray:
+    """
+    根据遗漏矩阵统计每期开奖号码的冷、温、热个数
+
+    Returns:
+        (期数, 3) 矩阵，列依次为 冷、温、热
+    """
+    max_number = missed_matrix.shape[1]
+    valid = (ball_matrix >= 1) & (ball_matrix <= max_number)
+    rows = np.arange(len(ball_matrix))[:, None]
+    missed = missed_matrix[rows, np.clip(ball_matrix - 1, 0, max_number - 1)]
+    # 越界号码（缺失值）在当期即可找到，视为遗漏0期
+    missed = np.where(valid, missed, 0)
+
+    hot = (missed < 4).sum(axis=1)
+    warm = ((missed >= 4) & (missed <= 16)).sum(axis=1)
+    cold = (missed > 16).sum(axis=1)
+    return np.stack([cold, warm, hot], axis=1)
+
+
+class FeatureTable:
+    """
+    每期特征表
+
+    所有列均为按期排列的NumPy数组（旧期在前），
+    计数类特征为整数列，比值与描述类特征为字符串列
+    """
+
+    def __init__(self, balls: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.balls = balls
+        self.columns = columns
+        # 各列的只追加数组，首次追加时创建
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self.balls)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def slice(self, start: int = 0, stop: Optional[int] = None) -> 'FeatureTable':
+        """按行切片的特征表（各列为视图，不复制）"""
+        return FeatureTable(self.balls[start:stop], {name: column[start:stop] for name, column in self.columns.items()})
+
+    def extended(self, table: 'FeatureTable') -> 'FeatureTable':
+        """返回在末尾接上 table 各行的新特征表，自身不变；各列按只追加数组扩容，摊还 O(新增行)"""
+        rows = {}
+        for name in ['balls'] + list(self.columns):
+            current = self.balls if name == 'balls' else self.columns[name]
+            growable = self._rows.get(name)
+            if growable is None:
+                growable = GrowableArray.wrap(current)
+            rows[name] = growable.extend(table.balls if name == 'balls' else table.columns[name])
+
+        result = FeatureTable(rows['balls'].view(), {name: rows[name].view() for name in self.columns})
+        result._rows = rows
+        return result
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可放入共享内存映射的数组：号码矩阵与数值列（字符串列留在进程内）"""
+        arrays = {'balls': self.balls}
+        arrays.update({name: column for name, column in self.columns.items() if column.dtype != object})
+        return arrays
+
+    def with_shared(self, arrays: Dict[str, np.ndarray]) -> 'FeatureTable':
+        """返回以 arrays（shared_arrays 各数组的只读映射）替换对应列的新特征表"""
+        return FeatureTable(arrays['balls'], {name: arrays.get(name, column) for name, column in self.columns.items()})
+
+    def to_lists(self, names: List[str], start: int = 0, stop: Optional[int] = None) -> Dict[str, List[Any]]:
+        """按行切片并转换为Python列表，便于逐期组装JSON"""
+        result = {}
+        for name in names:
+            column = self.balls if name == 'balls' else self.columns[name]
+            result[name] = column[start:stop].tolist()
+        return result
+
+
+def build_feature_table(ball_matrix: np.ndarray, area: str,
+                        missed_matrix: Optional[np.ndarray] = None) -> FeatureTable:
+    """
+    向量化构建整个历史的特征表
+
+    Args:
+        ball_matrix: (期数, 号码个数) 开奖号码矩阵，按时间顺序排列
+        area: 号码区，见 AREA_SPECS（如 'ssq_red'、'dlt_back'）
+        missed_matrix: 对应号码区的遗漏值矩阵，提供时计算冷温热比
+
+    Returns:
+        FeatureTable
+    """
+    spec = AREA_SPECS[area]
+    balls = np.asarray(ball_matrix, dtype=np.int64)
+    draw_count, ball_count = balls.shape
+    sorted_balls = np.sort(balls, axis=1)
+
+    columns = {}
+    if ball_count:
+        columns['dragon_head'] = sorted_balls[:, 0]
+        columns['phoenix_tail'] = sorted_balls[:, -1]
+    else:
+        columns['dragon_head'] = columns['phoenix_tail'] = np.zeros(draw_count, dtype=np.int64)
+    columns['sum_value'] = balls.sum(axis=1)
+    columns['span'] = columns['phoenix_tail'] - columns['dragon_head']
+    columns['ac_value'] = calculate_ac_values(balls)
+
+    # 大小、质合、奇偶、012路、区间计数
+    big_count = (balls > spec['big_threshold']).sum(axis=1)
+    prime_count = np.isin(balls, spec['primes']).sum(axis=1)
+    odd_count = (balls % 2 == 1).sum(axis=1)
+    road_counts = np.stack([(balls % 3 == r).sum(axis=1) for r in range(3)], axis=1)
+    zone_counts = np.stack([((balls >= low) & (balls <= high)).sum(axis=1)
+                            for low, high in spec['zones']], axis=1)
+
+    columns['big_count'] = big_count
+    columns['prime_count'] = prime_count
+    columns['odd_count'] = odd_count
+    columns['road_counts'] = road_counts
+    columns['zone_counts'] = zone_counts
+
+    columns['size_ratio'] = _format_ratio(np.stack([big_count, ball_count - big_count], axis=1))
+    columns['prime_ratio'] = _format_ratio(np.stack([prime_count, ball_count - prime_count], axis=1))
+    columns['road012_ratio'] = _format_ratio(road_counts)
+    columns['zone_ratio'] = _format_ratio(zone_counts)
+    columns['odd_even_ratio'] = _format_ratio(np.stack([odd_count, ball_count - odd_count], axis=1))
+
+    # 连号：排序后相邻号码差为1
+    if ball_count >= 2:
+        columns['consecutive_desc'] = _map_unique_rows(np.diff(sorted_balls, axis=1) == 1, describe_consecutive)
+
+        tails = balls % 10
+        tail_counts = np.stack([(tails == t).sum(axis=1) for t in range(10)], axis=1)
+        size_counts = np.stack([(tail_counts == size).sum(axis=1) for size in SAME_TAIL_SIZES], axis=1)
+        columns['same_tail_desc'] = _map_unique_rows(size_counts, describe_same_tail)
+    else:
+        columns['consecutive_desc'] = np.full(draw_count, '无连号', dtype=object)
+        columns['same_tail_desc'] = np.full(draw_count, '无同尾', dtype=object)
+
+    # 振幅：各位置号码与上期的差值绝对值，第一期为0
+    amplitude = np.zeros_like(balls)
+    if draw_count > 1:
+        amplitude[1:] = np.abs(np.diff(balls, axis=0))
+    columns['amplitude'] = amplitude
+
+    # 位掩码：重号、邻号由相邻两期位掩码的 popcount 得到
+    bitmasks = build_bitmasks(balls)
+    columns['bitmask'] = bitmasks
+    columns['repeat_count'] = repeat_counts(bitmasks)
+    columns['adjacent_count'] = adjacent_counts(bitmasks)
+
+    if missed_matrix is not None:
+        cwh_counts = calculate_cold_warm_hot_counts(balls, missed_matrix)
+        columns['cold_warm_hot_counts'] = cwh_counts
+        columns['cold_warm_hot_ratio'] = _format_ratio(cwh_counts)
+
+    return FeatureTable(balls, columns)
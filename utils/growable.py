@@ -0,0 +1,143 @@
+"""
+只追加数组与列表
+按第0维（期）追加行的数组缓冲区，容量按比例增长，追加新开奖时摊还 O(新增行)，
+不必像 np.concatenate 那样每次复制整个历史；期号字符串等 Python 对象列表同理
+"""
+
+import threading
+from collections.abc import Sequence
+
+import numpy as np
+
+# 扩容比例：新容量为所需长度的 1.25 倍（至少多留 64 行）
+GROWTH_FACTOR = 1.25
+MIN_HEADROOM = 64
+
+_lock = threading.Lock()
+
+
+class GrowableArray:
+    """
+    只追加的数组
+
+    view() 返回只覆盖已追加行的只读视图。extend() 不修改当前对象而是返回新对象：
+    缓冲区由新旧对象共享，新行写在旧对象视图范围之外，持有旧对象（或其视图）的读者看到的内容不变；
+    从同一个旧对象再次追加时缓冲区末尾已被占用，此时复制到新的缓冲区
+    """
+
+    def __init__(self, storage: dict, length: int):
+        self._storage = storage
+        self.length = length
+
+    @classmethod
+    def wrap(cls, array: np.ndarray) -> 'GrowableArray':
+        """以现有数组为缓冲区（不复制，容量即当前长度，首次追加时扩容）"""
+        array = np.asarray(array)
+        return cls({'buffer': array, 'length': len(array)}, len(array))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def view(self) -> np.ndarray:
+        """已追加行的只读视图"""
+        view = self._storage['buffer'][:self.length]
+        view.setflags(write=False)
+        return view
+
+    def extend(self, rows, headroom: bool = True) -> 'GrowableArray':
+        """
+        返回追加 rows 之后的新数组，当前对象不变
+
+        Args:
+            headroom: 需要扩容时是否预留增长空间；一次性构建全部历史时传 False，缓冲区大小与数据一致
+        """
+        buffer = self._storage['buffer']
+        rows = np.asarray(rows)
+        if rows.ndim == buffer.ndim - 1:
+            rows = rows[None]
+        dtype = np.result_type(buffer.dtype, rows.dtype) if rows.size else buffer.dtype
+        new_length = self.length + len(rows)
+
+        with _lock:
+            storage = self._storage
+            writable = (storage['length'] == self.length and new_length <= len(buffer)
+                        and dtype == buffer.dtype and buffer.flags.writeable)
+            if not writable:
+                # 容量不足、缓冲区已被其他版本追加、取值类型需要提升（如更长的字符串）或缓冲区只读：复制扩容
+                capacity = new_length
+                if headroom:
+                    capacity = max(int(new_length * GROWTH_FACTOR), new_length + MIN_HEADROOM)
+                grown = np.empty((capacity,) + buffer.shape[1:], dtype=dtype)
+                grown[:self.length] = buffer[:self.length]
+                storage = {'buffer': grown, 'length': self.length}
+            storage['buffer'][self.length:new_length] = rows
+            storage['length'] = new_length
+        return GrowableArray(storage, new_length)
+
+
+class GrowableList(Sequence):
+    """
+    只追加的列表（如期号字符串），语义与 GrowableArray 相同：
+    extend() 返回新对象，与旧对象共享底层列表，旧对象只看到自己长度以内的元素；
+    切片返回普通 list，可直接序列化为JSON
+    """
+
+    def __init__(self, storage: dict, length: int):
+        self._storage = storage
+        self.length = length
+
+    @classmethod
+    def wrap(cls, items) -> 'GrowableList':
+        """以 items 的副本为底层存储（GrowableList 直接沿用其存储）"""
+        if isinstance(items, GrowableList):
+            return items
+        items = list(items)
+        return cls({'items': items, 'length': len(items)}, len(items))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._storage['items'][slice(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('GrowableList index out of range')
+        return self._storage['items'][index]
+
+    def __iter__(self):
+        items = self._storage['items']
+        for i in range(self.length):
+            yield items[i]
+
+    def __contains__(self, value) -> bool:
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def index(self, value, start: int = 0, stop: int = None) -> int:
+        stop = self.length if stop is None else min(stop, self.length)
+        return self._storage['items'].index(value, start, stop)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, GrowableList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'GrowableList({self[:]!r})'
+
+    def extend(self, items) -> 'GrowableList':
+        """返回追加 items 之后的新列表，当前对象不变"""
+        items = list(items)
+        with _lock:
+            storage = self._storage
+            if storage['length'] != self.length:
+                # 底层列表已被其他版本追加：复制已有部分
+                storage = {'items': storage['items'][:self.length], 'length': self.length}
+            storage['items'].extend(items)
+            storage['length'] = self.length + len(items)
+        return GrowableList(storage, storage['length'])
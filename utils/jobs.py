@@ -0,0 +1,457 @@
+"""
+后台任务队列
+组合过滤、策略回测、全量重算等耗时分析不在请求中同步执行，而是提交到进程内有界线程池；
+任务状态、进度与结果保存在本地 SQLite 文件中（WAL 模式），同一台机器上的多个 gunicorn worker 共享，
+任一 worker 都可以查询进度、取回结果或请求取消。
+结果总大小与条目数受限，超出时先淘汰最早完成的任务；同一数据版本下参数相同的提交复用已有任务。
+每个任务记录所属进程与心跳时间：所属进程已退出或心跳超时的排队/执行中任务在启动与查询时标记为失败，
+不会一直占用去重键
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# 进度写入存储的最短间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+# 排队与执行中任务的心跳间隔（秒），超过 JOB_STALE_TIMEOUT 未更新心跳的任务视为所属进程已退出
+HEARTBEAT_INTERVAL = 10
+STALE_TIMEOUT = 60
+
+# 已注册的任务类型：名称 -> {'run', 'validate', 'version', 'token'}
+_job_kinds = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result BLOB,
+    result_size INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+"""
+
+# 旧版本存储文件缺少的列
+_MIGRATIONS = {
+    'owner': 'ALTER TABLE jobs ADD COLUMN owner TEXT',
+    'heartbeat': 'ALTER TABLE jobs ADD COLUMN heartbeat REAL'
+}
+
+# 本进程的所属标识 '主机:进程号:随机串'（fork 后的子进程重新生成）
+_owner = {'pid': None, 'id': None}
+
+
+def current_owner() -> str:
+    """本进程的任务所属标识；随机串区分复用了同一进程号的新进程（如容器重启后的 1 号进程）"""
+    if _owner['pid'] != os.getpid():
+        _owner['pid'], _owner['id'] = os.getpid(), f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    return _owner['id']
+
+
+def _owner_exited(owner: Optional[str]) -> bool:
+    """所属进程是否确定已退出：同一主机上进程号已不存在"""
+    try:
+        host, pid, _ = owner.rsplit(':', 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return True
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+class JobCancelled(Exception):
+    """任务被取消（由任务函数在检查点抛出）"""
+
+
+class JobQueueFull(Exception):
+    """等待执行的任务数已达上限"""
+
+
+def register_job_kind(name: str, run: Callable[[Dict[str, Any], 'JobContext'], Any],
+                      validate: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      version: Optional[Callable[[], str]] = None,
+                      token: Optional[str] = None) -> None:
+    """
+    注册任务类型
+
+    Args:
+        name: 任务类型名称，如 'ssq.backtest'
+        run: 任务函数 run(params, job)，返回可JSON序列化的结果；
+             通过 job.report() 汇报进度，在检查点调用 job.check_cancelled()
+        validate: 提交时校验参数，参数无效时抛出 ValueError
+        version: 返回当前数据版本，参与去重键，数据更新后相同参数会重新计算
+        token: 提交时要求的令牌配置项（如 'INGEST_TOKEN'），为None时任何人可提交
+    """
+    _job_kinds[name] = {'run': run, 'validate': validate, 'version': version, 'token': token}
+
+
+def job_kind_token(kind: str) -> Optional[str]:
+    """任务类型要求的令牌配置项，不需要令牌或类型不存在时返回None"""
+    spec = _job_kinds.get(kind)
+    return spec['token'] if spec is not None else None
+
+
+def job_key(kind: str, params: Dict[str, Any], version: str = '') -> str:
+    """任务去重键：类型、规范化参数与数据版本的哈希"""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(f'{kind}|{version}|{canonical}'.encode('utf-8')).hexdigest()
+
+
+class JobContext:
+    """传给任务函数的上下文：进度汇报与取消检查"""
+
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.done = 0
+        self.total = None
+        self.message = None
+        self._last_write = 0.0
+        self._cancelled = False
+
+    def report(self, done: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        """汇报进度（写入存储按 PROGRESS_INTERVAL 节流）"""
+        self.done, self.total = done, total if total is not None else self.total
+        if message is not None:
+            self.message = message
+        now = time.time()
+        if now - self._last_write >= PROGRESS_INTERVAL:
+            self._last_write = now
+            self.queue._update_progress(self.job_id, self.progress, self.message)
+
+    @property
+    def progress(self) -> float:
+        if not self.total:
+            return 0.0
+        return round(min(max(self.done / self.total, 0.0), 1.0), 4)
+
+    def check_cancelled(self) -> None:
+        """已请求取消时抛出 JobCancelled（取消请求可能来自其他 worker，读取存储）"""
+        if not self._cancelled:
+            self._cancelled = self.queue._cancel_requested(self.job_id)
+        if self._cancelled:
+            raise JobCancelled()
+
+
+class JobQueue:
+    """
+    进程内后台任务队列（Flask 扩展）
+
+    配置项：
+        JOB_WORKERS: 执行任务的线程数
+        JOB_MAX_PENDING: 本进程中排队与执行中的任务数上限
+        JOB_STORE_PATH: SQLite 存储文件路径
+        JOB_STORE_MAX_BYTES: 已保存结果的总字节数上限（压缩后）
+        JOB_STORE_MAX_ENTRIES: 已完成任务的保留条数上限
+        JOB_HEARTBEAT_INTERVAL: 排队与执行中任务的心跳间隔（秒）
+        JOB_STALE_TIMEOUT: 心跳超过该秒数未更新的任务标记为失败
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.path = None
+        self.max_pending = 32
+        self.max_bytes = 64 * 1024 * 1024
+        self.max_entries = 500
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.stale_timeout = STALE_TIMEOUT
+        self._executor = None
+        self._futures = {}
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.path = app.config.get('JOB_STORE_PATH')
+        self.max_pending = app.config.get('JOB_MAX_PENDING', self.max_pending)
+        self.max_bytes = app.config.get('JOB_STORE_MAX_BYTES', self.max_bytes)
+        self.max_entries = app.config.get('JOB_STORE_MAX_ENTRIES', self.max_entries)
+        self.heartbeat_interval = app.config.get('JOB_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.stale_timeout = app.config.get('JOB_STALE_TIMEOUT', self.stale_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=app.config.get('JOB_WORKERS', 2),
+                                            thread_name_prefix='job')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(_SCHEMA)
+            columns = {row['name'] for row in db.execute('PRAGMA table_info(jobs)')}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(statement)
+            # 启动时清理崩溃或重启前遗留的任务
+            self._fail_stale(db)
+        app.extensions['jobs'] = self
+
+    @contextmanager
+    def _connect(self):
+        """每次操作使用独立连接（自动提交），用完即关闭"""
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row_to_status(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'message': row['message'],
+            'error': row['error'],
+            'created': row['created'],
+            'started': row['started'],
+            'finished': row['finished'],
+            'result_size': row['result_size']
+        }
+
+    def _fail_stale(self, db: sqlite3.Connection) -> int:
+        """
+        将所属进程已退出的排队/执行中任务标记为失败：
+        本进程的任务不在线程池中（进程号被复用）、同一主机上所属进程号已不存在，或心跳超时。
+        调用方持有 self._lock（与 submit 登记任务互斥）
+        """
+        now = time.time()
+        owner = current_owner()
+        rows = db.execute('SELECT id, owner, heartbeat, created FROM jobs WHERE status IN (?, ?)',
+                          (JOB_QUEUED, JOB_RUNNING)).fetchall()
+        stale = []
+        for row in rows:
+            if row['owner'] == owner:
+                lost = row['id'] not in self._futures
+            else:
+                heartbeat = row['heartbeat'] if row['heartbeat'] is not None else row['created']
+                lost = _owner_exited(row['owner']) or now - heartbeat > self.stale_timeout
+            if lost:
+                stale.append((JOB_FAILED, '任务所在进程已退出', now, row['id'], JOB_QUEUED, JOB_RUNNING))
+        if stale:
+            db.executemany('UPDATE jobs SET status = ?, error = ?, finished = ? '
+                           'WHERE id = ? AND status IN (?, ?)', stale)
+        return len(stale)
+
+    def _ensure_heartbeat(self) -> None:
+        """有未完成任务时保持心跳线程运行（调用方持有 self._lock）"""
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        """定期更新本进程未完成任务的心跳，全部完成后退出"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                active = [(time.time(), job_id) for job_id, future in self._futures.items() if not future.done()]
+                if not active:
+                    self._heartbeat = None
+                    return
+            try:
+                with self._connect() as db:
+                    db.executemany('UPDATE jobs SET heartbeat = ? WHERE id = ?', active)
+            except sqlite3.Error as e:
+                print(f"警告: 更新任务心跳失败: {e}")
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        提交任务
+
+        Returns:
+            (任务状态, 是否新建)；同一数据版本下参数相同且未失败/取消（也未请求取消）的任务直接返回已有任务
+
+        Raises:
+            ValueError: 任务类型不存在或参数无效
+            JobQueueFull: 本进程等待执行的任务已达上限
+        """
+        if kind not in _job_kinds:
+            raise ValueError(f'不支持的任务类型: {kind}，可选: {sorted(_job_kinds)}')
+        spec = _job_kinds[kind]
+        if spec['validate'] is not None:
+            spec['validate'](params)
+        key = job_key(kind, params, spec['version']() if spec['version'] else '')
+
+        with self._lock, self._connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                self._fail_stale(db)
+                row = db.execute(
+                    'SELECT * FROM jobs WHERE key = ? AND status IN (?, ?, ?) AND cancel_requested = 0 '
+                    'ORDER BY created DESC LIMIT 1',
+                    (key, JOB_QUEUED, JOB_RUNNING, JOB_DONE)).fetchone()
+                if row is not None:
+                    db.execute('COMMIT')
+                    return self._row_to_status(row), False
+
+                pending = sum(1 for future in self._futures.values() if not future.done())
+                if pending >= self.max_pending:
+                    raise JobQueueFull('任务队列已满，请稍后再试')
+
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                db.execute('INSERT INTO jobs (id, kind, key, params, status, created, owner, heartbeat) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (job_id, kind, key, json.dumps(params, ensure_ascii=False), JOB_QUEUED, now,
+                            current_owner(), now))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+            self._futures[job_id] = self._executor.submit(self._run, job_id, kind, params)
+            self._futures = {k: f for k, f in self._futures.items() if not f.done() or k == job_id}
+            self._ensure_heartbeat()
+
+        return self.status(job_id), True
+
+    def _run(self, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        """在线程池中执行任务并保存结果"""
+        job = JobContext(self, job_id)
+        with self._connect() as db:
+            now = time.time()
+            cursor = db.execute('UPDATE jobs SET status = ?, started = ?, heartbeat = ? WHERE id = ? AND status = ?',
+                                (JOB_RUNNING, now, now, job_id, JOB_QUEUED))
+            if cursor.rowcount == 0:
+                return
+
+        try:
+            job.check_cancelled()
+            with self.app.app_context():
+                result = _job_kinds[kind]['run'](params, job)
+            payload = zlib.compress(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+            if len(payload) > self.max_bytes:
+                raise ValueError('任务结果超过存储上限')
+        except JobCancelled:
+            self._finish(job_id, JOB_CANCELLED, job)
+        except Exception as e:
+            self._finish(job_id, JOB_FAILED, job, error=str(e) or type(e).__name__)
+        else:
+            job.done, job.total = 1, 1
+            self._finish(job_id, JOB_DONE, job, result=payload)
+
+    def _finish(self, job_id: str, status: str, job: JobContext, error: Optional[str] = None,
+                result: Optional[bytes] = None) -> None:
+        with self._connect() as db:
+            db.execute('UPDATE jobs SET status = ?, progress = ?, message = ?, error = ?, finished = ?, '
+                       'result = ?, result_size = ? WHERE id = ?',
+                       (status, job.progress, job.message, error, time.time(), result, len(result or b''), job_id))
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """已完成任务超出条数或结果总字节数上限时，从最早完成的开始删除"""
+        finished = db.execute('SELECT id, result_size FROM jobs WHERE status IN (?, ?, ?) ORDER BY finished DESC',
+                              FINISHED_STATES).fetchall()
+        total_bytes, expired = 0, []
+        for position, row in enumerate(finished):
+            total_bytes += row['result_size']
+            if position >= self.max_entries or total_bytes > self.max_bytes:
+                expired.append((row['id'],))
+        if expired:
+            db.executemany('DELETE FROM jobs WHERE id = ?', expired)
+
+    def _update_progress(self, job_id: str, progress: float, message: Optional[str]) -> None:
+        with self._connect() as db:
+            db.execute('UPDATE jobs SET progress = ?, message = ? WHERE id = ?', (progress, message, job_id))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as db:
+            row = db.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row is None or bool(row['cancel_requested'])
+
+    def _lookup(self, db: sqlite3.Connection, job_id: str) -> Optional[sqlite3.Row]:
+        """查询任务行，先清理所属进程已退出的任务"""
+        with self._lock:
+            self._fail_stale(db)
+        return db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务状态（不含结果），不存在时返回None"""
+        with self._connect() as db:
+            row = self._lookup(db, job_id)
+        return self._row_to_status(row) if row is not None else None
+
+    def result(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """
+        任务结果
+
+        Returns:
+            (任务状态, 结果)；任务未完成时结果为None
+        """
+        with self._connect() as db:
+            row = self._lookup(db, job_id)
+        if row is None:
+            return None, None
+        result = None
+        if row['status'] == JOB_DONE and row['result'] is not None:
+            result = json.loads(zlib.decompress(row['result']).decode('utf-8'))
+        return self._row_to_status(row), result
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消任务：排队中的任务直接标记为已取消，执行中的任务在下一个检查点停止；
+        请求取消后的任务不再参与去重，所属进程已退出的任务先标记为失败
+        """
+        with self._connect() as db:
+            if self._lookup(db, job_id) is None:
+                return None
+            cursor = db.execute('UPDATE jobs SET status = ?, finished = ?, cancel_requested = 1 '
+                                'WHERE id = ? AND status = ?', (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED))
+            if cursor.rowcount == 0:
+                db.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?',
+                           (job_id, JOB_RUNNING))
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return self.status(job_id)
+
+
+job_queue = JobQueue()
+
+
+def get_job_queue() -> JobQueue:
+    """获取当前应用的任务队列，应用未初始化时按应用配置初始化"""
+    from flask import current_app
+    if 'jobs' not in current_app.extensions:
+        with job_queue._lock:
+            if 'jobs' not in current_app.extensions:
+                job_queue.init_app(current_app._get_current_object())
+    return current_app.extensions['jobs']
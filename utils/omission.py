@@ -0,0 +1,208 @@
+"""
+遗漏值计算引擎
+单次正向遍历，维护每个号码最近一次出现的期索引（last-seen数组），
+一次性得到全部期、全部号码的遗漏值矩阵，复杂度 O(期数 × 号码数)
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+from utils.growable import GrowableArray
+
+# 从未出现过的号码统一按18期遗漏处理（与原有逻辑保持一致）
+NEVER_SEEN_MISSED = 18
+
+
+def build_ball_matrix(data: pd.DataFrame, ball_columns: List[str]) -> np.ndarray:
+    """
+    从DataFrame提取开奖号码矩阵
+
+    Args:
+        data: 包含开奖数据的DataFrame，按时间顺序排列（旧期在前）
+        ball_columns: 号码列名列表
+
+    Returns:
+        形如 (期数, 列数) 的整数矩阵，缺失值记为0
+    """
+    if data is None or len(data) == 0:
+        return np.zeros((0, len(ball_columns)), dtype=np.int64)
+
+    columns = [col for col in ball_columns if col in data.columns]
+    if not columns:
+        return np.zeros((len(data), 0), dtype=np.int64)
+
+    values = data[columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+    return values.to_numpy(dtype=np.int64)
+
+
+def build_presence_matrix(ball_matrix: np.ndarray, max_number: int) -> np.ndarray:
+    """
+    将号码矩阵转换为出现标记矩阵
+
+    Args:
+        ball_matrix: (期数, 列数) 号码矩阵
+        max_number: 最大号码数
+
+    Returns:
+        (期数, max_number) 布尔矩阵，第j列对应号码 j+1
+    """
+    balls = np.asarray(ball_matrix, dtype=np.int64)
+    presence = np.zeros((len(balls), max_number), dtype=bool)
+    if balls.size == 0:
+        return presence
+
+    # 越界号码（如缺失值0）不参与统计
+    rows, cols = np.nonzero((balls >= 1) & (balls <= max_number))
+    presence[rows, balls[rows, cols] - 1] = True
+    return presence
+
+
+class OmissionTracker:
+    """
+    遗漏值追踪器
+
+    last_seen[j] 保存号码 j+1 最近一次出现的期索引（-1 表示从未出现）。
+    每追加一批开奖数据，只需在上一批的 last_seen 基础上继续向前累积。
+    """
+
+    def __init__(self, max_number: int):
+        self.max_number = max_number
+        self.last_seen = np.full(max_number, -1, dtype=np.int64)
+        self.count = 0
+
+    def extend(self, ball_matrix: np.ndarray) -> np.ndarray:
+        """
+        追加若干期开奖号码并返回这些期的遗漏值
+
+        Args:
+            ball_matrix: (新增期数, 列数) 号码矩阵
+
+        Returns:
+            (新增期数, max_number) 遗漏值矩阵
+        """
+        presence = build_presence_matrix(ball_matrix, self.max_number)
+        draw_count = len(presence)
+        if draw_count == 0:
+            return np.zeros((0, self.max_number), dtype=np.int64)
+
+        indexes = np.arange(self.count, self.count + draw_count, dtype=np.int64)
+
+        # 号码出现的位置记为当期索引，否则为-1；沿期方向取累积最大值即得 last-seen
+        seen = np.where(presence, indexes[:, None], -1)
+        seen[0] = np.maximum(seen[0], self.last_seen)
+        last_seen = np.maximum.accumulate(seen, axis=0)
+
+        missed = np.where(last_seen >= 0, indexes[:, None] - last_seen, NEVER_SEEN_MISSED)
+
+        self.last_seen = last_seen[-1].copy()
+        self.count += draw_count
+        return missed
+
+
+def calculate_omission_matrix(ball_matrix: np.ndarray, max_number: int) -> np.ndarray:
+    """
+    计算每期每个号码的遗漏值矩阵
+
+    Args:
+        ball_matrix: (期数, 列数) 号码矩阵，按时间顺序排列
+        max_number: 最大号码数
+
+    Returns:
+        (期数, max_number) 整数矩阵，[i, j] 为第i期号码 j+1 的遗漏值，
+        当期出现为0，从未出现过为18
+    """
+    return OmissionTracker(max_number).extend(ball_matrix)
+
+
+class OccurrenceIndex:
+    """
+    号码出现位置索引
+
+    occurrences[j] 为号码 j+1 出现过的期索引（升序数组），
+    "号码n在第i期的遗漏值" 通过二分查找 i 之前（含）最近一次出现得到，复杂度 O(log 期数)
+    """
+
+    def __init__(self, max_number: int):
+        self.max_number = max_number
+        self._occurrence_rows = [GrowableArray.wrap(np.zeros(0, dtype=np.int64)) for _ in range(max_number)]
+        self.occurrences = [rows.view() for rows in self._occurrence_rows]
+        self.count = 0
+
+    @classmethod
+    def from_ball_matrix(cls, ball_matrix: np.ndarray, max_number: int) -> 'OccurrenceIndex':
+        """由 (期数, 列数) 号码矩阵构建索引"""
+        index = cls(max_number)
+        index.extend(ball_matrix)
+        return index
+
+    def extend(self, ball_matrix: np.ndarray) -> None:
+        """追加若干期开奖号码（新期索引接在已有期数之后）"""
+        presence = build_presence_matrix(ball_matrix, self.max_number)
+        # 首次构建按实际大小分配，之后追加新开奖时预留增长空间
+        headroom = self.count > 0
+        for j in range(self.max_number):
+            new_indexes = np.flatnonzero(presence[:, j]) + self.count
+            if len(new_indexes):
+                self._occurrence_rows[j] = self._occurrence_rows[j].extend(new_indexes, headroom)
+                self.occurrences[j] = self._occurrence_rows[j].view()
+        self.count += len(presence)
+
+    def extended(self, ball_matrix: np.ndarray) -> 'OccurrenceIndex':
+        """返回追加若干期后的新索引，自身不变（正在读取旧索引的调用方不受影响）"""
+        index = copy.copy(self)
+        index._occurrence_rows = list(self._occurrence_rows)
+        index.occurrences = list(self.occurrences)
+        index.extend(ball_matrix)
+        return index
+
+    def shared_arrays(self) -> Dict[str, np.ndarray]:
+        """可放入共享内存映射的数组：各号码出现位置首尾相接，offsets 为各号码的起止位置"""
+        lengths = [len(occurrences) for occurrences in self.occurrences]
+        return {
+            'positions': np.concatenate(self.occurrences),
+            'offsets': np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        }
+
+    def with_shared(self, arrays: Dict[str, np.ndarray]) -> 'OccurrenceIndex':
+        """返回以 arrays（shared_arrays 各数组的只读映射）为数据的新索引（再追加时复制到进程内）"""
+        index = copy.copy(self)
+        positions, offsets = arrays['positions'], arrays['offsets'].tolist()
+        index.occurrences = [positions[offsets[j]:offsets[j + 1]] for j in range(self.max_number)]
+        index._occurrence_rows = [GrowableArray.wrap(occurrences) for occurrences in index.occurrences]
+        return index
+
+    def last_seen(self) -> np.ndarray:
+        """各号码最近一次出现的期索引（从未出现为-1），用于接续计算新增期的遗漏值"""
+        return np.array([occurrences[-1] if len(occurrences) else -1 for occurrences in self.occurrences],
+                        dtype=np.int64)
+
+    def missed_at(self, number: int, index: int) -> int:
+        """
+        号码在指定期的遗漏值
+
+        Returns:
+            当期出现为0；此前从未出现、号码或期索引越界时为18
+        """
+        if not 1 <= number <= self.max_number or not 0 <= index < self.count:
+            return NEVER_SEEN_MISSED
+
+        occurrences = self.occurrences[number - 1]
+        position = int(np.searchsorted(occurrences, index, side='right')) - 1
+        if position < 0:
+            return NEVER_SEEN_MISSED
+        return int(index - occurrences[position])
+
+    def missed_vector(self, index: int) -> np.ndarray:
+        """指定期全部号码（1~max_number）的遗漏值向量"""
+        return np.array([self.missed_at(number, index) for number in range(1, self.max_number + 1)],
+                        dtype=np.int64)
+
+
+def omission_matrix_to_dict(missed_matrix: np.ndarray) -> dict:
+    """
+    转换为 {号码: {期索引: 遗漏值}} 格式（兼容旧接口）
+    """
+    columns = np.asarray(missed_matrix).T.tolist()
+    return {num: dict(enumerate(column)) for num, column in enumerate(columns, start=1)}
@@ -0,0 +1,55 @@
+"""
+进程池
+全组合过滤、策略回测等按请求并行的计算复用进程内的同一个进程池（每种用途一个），
+首次并行计算时按配置的进程数创建，子进程保留已加载的数据（如已映射的组合特征表），
+不必每个请求重新启动子进程；进程退出时关闭。fork 出的子进程不沿用父进程的进程池
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 名称 -> {'executor', 'processes', 'pid'}
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(name: str, processes: int) -> ProcessPoolExecutor:
+    """
+    获取名为 name 的进程池，不存在时创建
+
+    Args:
+        name: 用途名称，如 'combination_filter'
+        processes: 进程数（来自配置）；与已有进程池不同时关闭旧池并按新进程数创建
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is not None and pool['pid'] == os.getpid() and pool['processes'] == processes:
+            return pool['executor']
+        if pool is not None and pool['pid'] == os.getpid():
+            pool['executor'].shutdown(wait=False)
+        executor = ProcessPoolExecutor(max_workers=processes)
+        _pools[name] = {'executor': executor, 'processes': processes, 'pid': os.getpid()}
+        return executor
+
+
+def discard_process_pool(name: str, executor: ProcessPoolExecutor) -> None:
+    """丢弃已损坏（如子进程被杀死）的进程池，下次使用时重新创建"""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is not None and pool['executor'] is executor:
+            del _pools[name]
+    executor.shutdown(wait=False)
+
+
+def shutdown_process_pools() -> None:
+    """关闭本进程创建的全部进程池"""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool['pid'] == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool['executor'].shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_process_pools)
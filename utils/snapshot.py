@@ -0,0 +1,305 @@
+"""
+开奖历史二进制快照
+将CSV历史数据保存为 uint8 号码矩阵 + int64 期号数组（.npy 格式，可内存映射），
+冷启动时直接映射快照，跳过 read_csv / to_numeric；
+源CSV的修改时间或内容哈希变化时自动重建，快照不可用时回退到CSV解析；
+派生的大数组也可经 share_arrays 写入快照目录，以只读内存映射在多个进程间共享
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 共享数组（派生矩阵、前缀计数表等）保存在快照目录下的子目录中，按数据集版本分组
+SHARED_DIR_NAME = 'shared'
+
+# 快照默认保存在CSV所在目录下的 .snapshot 子目录中，
+# 只读部署环境可通过 SNAPSHOT_DIR 环境变量指定可写目录（如 /tmp）
+SNAPSHOT_DIR_NAME = '.snapshot'
+
+
+def snapshot_directory(csv_path: str, snapshot_dir: Optional[str] = None) -> str:
+    """获取CSV对应的快照目录（派生的二进制文件也保存在此目录）"""
+    return (snapshot_dir or os.environ.get('SNAPSHOT_DIR')
+            or os.path.join(os.path.dirname(os.path.abspath(csv_path)), SNAPSHOT_DIR_NAME))
+
+
+def _snapshot_paths(csv_path: str, snapshot_dir: Optional[str] = None) -> Dict[str, str]:
+    """获取快照目录与元数据文件路径"""
+    directory = snapshot_directory(csv_path, snapshot_dir)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return {
+        'dir': directory,
+        'name': name,
+        'meta': os.path.join(directory, f'{name}.meta.json')
+    }
+
+
+def file_signature(path: str) -> Optional[tuple]:
+    """文件的 (inode, 修改时间, 大小)，用于轮询检测文件替换或修改；文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def file_sha256(path: str) -> str:
+    """计算文件内容的SHA256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_meta(meta_path: str) -> Optional[dict]:
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path: str, write: Callable) -> None:
+    """先写临时文件再原子替换，避免并发进程读到半写入的文件"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _is_meta_current(meta: Optional[dict], csv_path: str, ball_columns: List[str]) -> bool:
+    """检查快照元数据是否与源CSV及列定义一致"""
+    if not meta or meta.get('version') != SNAPSHOT_FORMAT_VERSION:
+        return False
+    if meta.get('columns') != list(ball_columns):
+        return False
+
+    stat = os.stat(csv_path)
+    if meta.get('source_mtime_ns') == stat.st_mtime_ns and meta.get('source_size') == stat.st_size:
+        return True
+
+    # 修改时间变化但内容未变（如重新部署、touch），沿用快照
+    return meta.get('source_sha256') == file_sha256(csv_path)
+
+
+def load_snapshot(csv_path: str, ball_columns: List[str],
+                  snapshot_dir: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    读取与源CSV一致的快照
+
+    Args:
+        csv_path: 源CSV路径
+        ball_columns: 号码列名列表
+        snapshot_dir: 快照目录，默认为 SNAPSHOT_DIR 环境变量或CSV所在目录下的 .snapshot
+
+    Returns:
+        {'issues': int64数组, 'balls': uint8矩阵}（只读内存映射），快照不存在或已过期时返回None
+    """
+    paths = _snapshot_paths(csv_path, snapshot_dir)
+    meta = _read_meta(paths['meta'])
+
+    try:
+        if not _is_meta_current(meta, csv_path, ball_columns):
+            return None
+        issues = np.load(os.path.join(paths['dir'], meta['issues_file']), mmap_mode='r')
+        balls = np.load(os.path.join(paths['dir'], meta['balls_file']), mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if balls.shape != (len(issues), len(ball_columns)):
+        return None
+
+    return {'issues': issues, 'balls': balls}
+
+
+def build_snapshot(csv_path: str, df: pd.DataFrame, ball_columns: List[str],
+                   snapshot_dir: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    由已解析的DataFrame生成快照
+
+    期号必须为整数、号码必须在0~255之间，否则不生成快照；
+    目录不可写（如只读部署环境）时同样放弃，调用方继续使用CSV数据
+
+    Returns:
+        {'issues': ..., 'balls': ...}，未生成快照时返回None
+    """
+    paths = _snapshot_paths(csv_path, snapshot_dir)
+
+    if 'issue' not in df.columns or not all(col in df.columns for col in ball_columns):
+        return None
+    if not pd.api.types.is_integer_dtype(df['issue']):
+        return None
+
+    balls = df[ball_columns].to_numpy()
+    if balls.size and (balls.min() < 0 or balls.max() > 255):
+        return None
+
+    issues = df['issue'].to_numpy(dtype=np.int64)
+    balls = balls.astype(np.uint8)
+
+    try:
+        stat = os.stat(csv_path)
+        source_sha256 = file_sha256(csv_path)
+        os.makedirs(paths['dir'], exist_ok=True)
+
+        # 数据文件名带内容哈希，元数据最后原子替换，读者总能看到一致的一组文件
+        issues_file = f"{paths['name']}.{source_sha256[:12]}.issues.npy"
+        balls_file = f"{paths['name']}.{source_sha256[:12]}.balls.npy"
+        write_atomic(os.path.join(paths['dir'], issues_file), lambda f: np.save(f, issues))
+        write_atomic(os.path.join(paths['dir'], balls_file), lambda f: np.save(f, balls))
+
+        old_meta = _read_meta(paths['meta'])
+        meta = {
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'columns': list(ball_columns),
+            'rows': int(len(issues)),
+            'source_mtime_ns': stat.st_mtime_ns,
+            'source_size': stat.st_size,
+            'source_sha256': source_sha256,
+            'issues_file': issues_file,
+            'balls_file': balls_file
+        }
+        write_atomic(paths['meta'], lambda f: f.write(json.dumps(meta, indent=2).encode('utf-8')))
+    except OSError as e:
+        print(f"警告: 无法写入数据快照 {paths['dir']}: {e}")
+        return None
+
+    # 清理旧版本数据文件（已映射旧文件的进程不受影响）
+    if old_meta:
+        for key in ('issues_file', 'balls_file'):
+            old_file = old_meta.get(key)
+            if old_file and old_file not in (issues_file, balls_file):
+                try:
+                    os.remove(os.path.join(paths['dir'], old_file))
+                except OSError:
+                    pass
+
+    return {'issues': issues, 'balls': balls}
+
+
+def share_arrays(directory: str, arrays: Dict[str, np.ndarray]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    以只读内存映射共享一组数组
+
+    目录中已有其他进程写入的同名文件时直接映射，缺少的写入后再映射（元数据最后原子写入）。
+    映射同一文件的进程共享页缓存中的物理页：主进程映射后 fork 出的 worker 直接继承，
+    各自启动的 worker 映射同一组文件，数组都不再占用各进程的私有内存
+
+    Args:
+        directory: 数组文件目录，同一目录中的同名数组内容必须相同（如按数据集版本区分目录）
+        arrays: {名称: 数组}，不支持对象数组
+
+    Returns:
+        {名称: 只读数组}，形状或类型与传入数组不符的保留原数组；目录不可写时返回None
+    """
+    meta_path = os.path.join(directory, 'meta.json')
+    meta = _read_meta(meta_path)
+    if not meta or meta.get('version') != SNAPSHOT_FORMAT_VERSION:
+        meta = {'version': SNAPSHOT_FORMAT_VERSION, 'arrays': []}
+
+    missing = [name for name in arrays if name not in meta['arrays']]
+    if missing:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for name in missing:
+                write_atomic(os.path.join(directory, f'{name}.npy'),
+                             lambda f, array=arrays[name]: np.save(f, np.ascontiguousarray(array)))
+            meta['arrays'] = sorted(set(meta['arrays']) | set(missing))
+            write_atomic(meta_path, lambda f: f.write(json.dumps(meta, indent=2).encode('utf-8')))
+        except OSError as e:
+            print(f"警告: 无法写入共享数组 {directory}: {e}")
+            return None
+
+    shared = {}
+    for name, array in arrays.items():
+        try:
+            mapped = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            mapped = None
+        if mapped is None or mapped.shape != array.shape or mapped.dtype != array.dtype:
+            shared[name] = array
+        else:
+            # 转为普通 ndarray 视图（仍引用映射），运算结果与进程内数组一致
+            shared[name] = mapped.view(np.ndarray)
+    return shared
+
+
+def update_frame_hash(hasher, df: pd.DataFrame, ball_columns: List[str]):
+    """
+    把 df 各行（期号与号码）的哈希依次写入 hasher 并返回 hasher
+    逐行哈希与其他行无关：对已有行的 hasher 副本只写入新增行，结果与整体重新计算一致
+    """
+    if df is not None and len(df):
+        columns = [col for col in ['issue'] + list(ball_columns) if col in df.columns]
+        hasher.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return hasher
+
+
+def format_frame_version(count: int, hasher) -> str:
+    """由期数与 update_frame_hash 的结果得到版本字符串"""
+    return f"{count}-{hasher.hexdigest()[:12]}" if count else 'empty'
+
+
+def frame_version(df: pd.DataFrame, ball_columns: List[str]) -> str:
+    """
+    数据集版本：期数 + 期号与号码内容的哈希
+    内容不变则版本不变（多进程、重新加载一致），新增或修改开奖数据后版本随之变化
+    """
+    if df is None or len(df) == 0:
+        return 'empty'
+    return format_frame_version(len(df), update_frame_hash(hashlib.sha1(), df, ball_columns))
+
+
+def snapshot_to_frame(snapshot: Dict[str, np.ndarray], ball_columns: List[str]) -> pd.DataFrame:
+    """
+    将快照转换为与CSV加载结果一致的DataFrame（issue列 + 整数号码列）
+    issue 列直接引用映射（写时复制），号码矩阵逐列扩宽为 int64，不整体复制
+    """
+    frame = {'issue': np.asarray(snapshot['issues'], dtype=np.int64)}
+    balls = snapshot['balls']
+    for i, col in enumerate(ball_columns):
+        frame[col] = balls[:, i].astype(np.int64)
+    return pd.DataFrame(frame, copy=False)
+
+
+def load_draw_frame(csv_path: str, ball_columns: List[str],
+                    read_csv: Callable[[str], pd.DataFrame],
+                    snapshot_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    加载开奖数据：优先读取快照，快照缺失或过期时解析CSV并重建快照
+
+    Args:
+        csv_path: 源CSV路径
+        ball_columns: 号码列名列表
+        read_csv: CSV解析函数，返回已重命名、已排序的DataFrame
+        snapshot_dir: 快照目录
+
+    Returns:
+        包含 issue 与号码列的DataFrame，按期号升序排列
+    """
+    try:
+        snapshot = load_snapshot(csv_path, ball_columns, snapshot_dir)
+    except OSError:
+        snapshot = None
+
+    if snapshot is not None:
+        return snapshot_to_frame(snapshot, ball_columns)
+
+    df = read_csv(csv_path)
+    build_snapshot(csv_path, df, ball_columns, snapshot_dir)
+    return df
@@ -0,0 +1,333 @@
+"""
+批量兑奖
+上传的投注号码按块解析为前区/后区位掩码数组，与开奖号码位掩码按位与后 popcount 得到命中个数，
+再查奖级表得到每注的奖级；对全部历史兑奖时每块票据与全部开奖组成 (票数, 期数) 矩阵一次计算，
+块大小按矩阵元素个数限制，内存占用与上传文件大小无关
+"""
+
+import re
+import itertools
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.bitmask import popcount
+
+# 各玩法的选号规则与奖级（命中个数 -> 奖级，0 表示未中奖）
+TICKET_RULES = {
+    'ssq': {
+        'front': {'count': 6, 'max_number': 33},
+        'back': {'count': 1, 'max_number': 16},
+        'tiers': {
+            (6, 1): 1, (6, 0): 2, (5, 1): 3,
+            (5, 0): 4, (4, 1): 4,
+            (4, 0): 5, (3, 1): 5,
+            (2, 1): 6, (1, 1): 6, (0, 1): 6,
+        },
+        'names': ['未中奖', '一等奖', '二等奖', '三等奖', '四等奖', '五等奖', '六等奖'],
+    },
+    'dlt': {
+        'front': {'count': 5, 'max_number': 35},
+        'back': {'count': 2, 'max_number': 12},
+        'tiers': {
+            (5, 2): 1, (5, 1): 2, (5, 0): 3, (4, 2): 4, (4, 1): 5, (3, 2): 6, (4, 0): 7,
+            (3, 1): 8, (2, 2): 8,
+            (3, 0): 9, (1, 2): 9, (2, 1): 9, (0, 2): 9,
+        },
+        'names': ['未中奖', '一等奖', '二等奖', '三等奖', '四等奖', '五等奖', '六等奖',
+                  '七等奖', '八等奖', '九等奖'],
+    },
+}
+
+# 每次解析的票据行数
+TICKET_CHUNK_LINES = 50000
+
+# 全部历史兑奖时 (票数, 期数) 矩阵的元素个数上限
+HISTORY_CHUNK_CELLS = 1 << 21
+
+# 前后区分隔符：'+'、'|'、':'；号码之间以空格、逗号等非数字字符分隔
+_AREA_SEPARATOR = re.compile(r'[+|:]')
+_NUMBER = re.compile(r'\d+')
+_SEPARATOR_BYTES = np.frombuffer(b'+|:', dtype=np.uint8)
+
+
+def build_tier_table(game: str) -> np.ndarray:
+    """奖级查找表，[前区命中数, 后区命中数] -> 奖级"""
+    rules = TICKET_RULES[game]
+    table = np.zeros((rules['front']['count'] + 1, rules['back']['count'] + 1), dtype=np.int8)
+    for (front_hits, back_hits), tier in rules['tiers'].items():
+        table[front_hits, back_hits] = tier
+    return table
+
+
+def _area_mask(numbers: List[int], area_rule: Dict[str, int], area_name: str) -> int:
+    """校验一个号码区的号码并转换为位掩码"""
+    if len(numbers) != area_rule['count']:
+        raise ValueError(f'{area_name}需要{area_rule["count"]}个号码')
+    if len(set(numbers)) != len(numbers):
+        raise ValueError(f'{area_name}号码重复')
+    if any(not 1 <= n <= area_rule['max_number'] for n in numbers):
+        raise ValueError(f'{area_name}号码超出范围')
+    mask = 0
+    for n in numbers:
+        mask |= 1 << (n - 1)
+    return mask
+
+
+def parse_ticket(line: str, game: str) -> Tuple[List[int], List[int]]:
+    """
+    解析一注单式票据，如 '01 02 03 04 05 06 + 07' 或 '1,2,3,4,5,6|7'；
+    没有分隔符时按号码个数拆分前后区
+
+    Raises:
+        ValueError: 格式错误、号码个数不符、重复或超出范围
+    """
+    rules = TICKET_RULES[game]
+    parts = _AREA_SEPARATOR.split(line)
+    if len(parts) == 2:
+        front = [int(n) for n in _NUMBER.findall(parts[0])]
+        back = [int(n) for n in _NUMBER.findall(parts[1])]
+    elif len(parts) == 1:
+        numbers = [int(n) for n in _NUMBER.findall(line)]
+        front, back = numbers[:rules['front']['count']], numbers[rules['front']['count']:]
+    else:
+        raise ValueError('分隔符过多')
+
+    _area_mask(front, rules['front'], '前区' if game == 'dlt' else '红球')
+    _area_mask(back, rules['back'], '后区' if game == 'dlt' else '蓝球')
+    return sorted(front), sorted(back)
+
+
+def _masks_from_matrix(numbers: np.ndarray) -> np.ndarray:
+    """(票数, 号码个数) 号码矩阵按列移位合成位掩码"""
+    one = np.uint64(1)
+    return np.bitwise_or.reduce(np.left_shift(one, numbers.astype(np.uint64) - one), axis=1)
+
+
+def _parse_block(block: bytes, game: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对以换行结尾的多行字节块做向量化词法分析，解析格式规范的票据行
+
+    Returns:
+        (解析成功的行序号, 前区号码矩阵, 后区号码矩阵)；其余行（空行、注释、格式错误）交给 parse_ticket 逐行处理
+    """
+    rules = TICKET_RULES[game]
+    front_count, back_count = rules['front']['count'], rules['back']['count']
+    width = front_count + back_count
+
+    raw = np.frombuffer(block, dtype=np.uint8)
+    newline = raw == 10
+    line_count = int(newline.sum())
+    line_of = np.cumsum(newline) - newline
+
+    # 每个数字串的起点与取值（超过两位的数字串记为255，必然超出号码范围）
+    padded = np.concatenate([raw, np.zeros(2, dtype=np.uint8)])
+    digit = (padded >= 48) & (padded <= 57)
+    starts = np.flatnonzero(digit[:-2] & ~np.concatenate([[False], digit[:-3]]))
+    values = padded[starts].astype(np.int64) - 48
+    two = digit[starts + 1]
+    values = np.where(two, values * 10 + padded[starts + 1] - 48, values)
+    values[two & digit[starts + 2]] = 255
+    token_line = line_of[starts]
+
+    separators = np.flatnonzero(np.isin(raw, _SEPARATOR_BYTES))
+    separator_counts = np.bincount(line_of[separators], minlength=line_count)
+    first_separator = np.full(line_count, len(raw), dtype=np.int64)
+    np.minimum.at(first_separator, line_of[separators], separators)
+    front_tokens = np.bincount(token_line, weights=starts < first_separator[token_line],
+                               minlength=line_count)
+    commented = np.bincount(line_of[raw == 35], minlength=line_count) > 0
+
+    well_formed = ((np.bincount(token_line, minlength=line_count) == width) & ~commented &
+                   ((separator_counts == 0) | ((separator_counts == 1) & (front_tokens == front_count))))
+    rows = np.flatnonzero(well_formed)
+    matrix = values[well_formed[token_line]].reshape(-1, width)
+    front, back = np.sort(matrix[:, :front_count], axis=1), np.sort(matrix[:, front_count:], axis=1)
+
+    # 号码范围与重复检查：位掩码中1的个数等于号码个数
+    valid = ((front >= 1).all(axis=1) & (front <= rules['front']['max_number']).all(axis=1) &
+             (back >= 1).all(axis=1) & (back <= rules['back']['max_number']).all(axis=1))
+    valid[valid] &= ((popcount(_masks_from_matrix(front[valid])) == front_count) &
+                     (popcount(_masks_from_matrix(back[valid])) == back_count))
+    return rows[valid], front[valid], back[valid]
+
+
+def iter_ticket_chunks(lines: Iterable, game: str,
+                       chunk_lines: int = TICKET_CHUNK_LINES) -> Iterator[Dict[str, Any]]:
+    """
+    按块解析票据行（str 或 bytes），跳过空行与 '#' 开头的注释行
+
+    格式规范的行在整块字节上向量化解析，其余行逐行解析以给出错误信息
+
+    Yields:
+        {'line_numbers', 'front', 'back', 'front_masks', 'back_masks', 'errors'}，
+        front/back 为按行号排列的号码矩阵，errors 为 [(行号, 错误信息)]
+    """
+    rules = TICKET_RULES[game]
+    line_offset = 1
+    iterator = iter(lines)
+    while True:
+        block = [line if isinstance(line, bytes) else line.encode('utf-8')
+                 for line in itertools.islice(iterator, chunk_lines)]
+        if not block:
+            return
+
+        data = b'\n'.join(line.rstrip(b'\n') for line in block) + b'\n'
+        rows, front, back = _parse_block(data, game)
+
+        fallback = np.ones(len(block), dtype=bool)
+        fallback[rows] = False
+        extra_rows, extra_front, extra_back, errors = [], [], [], []
+        for row in np.flatnonzero(fallback).tolist():
+            line = block[row].decode('utf-8', errors='replace').strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                ticket_front, ticket_back = parse_ticket(line, game)
+            except ValueError as e:
+                errors.append((row + line_offset, str(e)))
+                continue
+            extra_rows.append(row)
+            extra_front.append(ticket_front)
+            extra_back.append(ticket_back)
+
+        if extra_rows:
+            rows = np.concatenate([rows, extra_rows])
+            front = np.concatenate([front, np.array(extra_front, dtype=np.int64)])
+            back = np.concatenate([back, np.array(extra_back, dtype=np.int64)])
+            order = np.argsort(rows, kind='stable')
+            rows, front, back = rows[order], front[order], back[order]
+
+        yield {
+            'line_numbers': rows + line_offset,
+            'front': front.reshape(-1, rules['front']['count']),
+            'back': back.reshape(-1, rules['back']['count']),
+            'front_masks': _masks_from_matrix(front),
+            'back_masks': _masks_from_matrix(back),
+            'errors': errors
+        }
+        line_offset += len(block)
+
+
+class TicketChecker:
+    """
+    对开奖号码位掩码批量兑奖
+
+    draw_front_masks / draw_back_masks 为每期前区、后区位掩码（按期排列），issues 为对应期号
+    """
+
+    def __init__(self, game: str, draw_front_masks: np.ndarray, draw_back_masks: np.ndarray,
+                 issues: List[str]):
+        self.game = game
+        self.names = TICKET_RULES[game]['names']
+        self.tier_table = build_tier_table(game)
+        self.draw_front_masks = np.asarray(draw_front_masks, dtype=np.uint64)
+        self.draw_back_masks = np.asarray(draw_back_masks, dtype=np.uint64)
+        self.issues = issues
+
+    def check_draw(self, front_masks: np.ndarray, back_masks: np.ndarray,
+                   index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        与第 index 期开奖号码比对
+
+        Returns:
+            (前区命中数, 后区命中数, 奖级)
+        """
+        front_hits = popcount(front_masks & self.draw_front_masks[index])
+        back_hits = popcount(back_masks & self.draw_back_masks[index])
+        return front_hits, back_hits, self.tier_table[front_hits, back_hits]
+
+    def check_history(self, front_masks: np.ndarray, back_masks: np.ndarray,
+                      start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        与 [start, stop) 内每一期开奖号码比对
+
+        Returns:
+            {'wins': (票数, 奖级数) 各奖级中奖次数（第0列为未中奖期数）,
+             'best_tier': 最高奖级（0 为从未中奖）, 'best_index': 最近一次取得最高奖级的期索引（-1 表示无）}
+        """
+        stop = len(self.issues) if stop is None else stop
+        draw_front = self.draw_front_masks[start:stop]
+        draw_back = self.draw_back_masks[start:stop]
+        tier_count = len(self.names)
+        ticket_count = len(front_masks)
+
+        wins = np.zeros((ticket_count, tier_count), dtype=np.int64)
+        best_tier = np.zeros(ticket_count, dtype=np.int64)
+        best_index = np.full(ticket_count, -1, dtype=np.int64)
+        if ticket_count == 0 or len(draw_front) == 0:
+            return {'wins': wins, 'best_tier': best_tier, 'best_index': best_index}
+
+        rows = max(1, HISTORY_CHUNK_CELLS // len(draw_front))
+        for offset in range(0, ticket_count, rows):
+            part = slice(offset, offset + rows)
+            front_hits = popcount(front_masks[part, None] & draw_front[None, :])
+            back_hits = popcount(back_masks[part, None] & draw_back[None, :])
+            tiers = self.tier_table[front_hits, back_hits].astype(np.int64)
+
+            # 各奖级次数：按 (票据, 奖级) 偏移后一次 bincount
+            flat = (np.arange(len(tiers))[:, None] * tier_count + tiers).reshape(-1)
+            wins[part] = np.bincount(flat, minlength=len(tiers) * tier_count).reshape(-1, tier_count)
+
+            # 最高奖级为数值最小的非零奖级；取该奖级最近一期
+            ranked = np.where(tiers > 0, tiers, tier_count)
+            best = ranked.min(axis=1)
+            last_hit = len(draw_front) - 1 - np.argmax((ranked == best[:, None])[:, ::-1], axis=1)
+            won = best < tier_count
+            best_tier[part] = np.where(won, best, 0)
+            best_index[part] = np.where(won, last_hit + start, -1)
+
+        return {'wins': wins, 'best_tier': best_tier, 'best_index': best_index}
+
+    def iter_results(self, chunks: Iterable[Dict[str, Any]], index: Optional[int] = None,
+                     start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        逐注生成兑奖结果（index 为 None 时对 [start, stop) 全部历史兑奖），
+        最后生成一条汇总记录
+        """
+        summary = {'tickets': 0, 'invalid': 0, 'tiers': {name: 0 for name in self.names}}
+        for chunk in chunks:
+            records = [(line_number, {'line': line_number, 'error': error})
+                       for line_number, error in chunk['errors']]
+            line_numbers = chunk['line_numbers'].tolist()
+            fronts, backs = chunk['front'].tolist(), chunk['back'].tolist()
+            summary['invalid'] += len(chunk['errors'])
+            summary['tickets'] += len(line_numbers)
+
+            if index is not None:
+                front_hits, back_hits, tiers = self.check_draw(chunk['front_masks'], chunk['back_masks'], index)
+                for tier, count in enumerate(np.bincount(tiers, minlength=len(self.names)).tolist()):
+                    summary['tiers'][self.names[tier]] += count
+                for line_number, front, back, front_hit, back_hit, tier in zip(
+                        line_numbers, fronts, backs, front_hits.tolist(), back_hits.tolist(), tiers.tolist()):
+                    records.append((line_number, {
+                        'line': line_number,
+                        'front': front,
+                        'back': back,
+                        'front_hits': front_hit,
+                        'back_hits': back_hit,
+                        'tier': tier,
+                        'prize': self.names[tier]
+                    }))
+            else:
+                # 汇总按每注的最高奖级统计注数
+                result = self.check_history(chunk['front_masks'], chunk['back_masks'], start, stop)
+                for line_number, front, back, tier, best_index, wins in zip(
+                        line_numbers, fronts, backs, result['best_tier'].tolist(),
+                        result['best_index'].tolist(), result['wins'].tolist()):
+                    summary['tiers'][self.names[tier]] += 1
+                    records.append((line_number, {
+                        'line': line_number,
+                        'front': front,
+                        'back': back,
+                        'best_tier': tier,
+                        'best_prize': self.names[tier],
+                        'best_issue': self.issues[best_index] if best_index >= 0 else None,
+                        'wins': {self.names[t]: wins[t] for t in range(1, len(wins)) if wins[t]}
+                    }))
+
+            if chunk['errors']:
+                records.sort(key=lambda item: item[0])
+            for _, record in records:
+                yield record
+
+        yield {'summary': summary}
@@ -0,0 +1,197 @@
+"""
+缓存预热
+部署或数据更新后，按依赖顺序预先请求各蓝图的全部页面与 GET 接口，把结果写入缓存（含多进程共享的二级缓存），
+第一个访问者不再承担冷计算：
+- 先执行各分组登记的准备函数（如构建共享的派生数据与特征表）
+- 再依次请求分组内蓝图的每个 GET 路由；带路由参数的路由按登记的参数展开，未登记的跳过
+- 逐条记录状态码、耗时与响应大小，进度通过后台任务（cache.warmup）汇报
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.cache import data_versions, on_version_change
+from utils.jobs import register_job_kind, current_owner
+
+WARMUP_OFF = 'off'
+WARMUP_BACKGROUND = 'background'
+WARMUP_BLOCKING = 'blocking'
+
+# 已登记的预热分组（按登记顺序执行）：名称 -> {'blueprints', 'prepare', 'expand'}
+_warmup_groups = {}
+
+
+def register_warmup(name: str, blueprints: Sequence[str], prepare: Optional[Callable[[], Any]] = None,
+                    expand: Optional[Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]]] = None) -> None:
+    """
+    登记预热分组
+
+    Args:
+        name: 分组名称，如 'ssq'
+        blueprints: 分组包含的蓝图名称
+        prepare: 请求路由前执行的准备函数（在应用上下文中调用）
+        expand: 端点 -> [(路由参数, 查询参数), ...]；带路由参数的端点必须登记才会预热，
+                不带路由参数的端点登记后按列出的查询参数逐一请求
+    """
+    _warmup_groups[name] = {'blueprints': list(blueprints), 'prepare': prepare, 'expand': dict(expand or {})}
+
+
+def build_warmup_plan(app, groups: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    列出需要预热的请求
+
+    Returns:
+        {'requests': [(分组, 端点, URL), ...], 'skipped': [端点, ...]}，请求按分组登记顺序、路由规则顺序排列
+    """
+    from flask import url_for
+
+    names = list(_warmup_groups) if groups is None else [name for name in _warmup_groups if name in set(groups)]
+    requests, skipped = [], []
+    with app.test_request_context():
+        for name in names:
+            group = _warmup_groups[name]
+            for rule in app.url_map.iter_rules():
+                blueprint, _, view = rule.endpoint.rpartition('.')
+                if blueprint not in group['blueprints'] or view == 'static' or 'GET' not in rule.methods:
+                    continue
+                variants = group['expand'].get(rule.endpoint)
+                if variants is None:
+                    if rule.arguments:
+                        skipped.append(rule.endpoint)
+                        continue
+                    variants = [({}, {})]
+                for view_args, query_args in variants:
+                    requests.append((name, rule.endpoint, url_for(rule.endpoint, **view_args, **query_args)))
+    return {'requests': requests, 'skipped': skipped}
+
+
+def _succeeded(status) -> bool:
+    """准备步骤返回 'ok'，路由请求返回状态码（304 等重定向/未修改也算成功）"""
+    return status == 'ok' or (isinstance(status, int) and status < 400)
+
+
+def warm_cache(app, groups: Optional[Iterable[str]] = None,
+               report: Optional[Callable[[int, int, str], None]] = None,
+               check_cancelled: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    执行缓存预热（须在应用上下文中调用）
+
+    Args:
+        groups: 只预热指定分组，None 为全部
+        report: 进度回调 report(已完成步数, 总步数, 当前步骤)
+        check_cancelled: 每步之前调用，需要中止时抛出异常
+
+    Returns:
+        {'versions', 'seconds', 'failed', 'skipped', 'steps': [{'group', 'endpoint', 'url', 'status', 'seconds', 'bytes'}, ...]}
+    """
+    plan = build_warmup_plan(app, groups)
+    names = sorted({name for name, _, _ in plan['requests']}, key=list(_warmup_groups).index)
+    prepares = [name for name in names if _warmup_groups[name]['prepare'] is not None]
+    total = len(prepares) + len(plan['requests'])
+    steps = []
+    started = time.perf_counter()
+
+    def record(step):
+        steps.append(step)
+        if report is not None:
+            report(len(steps), total, step['url'] or step['endpoint'])
+
+    # 准备阶段：共享的派生数据先于依赖它的路由构建
+    for name in prepares:
+        if check_cancelled is not None:
+            check_cancelled()
+        step_started = time.perf_counter()
+        status = 'ok'
+        try:
+            _warmup_groups[name]['prepare']()
+        except Exception as e:
+            status = f'error: {e}'
+        record({'group': name, 'endpoint': 'prepare', 'url': None, 'status': status,
+                'seconds': round(time.perf_counter() - step_started, 4), 'bytes': 0})
+
+    client = app.test_client()
+    for name, endpoint, url in plan['requests']:
+        if check_cancelled is not None:
+            check_cancelled()
+        step_started = time.perf_counter()
+        try:
+            response = client.get(url)
+            status, size = response.status_code, len(response.get_data())
+        except Exception as e:
+            status, size = f'error: {e}', 0
+        record({'group': name, 'endpoint': endpoint, 'url': url, 'status': status,
+                'seconds': round(time.perf_counter() - step_started, 4), 'bytes': size})
+
+    failed = sum(1 for step in steps if not _succeeded(step['status']))
+    return {
+        'versions': data_versions(),
+        'seconds': round(time.perf_counter() - started, 4),
+        'failed': failed,
+        'skipped': plan['skipped'],
+        'steps': steps
+    }
+
+
+def validate_warmup_job(params):
+    groups = params.get('groups')
+    if groups is not None:
+        if not isinstance(groups, list) or any(name not in _warmup_groups for name in groups):
+            raise ValueError(f'groups 须为预热分组列表，可选: {list(_warmup_groups)}')
+
+
+def run_warmup_job(params, job):
+    """后台任务：缓存预热，进度按已完成的步骤数汇报"""
+    from flask import current_app
+    return warm_cache(current_app._get_current_object(), params.get('groups'),
+                      report=job.report, check_cancelled=job.check_cancelled)
+
+
+def _warmup_version():
+    """
+    预热任务的去重版本：本进程标识 + 数据版本
+    一级缓存在进程内，重启后的进程即使数据版本未变也要重新预热，不能复用上次启动留下的已完成任务
+    """
+    versions = '|'.join(f'{name}@{version}' for name, version in data_versions().items())
+    return f'{current_owner()}|{versions}'
+
+
+register_job_kind('cache.warmup', run_warmup_job, validate_warmup_job, _warmup_version)
+
+
+def schedule_warmup(groups: Optional[List[str]] = None):
+    """
+    提交后台预热任务（须在应用上下文中调用）
+    每个进程对同一数据版本只预热一次：同一进程重复提交时复用同一任务；
+    其他 worker 各自预热自己的一级缓存，二级缓存中已有的结果直接命中
+    """
+    from utils.jobs import get_job_queue
+    params = {} if groups is None else {'groups': groups}
+    return get_job_queue().submit('cache.warmup', params)
+
+
+def _rewarm(module_name, version):
+    """数据版本变化回调：重新提交预热任务"""
+    schedule_warmup()
+
+
+def init_warmup(app) -> Optional[Dict[str, Any]]:
+    """
+    按 CACHE_WARMUP 配置在启动时预热缓存，并在数据版本变化后重新预热
+
+    CACHE_WARMUP:
+        'off': 不预热
+        'background': 提交后台预热任务，启动不等待（默认）
+        'blocking': 启动时同步预热完成后返回结果，适合在接入流量前调用
+    """
+    mode = app.config.get('CACHE_WARMUP', WARMUP_BACKGROUND)
+    if mode == WARMUP_OFF:
+        return None
+
+    on_version_change(_rewarm)
+    with app.app_context():
+        if mode == WARMUP_BLOCKING:
+            result = warm_cache(app)
+            print(f"缓存预热完成: {len(result['steps'])} 步, {result['failed']} 失败, 用时 {result['seconds']}s")
+            return result
+        status, _ = schedule_warmup()
+        return status
@@ -0,0 +1,133 @@
+"""
+数据文件监视
+可选的后台线程，按固定间隔轮询已登记数据集的CSV文件（inode、修改时间、大小，不依赖外部库），
+文件变化后在后台线程中完整重新加载数据集并构建派生索引，完成后整体发布（读-复制-更新）：
+- 发布只是替换引用，处理中的请求继续使用其开始时取得的旧数据集直至完成
+- 请求从不等待重新加载；重新加载失败时保留旧数据集
+- 文件在两次轮询之间仍在变化（正在写入）时等待其稳定后再加载
+- 内容版本未变（如追加开奖接口已把同样的数据写入CSV）时不重复发布
+- 启用 SHARE_DATASETS 时新数据集的派生数组同样换成共享内存映射，其他 worker 重新加载同一版本时直接映射
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.dataset import (LotteryDataset, registered_datasets, dataset_update_lock, prepare_dataset,
+                           share_dataset, publish_dataset)
+from utils.snapshot import file_signature
+
+
+class DatasetWatcher:
+    """
+    数据文件监视线程
+
+    每个进程各自运行（多进程部署时需在每个工作进程中启动，不能在 fork 之前启动）
+    """
+
+    def __init__(self, interval: float = 5.0, app=None):
+        self.interval = interval
+        # 重新加载时进入该应用的上下文，使 SHARE_DATASETS 等配置按应用生效
+        self.app = app
+        # 彩种 -> 已处理的文件签名
+        self._seen: Dict[str, Optional[tuple]] = {}
+        # 彩种 -> 上次轮询看到但尚未处理的签名（连续两次一致才重新加载）
+        self._pending: Dict[str, Optional[tuple]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"警告: 数据文件监视出错: {e}")
+
+    def check_once(self) -> List[str]:
+        """
+        轮询一次所有已登记数据集的文件
+
+        Returns:
+            本次重新加载并发布了新数据集的彩种
+        """
+        reloaded = []
+        for game, dataset in registered_datasets().items():
+            if not dataset.csv_path:
+                continue
+            self._seen.setdefault(game, dataset.source_signature)
+            signature = file_signature(dataset.csv_path)
+            if signature is None or signature == self._seen[game]:
+                self._pending.pop(game, None)
+                continue
+            if self._pending.get(game) != signature:
+                # 第一次看到变化：等下一次轮询确认文件已写完
+                self._pending[game] = signature
+                continue
+            self._pending.pop(game, None)
+            if self.reload(game, dataset.csv_path):
+                reloaded.append(game)
+            self._seen[game] = signature
+        return reloaded
+
+    def reload(self, game: str, csv_path: str) -> bool:
+        """在当前线程中重新加载数据集、构建派生索引并发布，返回是否发布了新数据集"""
+        if self.app is not None:
+            with self.app.app_context():
+                return self._reload(game, csv_path)
+        return self._reload(game, csv_path)
+
+    def _reload(self, game: str, csv_path: str) -> bool:
+        started = time.perf_counter()
+        with dataset_update_lock(game):
+            try:
+                dataset = LotteryDataset.load(game, csv_path)
+            except Exception as e:
+                print(f"警告: 重新加载 {game} 数据失败，继续使用旧数据: {e}")
+                return False
+            current = registered_datasets().get(game)
+            if current is not None and current.version == dataset.version:
+                return False
+
+            try:
+                prepare_dataset(dataset)
+                dataset = share_dataset(dataset)
+            except Exception as e:
+                print(f"警告: 构建 {game} 派生索引失败，继续使用旧数据: {e}")
+                return False
+            publish_dataset(dataset)
+            print(f"{game} 数据已重新加载: {len(dataset)} 期, 版本 {dataset.version}, "
+                  f"用时 {time.perf_counter() - started:.2f}s")
+            return True
+
+
+_watcher: Optional[DatasetWatcher] = None
+
+
+def init_data_watcher(app) -> Optional[DatasetWatcher]:
+    """
+    按 DATA_WATCH_INTERVAL（秒）启动数据文件监视线程，0 或未配置时不启动
+
+    gunicorn 等预加载应用的多进程部署应在工作进程中调用（如 post_fork 钩子），
+    线程不会随 fork 复制到子进程
+    """
+    global _watcher
+    interval = float(app.config.get('DATA_WATCH_INTERVAL') or 0)
+    if interval <= 0:
+        return None
+    if _watcher is None:
+        _watcher = DatasetWatcher(interval, app)
+    _watcher.start()
+    return _watcher
@@ -0,0 +1,83 @@
+"""
+走势数据窗口
+将期号范围（since_issue/until_issue）与分页参数（limit/offset）转换为特征表的行区间，
+接口只需对按全部历史预计算的特征表与遗漏矩阵切片，遗漏、冷温热等数值不受窗口影响
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# 走势接口支持的窗口参数
+WINDOW_ARGS = ['limit', 'offset', 'since_issue', 'until_issue']
+# 排行类接口 top 参数的上限
+MAX_TOP = 1000
+
+
+def resolve_window(issue_numbers, limit: Optional[int] = None, offset: int = 0,
+                   since_issue: Optional[int] = None, until_issue: Optional[int] = None) -> Tuple[int, int]:
+    """
+    计算行区间 [start, stop)
+
+    Args:
+        issue_numbers: 按升序排列的期号数组
+        limit: 最多返回的期数，None 表示不限
+        offset: 跳过最近的期数（从最新一期往前数）
+        since_issue: 起始期号（含）
+        until_issue: 截止期号（含）
+
+    Returns:
+        (start, stop)，数据仍按从旧到新的顺序切片
+    """
+    issues = np.asarray(issue_numbers)
+    start = 0 if since_issue is None else int(np.searchsorted(issues, since_issue, side='left'))
+    stop = len(issues) if until_issue is None else int(np.searchsorted(issues, until_issue, side='right'))
+
+    stop = max(start, stop - offset)
+    if limit is not None:
+        start = max(start, stop - limit)
+    return start, stop
+
+
+def parse_window_args(args) -> Dict[str, int]:
+    """
+    从请求参数中解析窗口参数，未提供的参数不返回，limit=all 解析为None
+
+    Raises:
+        ValueError: 参数不是整数或 limit/offset 为负数
+    """
+    window = {}
+    for name in WINDOW_ARGS:
+        raw = args.get(name)
+        if raw is None or raw == '':
+            continue
+        if name == 'limit' and raw == 'all':
+            # limit=all 表示不限期数（如分布图统计全部历史）
+            window[name] = None
+            continue
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ValueError(f'参数 {name} 必须为整数')
+        if name in ('limit', 'offset') and value < 0:
+            raise ValueError(f'参数 {name} 不能为负数')
+        window[name] = value
+    return window
+
+
+def parse_top_arg(args, default: int = 20) -> int:
+    """
+    解析排行类接口的 top 参数（返回前多少项），未提供时为默认值
+
+    Raises:
+        ValueError: 参数不是整数或不在 1~MAX_TOP 范围内
+    """
+    raw = args.get('top')
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError('参数 top 必须为整数')
+    if not 1 <= value <= MAX_TOP:
+        raise ValueError(f'参数 top 必须在 1~{MAX_TOP} 之间')
+    return value